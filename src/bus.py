@@ -1,4 +1,5 @@
 from src.panel import Panel
+from src.storage import Storage
 
 import itertools
 import numpy as np
@@ -20,20 +21,32 @@ class Bus:
         panel_size (int, float):
             The size of the solar panel on a roof at time t=0, can be zero.
             At this point not used for optimisation! Also defaults to 0.
+
+        sun_profile (list):
+            Sun factor at the bus for each snapshot, e.g. for shading. Default: None, the sun of the optimisation task.
+
+        name (str):
+            External id of the bus, e.g. its meter number, unique within its grid. Unlike id it does not depend on
+            the order objects are created in. Default: None, the grid names it after its position.
     """
 
     id_counter = itertools.count()
 
-    def __init__(self, roof_size, power_draw, panel_size=0):
-        self._id = next(Bus.id_counter)  # Unique identifier
+    def __init__(self, roof_size, power_draw, panel_size=0, sun_profile=None, name=None):
+        self._id = next(Bus.id_counter)  # Unique identifier within this process, see Grid.ids for stable ones
+        self._name = None
 
         self._roof_size = None
         self._power_draw = None
+        self._sun_profile = None
         self._panel = None
+        self._storage = None
         self._connected_buses = []
 
         self.roof_size = roof_size
         self.power_draw = power_draw
+        self.sun_profile = sun_profile
+        self.name = name
         self.panel = Panel(self, panel_size)     # creates Panel instance and sets it as panel of the bus.
 
     @property
@@ -44,6 +57,20 @@ class Bus:
     def id(self, identifier):
         raise PermissionError("Setting of id is not allowed.")
 
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        if self._name is not None:
+            raise PermissionError("The name of a bus can be set only once.")
+        assert isinstance(value, (type(None), str))
+        if value is not None:
+            assert len(value) > 0
+
+        self._name = value
+
     @property
     def roof_size(self):
 
@@ -76,6 +103,23 @@ class Bus:
 
         self._power_draw = value
 
+    @property
+    def sun_profile(self):
+        return self._sun_profile
+
+    @sun_profile.setter
+    def sun_profile(self, value):
+        assert isinstance(value, (type(None), list))
+
+        if value is not None and self.sun_profile is not None:
+            raise PermissionError("Sun profile can be set only once!")
+        if value is not None:
+            for item in value:
+                assert isinstance(item, (int, float, np.int64, np.float64))
+                assert item >= 0
+
+        self._sun_profile = value
+
     @property
     def panel(self):
         return self._panel
@@ -89,6 +133,49 @@ class Bus:
 
         self._panel = value
 
+    @property
+    def storage(self):
+        return self._storage
+
+    @storage.setter
+    def storage(self, value):
+        if self._storage is not None:
+            raise PermissionError("A bus can only have one storage.")
+
+        assert isinstance(value, Storage)
+        assert value.bus is self
+
+        self._storage = value
+
+    def add_storage(self, capacity, charge_limit=None, discharge_limit=None, efficiency=1, initial_charge=0):
+        """
+        Places a battery at the bus.
+
+        Args:
+            capacity (int, float):
+                Energy the battery can hold.
+
+            charge_limit (int, float):
+                Maximum charging power. Default: None, unlimited.
+
+            discharge_limit (int, float):
+                Maximum discharging power. Default: None, unlimited.
+
+            efficiency (int, float):
+                Round trip efficiency between 0 and 1. Default: 1
+
+            initial_charge (int, float):
+                Energy stored before the first snapshot. Default: 0
+
+        Returns:
+            Storage:
+                The new storage of the bus.
+        """
+
+        self.storage = Storage(self, capacity, charge_limit, discharge_limit, efficiency, initial_charge)
+
+        return self.storage
+
     @property
     def connected_buses(self):
         return self._connected_buses
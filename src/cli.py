@@ -0,0 +1,441 @@
+import argparse
+import collections
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import sys
+import time
+import traceback
+
+import numpy as np
+
+import src.grid
+import src.grid_archive
+import src.integer_panel_sizing
+import src.profiler
+import src.result_cache
+import src.solver_budget
+import src.stochastic_optimisation
+
+BACKENDS = ("ipopt", "highs")
+TIMEOUT_GRACE = 10      # Seconds a job may run past its timeout to save its best point before it is stopped
+MIN_WALL_TIME = 1       # Seconds the solver gets even if loading and building used up the timeout
+
+
+def parse_option(text):
+    """
+    Reads a solver option given as key=value, values are read as JSON if possible, e.g. numbers.
+
+    Args:
+        text (str):
+            The option.
+
+    Returns:
+        tuple:
+            Key and value.
+    """
+
+    key, separator, value = text.partition("=")
+    if not separator or not key:
+        raise argparse.ArgumentTypeError(f"Solver options are given as key=value, not {text}.")
+    try:
+        value = json.loads(value)
+    except ValueError:
+        pass
+
+    return key, value
+
+
+def load_jobs(path, defaults=None):
+    """
+    Reads a job file. It is a JSON list of jobs, or a dict with a list "jobs" and a dict "defaults" applied to all
+    of them. Each job is a dict with:
+        "grid": directory of a grid written by Grid.save, relative to the job file.
+        "scenario": .npy file with power draws of shape (snapshots, buildings), or (scenarios, snapshots,
+        buildings) to optimise the panel areas against all of them. Optional, the power draws of the buses.
+        "snapshots": points in time of the scenario, if they are not the grid's snapshots. Optional.
+        "name": name of the job and its output directory. Optional, "job<position>".
+        "backend", "solver_options", "preset", "timeout", "profile" and "cache": like the command line arguments.
+        Optional. The timeout covers the whole job, loading and saving included.
+
+    Args:
+        path (str):
+            The job file.
+
+        defaults (dict):
+            Values of jobs that neither the job nor the file's defaults set. Default: None
+
+    Returns:
+        list of dict:
+            The jobs with all their values, paths made absolute.
+    """
+
+    with open(path, encoding="utf-8") as file:
+        content = json.load(file)
+    if isinstance(content, list):
+        content = {"jobs": content}
+
+    directory = os.path.dirname(os.path.abspath(path))
+    jobs = []
+    for position, entry in enumerate(content["jobs"]):
+        job = {"name": f"job{position}", **(defaults or {}), **content.get("defaults", {}), **entry}
+        for key in ("grid", "scenario", "cache"):
+            if job.get(key) is not None:
+                job[key] = os.path.join(directory, job[key])
+        jobs.append(job)
+
+    return jobs
+
+
+def run_job(job, output_directory):
+    """
+    Solves one job and writes its result and metrics into output_directory/<name>, profiled jobs also their
+    trace.json and profile.prof, see Profiler. Errors are caught and reported in the metrics, so a failing job
+    does not stop a batch. Lives on module level so process pools can pickle it.
+
+    Args:
+        job (dict):
+            The job, see load_jobs.
+
+        output_directory (str):
+            Directory of the batch.
+
+    Returns:
+        dict:
+            The metrics: name, status, objective, panel sizes by bus key, seconds per stage, the error if one
+            occurred and, with a cache, whether it was a "hit", a "warm start" or a "miss". The status is "solved",
+            "not solved", "budget exhausted", "infeasible" or "error", run_jobs adds "timeout".
+    """
+
+    times = {}
+    metrics = {"name": job["name"], "status": "error", "objective": None, "panel_sizes": None, "times": times,
+               "error": None}
+    directory = os.path.join(output_directory, job["name"])
+    os.makedirs(directory, exist_ok=True)
+    profiler = None
+    start = time.perf_counter()
+
+    def lap(stage, since):
+        now = time.perf_counter()
+        times[stage] = now - since
+        return now
+
+    try:
+        backend = job.get("backend", "ipopt")
+        assert backend in BACKENDS, f"Unknown backend {backend}."
+        timeout = job.get("timeout")
+        solver_options = dict(job.get("solver_options") or {})
+        preset = job.get("preset", "default")
+        profiler = src.profiler.Profiler(cprofile=True, memory=True) if job.get("profile") else None
+
+        grid = src.grid.Grid.load(job["grid"])
+        power_draws = None if job.get("scenario") is None else np.load(job["scenario"])
+        snapshots = job.get("snapshots")
+        since = lap("load", start)
+
+        def solver_budget():
+            # The solver gets what loading, checking and building left of the timeout.
+            if timeout is None:
+                return src.solver_budget.SolverBudget(preset=preset)
+            left = timeout - (time.perf_counter() - start)
+            return src.solver_budget.SolverBudget(max_wall_time=max(left, MIN_WALL_TIME), preset=preset)
+
+        if power_draws is not None and power_draws.ndim == 3:
+            assert backend == "ipopt", "Scenarios are only optimised with IPOPT."
+            assert snapshots is None, "Scenarios use the snapshots of the grid."
+            optimisation = src.stochastic_optimisation.StochasticOptimisation(grid, power_draws,
+                                                                              solver_options=solver_options)
+            since = lap("build", since)
+            if profiler is None:
+                result = optimisation.solve(solver_budget())
+            else:
+                with profiler.record("StochasticOptimisation.solve", "solve"):      # Its tasks are internal
+                    result = optimisation.solve(solver_budget())
+            since = lap("solve", since)
+        else:
+            if profiler is None:
+                report = grid.check_feasibility(snapshots, power_draws)
+            else:
+                with profiler.record("check_feasibility", "check"):
+                    report = grid.check_feasibility(snapshots, power_draws)
+            since = lap("check", since)
+            if not report.feasible:
+                metrics["status"] = "infeasible"
+                metrics["error"] = str(report)
+                return metrics
+
+            integer_sizing = src.integer_panel_sizing.IntegerPanelSizing() if backend == "highs" else None
+            if job.get("cache") is not None:
+                cache = src.result_cache.ResultCache(job["cache"])
+                result = cache.optimise(grid, snapshots, power_draws, solver_options, integer_sizing,
+                                        solver_budget())
+                metrics["cache"] = result.stats["cache"]
+                since = lap("solve", since)
+            else:
+                task = grid.new_optimisation_task(snapshots, power_draws)
+                if profiler is not None:
+                    task.profiler = profiler
+                task.create_optimisation_task(integer_sizing)
+                since = lap("build", since)
+                task.solve(solver_options, verbose=False, budget=solver_budget())
+                result = task.result
+                since = lap("solve", since)
+
+        src.grid_archive.save_result(result, os.path.join(directory, "result"))
+        lap("save", since)
+
+        metrics["status"] = "budget exhausted" if result.budget_exhausted else \
+            "solved" if result.success else "not solved"
+        metrics["objective"] = result.objective
+        metrics["panel_sizes"] = dict(zip(grid.ids.bus_keys.tolist(), result.panel_sizes.tolist()))
+    except Exception:
+        metrics["error"] = traceback.format_exc()
+    finally:
+        if profiler is not None:
+            profiler.write(os.path.join(directory, "trace.json"))
+            if profiler.stats is not None:
+                profiler.write_profile(os.path.join(directory, "profile.prof"))
+        times["total"] = time.perf_counter() - start
+        write_metrics(metrics, directory)
+
+    return metrics
+
+
+def write_metrics(metrics, directory):
+    with open(os.path.join(directory, "metrics.json"), "w", encoding="utf-8") as file:
+        json.dump(metrics, file, indent=2)
+
+
+def run_job_in_process(connection, job, output_directory):
+    """
+    Runs a job and sends its metrics through the pipe. Lives on module level so it can be started in other processes.
+
+    Args:
+        connection (multiprocessing.connection.Connection):
+            Pipe to the coordinating process.
+
+        job (dict):
+            The job, see load_jobs.
+
+        output_directory (str):
+            Directory of the batch.
+    """
+
+    try:
+        connection.send(run_job(job, output_directory))
+    finally:
+        connection.close()
+
+
+def stop_job(job, output_directory, status, error, seconds):
+    """
+    Writes the metrics of a job whose process was stopped or died, replacing whatever the job wrote itself.
+
+    Args:
+        job (dict):
+            The job, see load_jobs.
+
+        output_directory (str):
+            Directory of the batch.
+
+        status (str):
+            Status of the job, "timeout" or "error".
+
+        error (str):
+            What happened to the process.
+
+        seconds (float):
+            Time the job ran.
+
+    Returns:
+        dict:
+            The metrics, see run_job.
+    """
+
+    metrics = {"name": job["name"], "status": status, "objective": None, "panel_sizes": None,
+               "times": {"total": seconds}, "error": error}
+    directory = os.path.join(output_directory, job["name"])
+    os.makedirs(directory, exist_ok=True)
+    write_metrics(metrics, directory)
+
+    return metrics
+
+
+def run_job_processes(jobs, output_directory, workers, finish):
+    """
+    Runs every job in a process of its own, at most workers at the same time. A job still running TIMEOUT_GRACE
+    seconds after its timeout is terminated and gets the status "timeout", its process is replaced by the next job.
+
+    Args:
+        jobs (list of dict):
+            The jobs, see load_jobs.
+
+        output_directory (str):
+            Directory of the batch.
+
+        workers (int):
+            Number of processes running at the same time.
+
+        finish (callable):
+            Called with the position and the metrics of each job once it is done.
+    """
+
+    pending = collections.deque(enumerate(jobs))
+    running = {}        # Pipe of each process: position of its job, the process, its start and its deadline
+    try:
+        while pending or running:
+            while pending and len(running) < workers:
+                position, job = pending.popleft()
+                local, remote = multiprocessing.Pipe(duplex=False)
+                # Not a daemon, so scenario jobs can start their own workers.
+                process = multiprocessing.Process(target=run_job_in_process, args=(remote, job, output_directory))
+                process.start()
+                remote.close()      # Only the process holds its end, so a dead process shows as end of file
+                started = time.monotonic()
+                deadline = None if job.get("timeout") is None else started + job["timeout"] + TIMEOUT_GRACE
+                running[local] = (position, process, started, deadline)
+
+            deadlines = [deadline for _, _, _, deadline in running.values() if deadline is not None]
+            wait = None if not deadlines else max(0., min(deadlines) - time.monotonic())
+            for connection in multiprocessing.connection.wait(list(running), wait):
+                position, process, started, _ = running.pop(connection)
+                try:
+                    metrics = connection.recv()
+                except (EOFError, OSError):
+                    metrics = stop_job(jobs[position], output_directory, "error",
+                                       f"The process of the job stopped unexpectedly, exit code {process.exitcode}.",
+                                       time.monotonic() - started)
+                connection.close()
+                process.join()
+                finish(position, metrics)
+
+            now = time.monotonic()
+            for connection, (position, process, started, deadline) in list(running.items()):
+                if deadline is not None and now >= deadline:
+                    del running[connection]
+                    process.terminate()
+                    process.join()
+                    connection.close()
+                    error = f"The job did not finish within its timeout of {jobs[position]['timeout']} s."
+                    finish(position, stop_job(jobs[position], output_directory, "timeout", error, now - started))
+    finally:
+        for connection, (_, process, _, _) in running.items():
+            process.terminate()
+            process.join()
+            connection.close()
+
+
+def run_jobs(jobs, output_directory, workers=1, report=None):
+    """
+    Runs jobs and writes the metrics of all of them into output_directory/summary.json. The solver of a job gets
+    what is left of its timeout as wall time limit and returns its best point. Jobs with a timeout, or all jobs if
+    there is more than one worker, run in processes of their own, see run_job_processes, so a job that hangs
+    elsewhere, e.g. while loading, is stopped with the status "timeout".
+
+    Args:
+        jobs (list of dict):
+            The jobs, see load_jobs.
+
+        output_directory (str):
+            Directory to write to, created if missing.
+
+        workers (int):
+            Number of processes solving jobs at the same time. Default: 1, jobs without timeout in this process.
+
+        report (callable):
+            Called with the metrics of each job once it is done. Default: None
+
+    Returns:
+        list of dict:
+            The metrics of all jobs, in the order of the jobs.
+    """
+
+    assert isinstance(workers, int) and workers > 0
+    names = [job["name"] for job in jobs]
+    assert len(set(names)) == len(names), "Job names have to be unique."
+    os.makedirs(output_directory, exist_ok=True)
+
+    summary = [None] * len(jobs)
+
+    def finish(position, metrics):
+        summary[position] = metrics
+        if report is not None:
+            report(metrics)
+
+    if workers == 1 and all(job.get("timeout") is None for job in jobs):
+        for position, job in enumerate(jobs):
+            finish(position, run_job(job, output_directory))
+    else:
+        run_job_processes(jobs, output_directory, workers, finish)
+
+    with open(os.path.join(output_directory, "summary.json"), "w", encoding="utf-8") as file:
+        json.dump(summary, file, indent=2)
+
+    return summary
+
+
+def create_parser():
+    parser = argparse.ArgumentParser(prog="python -m src.cli",
+                                     description="Optimises the panel placement of saved grids, one or many jobs.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--grid", help="directory of a grid written by Grid.save")
+    source.add_argument("--jobs", help="JSON job file, see src.cli.load_jobs")
+    parser.add_argument("--scenario", help=".npy file with the power draws, only with --grid")
+    parser.add_argument("--backend", choices=BACKENDS, help="ipopt, or highs for whole square meters of panels")
+    parser.add_argument("--option", action="append", type=parse_option, default=[], metavar="KEY=VALUE",
+                        help="solver option, can be repeated")
+    parser.add_argument("--preset", choices=sorted(src.solver_budget.SolverBudget.presets),
+                        help="tolerance preset of the solver")
+    parser.add_argument("--timeout", type=float, help="seconds each job may run, solving included")
+    parser.add_argument("--profile", action="store_true", default=None,
+                        help="write a trace.json timeline and cProfile statistics of every job")
+    parser.add_argument("--cache", help="directory of a result cache shared by all jobs, repeats load their result")
+    parser.add_argument("--workers", type=int, default=1, help="number of jobs solved at the same time")
+    parser.add_argument("--output", required=True, help="directory for results and metrics")
+
+    return parser
+
+
+def main(argv=None):
+    """
+    Runs the command line interface.
+
+    Args:
+        argv (list of str):
+            The arguments. Default: None, the arguments of the process.
+
+    Returns:
+        int:
+            Exit code, 0 if all jobs were solved.
+    """
+
+    parser = create_parser()
+    arguments = parser.parse_args(argv)
+    if arguments.scenario is not None and arguments.grid is None:
+        parser.error("--scenario needs --grid, scenarios of a job file belong into the file.")
+
+    # Arguments given on the command line are defaults of the jobs.
+    defaults = {"backend": arguments.backend, "preset": arguments.preset, "timeout": arguments.timeout,
+                "profile": arguments.profile,
+                "cache": None if arguments.cache is None else os.path.abspath(arguments.cache),
+                "solver_options": dict(arguments.option) or None}
+    defaults = {key: value for key, value in defaults.items() if value is not None}
+    if arguments.grid is not None:
+        jobs = [{"name": os.path.basename(os.path.normpath(arguments.grid)), **defaults,
+                 "grid": arguments.grid, "scenario": arguments.scenario}]
+    else:
+        jobs = load_jobs(arguments.jobs, defaults)
+
+    def report(metrics):
+        objective = "-" if metrics["objective"] is None else f"{metrics['objective']:.6g}"
+        print(f"{metrics['name']}: {metrics['status']}, objective {objective}, {metrics['times']['total']:.2f} s",
+              flush=True)
+
+    summary = run_jobs(jobs, arguments.output, arguments.workers, report)
+
+    return 0 if all(metrics["status"] == "solved" for metrics in summary) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,197 @@
+import numpy as np
+
+
+class InfeasibleGridError(ValueError):
+    """
+    Raised when a grid can not satisfy its power draws, before any solver is started.
+
+    Args:
+        report (FeasibilityReport):
+            The failed checks.
+    """
+
+    def __init__(self, report):
+        super().__init__(str(report))
+        self.report = report
+
+
+class FeasibilityReport:
+    """
+    Outcome of the feasibility pre-check. Every issue is a proof of infeasibility, an empty report does not prove
+    feasibility.
+
+    Each issue is a dict with:
+        "check": "bus cut", "slack cut" or "island".
+        "buses": keys of the buses on the demand side of the cut, see Grid.ids.
+        "lines": keys of the lines crossing the cut.
+        "snapshots": positions of the snapshots at which the cut is violated.
+        "shortfall": largest missing power over those snapshots.
+    """
+
+    def __init__(self):
+        self._issues = []
+
+    @property
+    def issues(self):
+        return self._issues
+
+    @property
+    def feasible(self):
+        return len(self.issues) == 0
+
+    def add_issue(self, check, buses, lines, snapshots, shortfall):
+        self._issues.append({"check": check, "buses": [str(bus) for bus in buses],
+                             "lines": [str(line) for line in lines], "snapshots": [int(t) for t in snapshots],
+                             "shortfall": float(shortfall)})
+
+    def __str__(self):
+        if self.feasible:
+            return "No infeasibility found."
+
+        messages = []
+        for issue in self.issues:
+            messages.append(f"{issue['check']}: buses {issue['buses']} miss up to {issue['shortfall']:.2f} over "
+                            f"lines {issue['lines']} at snapshots {issue['snapshots']}")
+
+        return "Grid is infeasible. " + "; ".join(messages)
+
+
+def check_feasibility(grid, snapshots=None, power_draws=None):
+    """
+    Proves infeasibility with capacity bounds, vectorized over all buses and snapshots.
+
+    A set of buses can at most receive the summed ratings of the lines leaving the set plus what its roofs produce
+    if they were fully covered with panels, as far as the total panel size allows, plus what its storages can
+    discharge. Three kinds of sets are checked: every single bus ("bus cut"), all buses but the generator buses
+    ("slack cut"), where imports are also limited by the generator capacities, and groups of buses without any
+    connection to a generator bus ("island").
+
+    Args:
+        grid (Grid):
+            The grid to check.
+
+        snapshots (list, numpy.ndarray):
+            Points in time to check. Defaults to the snapshots of the grid.
+
+        power_draws (numpy.ndarray):
+            Matrix with the power draw of Bus_i at snapshot t in its entry [t, i], excluding the generator buses.
+            Defaults to the power draws stored in the buses.
+
+    Returns:
+        FeasibilityReport:
+            All violated cuts.
+    """
+
+    if snapshots is None:
+        snapshots = grid.snapshots
+    n = len(grid.building_buses)     # Generator buses are the last buses
+    if power_draws is None:
+        power_draws = np.array([bus.power_draw for bus in grid.buses[:n]], dtype=float).T.reshape(len(snapshots), n)
+    power_draws = np.asarray(power_draws, dtype=float)
+
+    report = FeasibilityReport()
+    if power_draws.size == 0:
+        return report
+
+    bus_ids = grid.ids.bus_keys
+    line_ids = grid.ids.line_keys
+    bus0, bus1, _, ratings = grid.create_line_arrays()
+
+    own_snapshots = snapshots is grid.snapshots
+    # Production per square meter of panel of every building at every snapshot.
+    coefficients = grid.create_sun_matrix(None if own_snapshots else snapshots) * grid.create_panel_output_vector()[:n]
+    roof_sizes = np.array([bus.roof_size for bus in grid.buses[:n]], dtype=float)
+    total_panel_size = grid.total_panel_size if grid.total_panel_size is not None else roof_sizes.sum()
+    storages = [bus.storage for bus in grid.buses[:n]]
+    discharge = np.array([0 if storage is None else np.inf if storage.discharge_limit is None
+                          else storage.discharge_limit for storage in storages], dtype=float)
+
+    # Bus cut: what a single bus can get from its own roof and its lines.
+    incident_rating = np.bincount(bus0, ratings, len(grid.buses)) + np.bincount(bus1, ratings, len(grid.buses))
+    own_production = coefficients * np.minimum(roof_sizes, total_panel_size)[None, :]
+    shortfall = power_draws - own_production - incident_rating[None, :n] - discharge[None, :]
+    for i in np.flatnonzero((shortfall > 0).any(axis=0)):
+        incident = np.flatnonzero((bus0 == i) | (bus1 == i))
+        report.add_issue("bus cut", [bus_ids[i]], line_ids[incident], np.flatnonzero(shortfall[:, i] > 0),
+                         shortfall[:, i].max())
+
+    # Slack cut: everything not produced on the roofs has to come over the lines of the generator buses.
+    slack_lines = np.flatnonzero((bus0 >= n) != (bus1 >= n))
+    total_production = maximum_production(coefficients, roof_sizes, total_panel_size)
+    capacities = [generator.capacity for generator in grid.generators]
+    max_import = ratings[slack_lines].sum()
+    if None not in capacities:
+        max_import = min(max_import, sum(capacities))
+    shortfall = power_draws.sum(axis=1) - total_production - max_import - discharge.sum()
+    if (shortfall > 0).any():
+        report.add_issue("slack cut", bus_ids[:n], line_ids[slack_lines], np.flatnonzero(shortfall > 0),
+                         shortfall.max())
+
+    # Islands: buses without connection to any generator bus only have their own roofs.
+    labels = connected_components(bus0, bus1, len(grid.buses))
+    for label in np.setdiff1d(labels[:n], labels[n:]):
+        members = np.flatnonzero(labels[:n] == label)
+        production = maximum_production(coefficients[:, members], roof_sizes[members], total_panel_size)
+        shortfall = power_draws[:, members].sum(axis=1) - production - discharge[members].sum()
+        if (shortfall > 0).any():
+            report.add_issue("island", bus_ids[members], [], np.flatnonzero(shortfall > 0), shortfall.max())
+
+    return report
+
+
+def maximum_production(coefficients, roof_sizes, total_panel_size):
+    """
+    Most power a set of roofs can produce at each snapshot if the total panel size goes to the best roofs first.
+
+    Args:
+        coefficients (numpy.ndarray):
+            Matrix with the production per square meter of roof i at snapshot t in its entry [t, i].
+
+        roof_sizes (numpy.ndarray):
+            Size of each roof.
+
+        total_panel_size (int, float):
+            Available square meters of panels.
+
+    Returns:
+        numpy.ndarray:
+            Production for each snapshot.
+    """
+
+    order = np.argsort(-coefficients, axis=1)
+    sorted_roofs = roof_sizes[order]
+    used_before = np.cumsum(sorted_roofs, axis=1) - sorted_roofs
+    panels = np.clip(total_panel_size - used_before, 0, sorted_roofs)
+
+    return (np.take_along_axis(coefficients, order, axis=1) * panels).sum(axis=1)
+
+
+def connected_components(bus0, bus1, num_buses):
+    """
+    Labels the connected components of a grid by propagating the smallest bus position along the lines.
+
+    Args:
+        bus0 (numpy.ndarray):
+            Position of the start bus of each line.
+
+        bus1 (numpy.ndarray):
+            Position of the end bus of each line.
+
+        num_buses (int):
+            Number of buses.
+
+    Returns:
+        numpy.ndarray:
+            Label of each bus, buses share a label if and only if they are connected.
+    """
+
+    labels = np.arange(num_buses)
+    while True:
+        smaller = np.minimum(labels[bus0], labels[bus1])
+        new_labels = labels.copy()
+        np.minimum.at(new_labels, bus0, smaller)
+        np.minimum.at(new_labels, bus1, smaller)
+        new_labels = new_labels[new_labels]     # Jump along already found labels to converge faster
+        if np.array_equal(new_labels, labels):
+            return labels
+        labels = new_labels
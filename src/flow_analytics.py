@@ -0,0 +1,293 @@
+import numpy as np
+import pandas as pd
+
+
+def find_entries(flow_rows, flow_cols, rows, cols, num_buses):
+    """
+    Positions of current matrix entries among the stored entries of a result.
+
+    Args:
+        flow_rows (numpy.ndarray):
+            Row of each stored entry.
+
+        flow_cols (numpy.ndarray):
+            Column of each stored entry.
+
+        rows (numpy.ndarray):
+            Rows of the wanted entries.
+
+        cols (numpy.ndarray):
+            Columns of the wanted entries.
+
+        num_buses (int):
+            Number of buses, the size of the current matrices.
+
+    Returns:
+        numpy.ndarray:
+            Position of each wanted entry, -1 if it is not stored and therefore zero.
+    """
+
+    keys = np.asarray(flow_cols) * num_buses + np.asarray(flow_rows)
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    wanted = np.asarray(cols) * num_buses + np.asarray(rows)
+
+    if sorted_keys.size == 0:
+        return np.full(wanted.shape, -1)
+    found = np.minimum(np.searchsorted(sorted_keys, wanted), sorted_keys.size - 1)
+
+    return np.where(sorted_keys[found] == wanted, order[found], -1)
+
+
+def gather(flow_values, positions):
+    """
+    Takes entries out of the last axis of the flows, zero for positions of -1.
+    """
+
+    return np.where(positions >= 0, flow_values[..., np.maximum(positions, 0)], 0)
+
+
+class FlowAnalytics:
+    """
+    Line loading, congestion and self-consumption of a solved grid, computed on the flow arrays for all snapshots,
+    and scenarios if there are several, at once.
+
+    Currents are taken as the results store them: entry [i, j] of a current matrix is the current from Bus_j to
+    Bus_i and the diagonal is the production of the bus. A line's loading is the current on it in both directions
+    over its rating, like the line rating constraints measure it.
+
+    Args:
+        grid (Grid):
+            The grid the flows belong to, for its lines, ratings and power draws.
+
+        flow_values (numpy.ndarray):
+            Stored entries of the current matrices, shape (snapshots, entries), or (scenarios, snapshots, entries).
+
+        flow_index (tuple of numpy.ndarray):
+            Row and column of each stored entry.
+
+        snapshots (list, numpy.ndarray):
+            Points in time of the snapshots. Default: None, the snapshots of the grid.
+    """
+
+    def __init__(self, grid, flow_values, flow_index, snapshots=None):
+
+        flow_values = np.asarray(flow_values, dtype=float)
+        assert flow_values.ndim in (2, 3)
+        if snapshots is None:
+            snapshots = grid.snapshots
+        snapshots = np.asarray(snapshots, dtype=float)
+        assert flow_values.shape[-2] == snapshots.size
+
+        flow_rows, flow_cols = (np.asarray(index, dtype=int).reshape(-1) for index in flow_index)
+        assert flow_values.shape[-1] == flow_rows.size == flow_cols.size
+
+        num_buses = len(grid.buses)
+        bus0, bus1, _, ratings = grid.create_line_arrays()
+        diagonal = np.arange(num_buses)
+
+        self._grid = grid
+        self._snapshots = snapshots
+        self._flow_values = flow_values
+        self._ratings = ratings
+        self._from_bus0 = gather(flow_values, find_entries(flow_rows, flow_cols, bus1, bus0, num_buses))
+        self._from_bus1 = gather(flow_values, find_entries(flow_rows, flow_cols, bus0, bus1, num_buses))
+        self._production = gather(flow_values, find_entries(flow_rows, flow_cols, diagonal, diagonal, num_buses))
+
+    @classmethod
+    def from_result(cls, grid, result, num_scenarios=1):
+        """
+        Analyses an OptimisationResult of the grid.
+
+        Args:
+            grid (Grid):
+                The grid that was optimised.
+
+            result (OptimisationResult):
+                Its result.
+
+            num_scenarios (int):
+                Number of scenarios stacked in the result's snapshots, e.g. by StochasticOptimisation, they are
+                split into their own axis. Default: 1
+
+        Returns:
+            FlowAnalytics:
+                The analytics of the result.
+        """
+
+        flow_values = result.flow_values
+        snapshots = result.snapshots
+        if num_scenarios > 1:
+            assert snapshots.size % num_scenarios == 0
+            flow_values = flow_values.reshape(num_scenarios, -1, flow_values.shape[-1])
+            snapshots = snapshots[:flow_values.shape[1]]
+
+        return cls(grid, flow_values, (result.flow_rows, result.flow_cols), snapshots)
+
+    @property
+    def grid(self):
+        return self._grid
+
+    @property
+    def snapshots(self):
+        return self._snapshots
+
+    @property
+    def num_scenarios(self):
+        return 1 if self._flow_values.ndim == 2 else self._flow_values.shape[0]
+
+    @property
+    def net_flow(self):
+        """
+        Current on every line from bus0 to bus1, negative if it flows the other way.
+
+        Returns:
+            numpy.ndarray:
+                Shape ([scenarios,] snapshots, lines).
+        """
+
+        return self._from_bus0 - self._from_bus1
+
+    @property
+    def direction(self):
+        """
+        Sign of the net flow of every line: 1 from bus0 to bus1, -1 the other way, 0 without flow.
+
+        Returns:
+            numpy.ndarray:
+                Shape ([scenarios,] snapshots, lines).
+        """
+
+        return np.sign(self.net_flow).astype(np.int8)
+
+    @property
+    def utilisation(self):
+        """
+        Loading of every line, the current in both directions over its rating. Lines without rating carry nothing.
+
+        Returns:
+            numpy.ndarray:
+                Shape ([scenarios,] snapshots, lines), 1 is a fully loaded line.
+        """
+
+        return (self._from_bus0 + self._from_bus1) / np.where(self._ratings > 0, self._ratings, np.inf)
+
+    @property
+    def production(self):
+        """
+        Production of every bus, panel output of buildings and import of generators.
+
+        Returns:
+            numpy.ndarray:
+                Shape ([scenarios,] snapshots, buses).
+        """
+
+        return self._production
+
+    def reversal_share(self):
+        """
+        Share of the snapshots at which a line carries current against its main direction, e.g. feeders that
+        export at noon and import in the evening.
+
+        Returns:
+            pandas.Series:
+                The share of every line, indexed by line key.
+        """
+
+        direction = self.direction.reshape(-1, self._ratings.size)
+        main = np.sign(self.net_flow.reshape(-1, self._ratings.size).sum(axis=0))
+        against = (direction != 0) & (direction != main)
+
+        return pd.Series(against.mean(axis=0), index=self.grid.ids.line_keys)
+
+    def congestion_hotspots(self, threshold=0.9):
+        """
+        All loadings of lines at or above a threshold, highest first.
+
+        Args:
+            threshold (int, float):
+                Loading that counts as congested, 1 is the full rating. Default: 0.9
+
+        Returns:
+            pandas.DataFrame:
+                One row per congested line and snapshot with the columns "scenario" (only with several scenarios),
+                "snapshot", "line" (its key) and "utilisation".
+        """
+
+        utilisation = self.utilisation
+        hot = np.nonzero(utilisation >= threshold)
+        columns = {"snapshot": self.snapshots[hot[-2]], "line": self.grid.ids.line_keys[hot[-1]],
+                   "utilisation": utilisation[hot]}
+        if utilisation.ndim == 3:
+            columns = {"scenario": hot[0], **columns}
+
+        return pd.DataFrame(columns).sort_values("utilisation", ascending=False, kind="stable").reset_index(drop=True)
+
+    def congested_lines_per_snapshot(self, threshold=0.9):
+        """
+        Number of lines at or above a threshold loading at every snapshot.
+
+        Args:
+            threshold (int, float):
+                Loading that counts as congested. Default: 0.9
+
+        Returns:
+            numpy.ndarray:
+                Shape ([scenarios,] snapshots).
+        """
+
+        return (self.utilisation >= threshold).sum(axis=-1)
+
+    def self_consumption(self, power_draws=None):
+        """
+        Share of the panel output of every building that it uses itself, summed over all snapshots.
+
+        Args:
+            power_draws (numpy.ndarray):
+                Power draws of the buildings, shape ([scenarios,] snapshots, buildings). Default: None, the power
+                draws stored in the buses.
+
+        Returns:
+            pandas.Series or pandas.DataFrame:
+                The share of every building indexed by its key, with several scenarios one row per scenario.
+                Buildings without panel output get NaN.
+        """
+
+        buildings = self.grid.building_buses
+        n = len(buildings)
+        if power_draws is None:
+            power_draws = np.array([bus.power_draw for bus in buildings], dtype=float).T.reshape(-1, n)
+        power_draws = np.asarray(power_draws, dtype=float)
+
+        production = np.maximum(self.production[..., :n], 0)
+        used = np.minimum(production, power_draws).sum(axis=-2)
+        total = production.sum(axis=-2)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            share = np.where(total > 0, used / total, np.nan)
+
+        keys = self.grid.ids.bus_keys[:n]
+        if share.ndim == 2:
+            return pd.DataFrame(share, columns=keys)
+        return pd.Series(share, index=keys)
+
+    def rank_lines(self, threshold=0.9):
+        """
+        Lines ordered by how urgently they need reinforcement: by their peak loading, then by how often they are
+        congested.
+
+        Args:
+            threshold (int, float):
+                Loading that counts as congested. Default: 0.9
+
+        Returns:
+            pandas.DataFrame:
+                Indexed by line key, with the columns "peak" and "mean" loading and "congested", the share of
+                snapshots (of all scenarios) at or above the threshold.
+        """
+
+        utilisation = self.utilisation.reshape(-1, self._ratings.size)
+        ranking = pd.DataFrame({"peak": utilisation.max(axis=0, initial=0), "mean": utilisation.mean(axis=0),
+                                "congested": (utilisation >= threshold).mean(axis=0)},
+                               index=self.grid.ids.line_keys)
+
+        return ranking.sort_values(["peak", "congested"], ascending=False, kind="stable")
@@ -0,0 +1,109 @@
+import itertools
+
+import numpy as np
+
+import src.bus
+
+
+class Generator:
+    """
+    Connection of the grid to a power source, e.g. a transformer to the medium voltage grid, placed at a bus.
+    Its production can be negative, then power is fed back out of the grid.
+
+    Args:
+        bus (Bus):
+            The bus the generator is placed at. It has no roof in the optimisation.
+
+        capacity (int, float):
+            Maximum production per snapshot. Greater or equal to zero. Default: None, unlimited.
+
+        cost (int, float, list of tuple):
+            Cost per unit of production, or the breakpoints (production, cost) of a convex piecewise-linear cost
+            curve, which is continued linearly beyond its first and last breakpoint.
+            Default: None, GENERATOR_COST of the optimisation task.
+    """
+
+    id_counter = itertools.count()
+
+    def __init__(self, bus, capacity=None, cost=None):
+        self._id = next(Generator.id_counter)
+
+        self._bus = None
+        self._capacity = None
+        self._cost = None
+
+        self.bus = bus
+        self.capacity = capacity
+        self.cost = cost
+
+    @property
+    def id(self):
+        return self._id
+
+    @id.setter
+    def id(self, value):
+        raise PermissionError("Setting of id is not allowed.")
+
+    @property
+    def bus(self):
+        return self._bus
+
+    @bus.setter
+    def bus(self, value):
+        if self._bus is not None:
+            raise PermissionError("The bus of a generator can be set only once.")
+
+        assert isinstance(value, src.bus.Bus)
+        self._bus = value
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @capacity.setter
+    def capacity(self, value):
+        assert isinstance(value, (type(None), int, float))
+        if value is not None:
+            assert value >= 0
+
+        self._capacity = value
+
+    @property
+    def cost(self):
+        return self._cost
+
+    @cost.setter
+    def cost(self, value):
+        if isinstance(value, (list, tuple)):
+            breakpoints = np.asarray(value, dtype=float)
+            assert breakpoints.ndim == 2 and breakpoints.shape[1] == 2
+            assert breakpoints.shape[0] >= 2
+            assert (np.diff(breakpoints[:, 0]) > 0).all()       # Productions strictly increasing
+
+            slopes = np.diff(breakpoints[:, 1]) / np.diff(breakpoints[:, 0])
+            assert (np.diff(slopes) >= -1e-12).all()            # Convex, otherwise the epigraph is wrong
+        else:
+            assert isinstance(value, (type(None), int, float))
+
+        self._cost = value
+
+    @property
+    def piecewise(self):
+        return isinstance(self.cost, (list, tuple))
+
+    def cost_segments(self):
+        """
+        Describes the piecewise-linear cost curve as lines whose maximum is the cost.
+
+        Returns:
+            tuple of numpy.ndarray:
+                Slope and intercept of each segment.
+        """
+
+        assert self.piecewise
+
+        breakpoints = np.asarray(self.cost, dtype=float)
+        slopes = np.diff(breakpoints[:, 1]) / np.diff(breakpoints[:, 0])
+        intercepts = breakpoints[:-1, 1] - slopes * breakpoints[:-1, 0]
+
+        return slopes, intercepts
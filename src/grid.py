@@ -1,10 +1,24 @@
+import asyncio
+import concurrent.futures
 import itertools
+import threading
+import warnings
 import pandas as pd
 import numpy as np
 
 import src.bus
+import src.generator
 import src.line
 import src.optimisation_task
+import src.panel_heuristic
+import src.path_index
+import src.feasibility_check
+import src.flow_analytics
+import src.grid_archive
+import src.grid_expansion
+import src.id_namespace
+import src.line_upgrade
+import src.stochastic_optimisation
 
 
 class Grid:
@@ -21,26 +35,35 @@ class Grid:
 
         snapshots (Snapshots):
             Points in time with an efficiency and a power draw for each bus, both for each time point. Default: None
+
+        generators (list of Generator instances):
+            Connections to power sources. Their buses have to be the last buses and include the slack bus.
+            Default: None, a single generator at the slack bus with unlimited capacity.
     """
 
     id_counter = itertools.count()
 
-    def __init__(self, buses=None, lines=None, slack_bus=None, snapshots=None, total_panel_size=None):
+    def __init__(self, buses=None, lines=None, slack_bus=None, snapshots=None, total_panel_size=None,
+                 generators=None):
         self._id = next(Grid.id_counter)
 
         self._buses = None
         self._lines = None
         self._snapshots = None
         self._slack_bus = None
+        self._generators = None
         self._panels = None
         self._paths = None
+        self._ids = None
         self._optimisation_task = None
+        self._result = None
         self._total_panel_size = None
 
         self.buses = buses
         self.lines = lines
         self.snapshots = snapshots
         self.slack_bus = slack_bus
+        self.generators = generators
         self._total_panel_size = total_panel_size
 
     @property
@@ -88,6 +111,8 @@ class Grid:
             unique_lines.append(line)
 
         self._lines = value
+        self._paths = None      # The topology changed, paths are found again when needed.
+        self._ids = None
 
     @property
     def panels(self):
@@ -126,6 +151,32 @@ class Grid:
             assert isinstance(value, src.bus.Bus)
             self._slack_bus = value
 
+    @property
+    def generators(self):
+        return self._generators
+
+    @generators.setter
+    def generators(self, value):
+        if self.generators is not None:
+            raise PermissionError("Generators can be set only once!")
+
+        if value is None:
+            value = [src.generator.Generator(self.slack_bus)]
+        assert isinstance(value, list)
+        for item in value:
+            assert isinstance(item, src.generator.Generator)
+            assert item.bus in self.buses
+        assert self.slack_bus in [generator.bus for generator in value]
+
+        self._generators = value
+
+    @property
+    def building_buses(self):
+        """
+        Buses that can carry panels and draw power, all buses except the generator buses at the end of the list.
+        """
+        return self.buses[:len(self.buses) - len(self.generators)]
+
     @property
     def optimisation_task(self):
         return self._optimisation_task
@@ -138,6 +189,50 @@ class Grid:
         else:
             raise PermissionError("Optimisation task is only settable once to prevent errors.")
 
+    @property
+    def total_panel_size(self):
+        return self._total_panel_size
+
+    @property
+    def result(self):
+        return self._result
+
+    @property
+    def paths(self):
+        """
+        Shortest paths of all buses to the slack bus, computed when first needed and kept until the lines change.
+
+        Returns:
+            PathIndex:
+                Distances, hop counts, bottleneck ratings and predecessors, indexed by bus position.
+        """
+        if self._paths is None:
+            self._paths = src.path_index.PathIndex.from_grid(self)
+
+        return self._paths
+
+    @property
+    def ids(self):
+        """
+        Positions and stable keys of the buses, lines, line types and generators, the same in every process that
+        builds the grid. Created when first needed and kept until the lines change.
+
+        Returns:
+            IdNamespace:
+                The grid's namespace.
+        """
+
+        if self._ids is None:
+            self._ids = src.id_namespace.IdNamespace.from_grid(self)
+
+        return self._ids
+
+    def __getstate__(self):
+        # The CasADi problem can not be pickled, workers build their own one from the grid.
+        state = self.__dict__.copy()
+        state["_optimisation_task"] = None
+        return state
+
     # TODO: Next two methods can be simplified.
     def create_line_rating_matrix(self):
         """
@@ -166,7 +261,7 @@ class Grid:
 
         for bus in self.buses:
             i = bus.id
-            line_ratings.loc[i, i] = bus.roof_size * bus.panel.output_per_sqm
+            line_ratings.loc[i, i] = bus.roof_size * bus.panel.effective_output_per_sqm
 
         return line_ratings
 
@@ -182,7 +277,7 @@ class Grid:
         """
 
         line_length = pd.DataFrame(index=[bus.id for bus in self.buses], columns=[bus.id for bus in self.buses])
-        line_length = line_length.fillna(99999999999)
+        line_length = line_length.fillna(src.optimisation_task.NO_LINE_LENGTH)
 
         for line in self.lines:
             bus0 = line.bus0.id
@@ -200,6 +295,24 @@ class Grid:
 
         return line_length
 
+    def create_line_arrays(self):
+        """
+        Describes the lines as arrays, with the buses given by their position in the bus list.
+
+        Returns:
+            tuple of numpy.ndarray:
+                Start bus, end bus, length and rating of each line, in the order of the line list.
+        """
+
+        positions = {bus: position for position, bus in enumerate(self.buses)}
+
+        bus0 = np.array([positions[line.bus0] for line in self.lines], dtype=int)
+        bus1 = np.array([positions[line.bus1] for line in self.lines], dtype=int)
+        lengths = np.array([line.length for line in self.lines], dtype=float)
+        ratings = np.array([line.line_type.rating for line in self.lines], dtype=float)
+
+        return bus0, bus1, lengths, ratings
+
     def create_area_vector(self):
         """
         Creates a Vector A that has the roof area of Bus_i in its i-th entry.
@@ -218,46 +331,523 @@ class Grid:
 
     def get_panel_output_per_sqm(self):
         """
-        Output of any solar panel per square meter.
+        Output per square meter in full sun shared by all solar panels of the grid, including their orientation.
+        Use create_panel_output_vector for grids whose panels differ.
 
         Returns:
-            (int, float):
+            float:
                 Output of any solar panel per square meter.
 
+        Raises:
+            ValueError:
+                If the panels of the buildings differ in their output.
         """
 
-        return self.buses[0].panel.output_per_sqm       # All panels currently have the same output per sqm.
+        outputs = self.create_panel_output_vector()[:len(self.building_buses)]
+        if outputs.size == 0:
+            return float(self.buses[0].panel.effective_output_per_sqm)
+        if not np.allclose(outputs, outputs[0]):
+            raise ValueError("The panels differ in their output, use create_panel_output_vector.")
 
-    def create_optimisation_task(self):
+        return float(outputs[0])
+
+    def create_panel_output_vector(self):
         """
-        Creates the problem to be optimised .
+        Output per square meter in full sun of the panel of each bus, including its orientation.
+
+        Returns:
+            numpy.ndarray:
+                One entry per bus, in the order of the bus list.
+        """
+
+        return np.array([bus.panel.effective_output_per_sqm for bus in self.buses], dtype=float)
+
+    def create_sun_matrix(self, snapshots=None):
+        """
+        Sun factor of every building at every snapshot. Buses with a sun profile use it, the others the sun of the
+        optimisation task. Sun profiles belong to the grid's snapshots and are ignored for other snapshots.
+
+        Args:
+            snapshots (list, numpy.ndarray):
+                Points in time. Defaults to the snapshots of the grid.
+
+        Returns:
+            numpy.ndarray:
+                Matrix with the sun factor of Bus_i at snapshot t in its entry [t, i], excluding the generator buses.
+        """
+
+        own_snapshots = snapshots is None
+        if own_snapshots:
+            snapshots = self.snapshots
+
+        sun = np.atleast_1d(src.optimisation_task.OptimisationTask.sun(snapshots))
+        sun_matrix = np.repeat(sun[:, None], len(self.building_buses), axis=1)
+        if own_snapshots:
+            for i, bus in enumerate(self.building_buses):
+                if bus.sun_profile is not None:
+                    assert len(bus.sun_profile) == len(snapshots)
+                    sun_matrix[:, i] = bus.sun_profile
+
+        return sun_matrix
+
+    def create_loss_table(self):
         """
+        Describes the lines with losses, the buses given by their position in the bus list.
+
+        Returns:
+            pandas.DataFrame:
+                One row per line with losses, columns bus0, bus1, coefficient and segments.
+        """
+
+        positions = {bus: position for position, bus in enumerate(self.buses)}
+        rows = [(positions[line.bus0], positions[line.bus1], float(line.loss_coefficient), line.loss_segments)
+                for line in self.lines if line.loss_coefficient is not None]
+
+        return pd.DataFrame(rows, columns=["bus0", "bus1", "coefficient", "segments"])
+
+    def new_optimisation_task(self, snapshots=None, power_draws=None):
+        """
+        Creates an optimisation task for the grid without building its problem or setting it as the grid's task.
+        Allows solving the grid for other time frames than its own snapshots.
+
+        Args:
+            snapshots (list, numpy.ndarray):
+                Points in time to optimise for. Defaults to the snapshots of the grid.
+
+            power_draws (numpy.ndarray):
+                Matrix with the power draw of Bus_i at snapshot t in its entry [t, i], excluding the generator buses.
+                Defaults to the power draws stored in the buses.
+
+        Returns:
+            OptimisationTask:
+                The task, its problem still has to be created.
+        """
+
+        sun_factors = self.create_sun_matrix(snapshots)
+        if snapshots is None:
+            snapshots = self.snapshots
 
         line_lengths = self.create_length_matrix()
         line_ratings = self.create_line_rating_matrix()
         a = self.create_area_vector()
         total_panel_size = self._total_panel_size
-        panel_output_per_sqm = self.get_panel_output_per_sqm()
+        panel_output_per_sqm = self.create_panel_output_vector()
 
-        self.optimisation_task = src.optimisation_task.OptimisationTask(line_lengths, line_ratings, a, total_panel_size,
-                                                                        panel_output_per_sqm, self.snapshots,
-                                                                        self.buses)
-        self.optimisation_task.create_optimisation_task()
+        return src.optimisation_task.OptimisationTask(line_lengths, line_ratings, a, total_panel_size,
+                                                      panel_output_per_sqm, snapshots, self.buses, power_draws,
+                                                      self.generators, sun_factors, self.create_loss_table())
 
-    def optimise(self):
+    def check_feasibility(self, snapshots=None, power_draws=None):
+        """
+        Looks for proof that the power draws can not be satisfied, using capacity bounds only, no solver.
+
+        Args:
+            snapshots (list, numpy.ndarray):
+                Points in time to check. Defaults to the snapshots of the grid.
+
+            power_draws (numpy.ndarray):
+                Matrix with the power draw of Bus_i at snapshot t in its entry [t, i], excluding the generator buses.
+                Defaults to the power draws stored in the buses.
+
+        Returns:
+            FeasibilityReport:
+                The violated cuts naming buses, lines and snapshots.
+        """
+
+        return src.feasibility_check.check_feasibility(self, snapshots, power_draws)
+
+    def create_optimisation_task(self, integer_sizing=None, feasibility_check="raise", profiler=None):
+        """
+        Creates the problem to be optimised .
+
+        Args:
+            integer_sizing (IntegerPanelSizing):
+                If given, panel areas become whole multiples of panel units, optimised as mixed-integer problem,
+                instead of being rounded after optimising. Default: None
+
+            feasibility_check (str):
+                What to do if the pre-check proves the grid infeasible: "raise" an InfeasibleGridError, "warn" or
+                "off" to skip the check. Default: "raise"
+
+            profiler (Profiler):
+                Records the feasibility check, every problem builder and later the solver runs of the task.
+                Default: None
+
+        Raises:
+            InfeasibleGridError:
+                If the grid is infeasible and feasibility_check is "raise".
+        """
+
+        assert feasibility_check in ("raise", "warn", "off")
+        if feasibility_check != "off":
+            if profiler is None:
+                report = self.check_feasibility()
+            else:
+                with profiler.record("check_feasibility", "check"):
+                    report = self.check_feasibility()
+            if not report.feasible:
+                if feasibility_check == "raise":
+                    raise src.feasibility_check.InfeasibleGridError(report)
+                warnings.warn(str(report))
+
+        task = self.new_optimisation_task()
+        if profiler is not None:
+            task.profiler = profiler
+        self.optimisation_task = task
+        self.optimisation_task.create_optimisation_task(integer_sizing)
+
+    def optimise(self, solver_options=None, verbose=True, budget=None):
         """
         Executes the optimisation task.
 
+        Args:
+            solver_options (dict):
+                Options handed to IPOPT. Default: None
+
+            verbose (bool):
+                If False neither IPOPT nor the solution are printed. Default: True
+
+            budget (SolverBudget):
+                Time and iteration limits and tolerance preset. If it runs out, the best point found is built out,
+                check result.budget_exhausted and result.feasible. Default: None
+
         Returns:
 
         """
 
-        solution, xt, a = self.optimisation_task.optimise()
+        self.optimisation_task.optimise(solver_options, verbose, budget)
 
-        self.create_build_out(solution, a)
+        # Integer panel sizes are exact already, rounding could break their panel units.
+        self.apply_result(self.optimisation_task.result, self.optimisation_task.integer_sizing is None)
 
         return self
 
+    async def optimise_async(self, timeout=None, executor=None, solver_options=None, budget=None):
+        """
+        Creates and solves the optimisation task without blocking the event loop.
+        Model building and IPOPT run in the executor, the grid's own optimisation task is not touched.
+        Nothing is printed.
+
+        If the call times out or gets cancelled, IPOPT is stopped at its next iteration when running in a thread.
+        Process pool workers can not be reached, they stop on their own as the timeout is also handed to IPOPT as
+        max_wall_time.
+
+        Args:
+            timeout (int, float):
+                Seconds after which asyncio.TimeoutError is raised. Default: None, no limit.
+
+            executor (concurrent.futures.Executor):
+                Where to run the optimisation, e.g. a ProcessPoolExecutor to use several cores.
+                Default: None, the default thread pool of the event loop.
+
+            solver_options (dict):
+                Options handed to IPOPT. Default: None
+
+            budget (SolverBudget):
+                Time and iteration limits and tolerance preset. Default: None
+
+        Returns:
+            OptimisationResult:
+                The result, its rounded panel sizes are also built out on the buses.
+        """
+
+        solver_options = dict(solver_options or {})
+        if timeout is not None:
+            assert isinstance(timeout, (int, float))
+            assert timeout > 0
+            solver_options.setdefault("max_wall_time", float(timeout))
+
+        cancel_event = None
+        if not isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+            cancel_event = threading.Event()     # Events can not be pickled into other processes.
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(executor, optimise_grid, self, solver_options, cancel_event, budget)
+        try:
+            result = await asyncio.wait_for(future, timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            if cancel_event is not None:
+                cancel_event.set()
+            raise
+
+        self.apply_result(result)
+
+        return result
+
+    def optimise_cached(self, cache, solver_options=None, integer_sizing=None, budget=None):
+        """
+        Optimises the grid through a result cache and builds out the panel sizes. Repeated requests are loaded
+        instead of solved, see ResultCache.
+
+        Args:
+            cache (ResultCache):
+                The cache.
+
+            solver_options (dict):
+                Options handed to IPOPT, or HiGHS with integer sizing. Default: None
+
+            integer_sizing (IntegerPanelSizing):
+                Panel units of a mixed-integer problem. Default: None
+
+            budget (SolverBudget):
+                Time and iteration limits and tolerance preset. Default: None
+
+        Returns:
+            OptimisationResult:
+                The result, its statistics say in "cache" whether it was a "hit", a "warm start" or a "miss".
+        """
+
+        result = cache.optimise(self, solver_options=solver_options, integer_sizing=integer_sizing, budget=budget)
+        self.apply_result(result, integer_sizing is None)
+
+        return result
+
+    def place_panels_greedy(self, evaluate=True, solver_options=None):
+        """
+        Places the panels with the greedy heuristic instead of the solver and builds them out, see GreedyPlacement.
+
+        Args:
+            evaluate (bool):
+                Solves the currents for the placement and stores them as the grid's result. Default: True
+
+            solver_options (dict):
+                Options handed to IPOPT. Default: None
+
+        Returns:
+            GreedyPlacement:
+                The placement, with its panel sizes, estimated objective and, if evaluated, its result.
+        """
+
+        placement = src.panel_heuristic.GreedyPlacement(self)
+        panel_sizes = placement.solve()
+        if evaluate:
+            self.apply_result(placement.evaluate(solver_options), False)
+        else:
+            for bus, size in zip(self.building_buses, panel_sizes.tolist()):
+                bus.panel.size = size
+
+        return placement
+
+    def apply_result(self, result, round_sizes=True):
+        """
+        Stores a result as the grid's result and builds out its panel sizes.
+
+        Args:
+            result (OptimisationResult):
+                Result of optimising this grid.
+
+            round_sizes (bool):
+                Rounds the panel sizes to whole square meters, otherwise they are only cut to the roof sizes to
+                remove numerical noise. Default: True
+        """
+
+        # Generator buses have no panel in the optimisation
+        assert result.panel_sizes.size == len(self.building_buses)
+
+        if round_sizes:
+            new_panel_size = result.panel_sizes.round()
+        else:
+            roof_sizes = np.array([bus.roof_size for bus in self.building_buses], dtype=float)
+            new_panel_size = np.clip(result.panel_sizes, 0, roof_sizes)
+        for bus in range(len(new_panel_size)):
+            self.buses[bus].panel.size = float(new_panel_size[bus])
+
+        self._result = result
+
+    def optimise_stochastic(self, power_draws, sun=None, weights=None, decomposed=False, processes=None,
+                            solver_options=None):
+        """
+        Optimises the panel areas against weighted scenarios instead of the power draws of the buses and builds
+        them out. The currents are optimised for every scenario.
+
+        Args:
+            power_draws (numpy.ndarray):
+                Power draws of shape (scenarios, snapshots, buildings), e.g. from ScenarioSampler.sample.
+
+            sun (numpy.ndarray):
+                Sun factors of the same shape. Default: None, the sun of the grid in every scenario.
+
+            weights (list, numpy.ndarray):
+                Probability of each scenario. Default: None, all scenarios are equally likely.
+
+            decomposed (bool):
+                Solves the scenarios on their own with progressive hedging instead of all in one problem.
+                Default: False
+
+            processes (int):
+                Number of worker processes of the decomposed solve. Default: None, no worker processes.
+
+            solver_options (dict):
+                Options handed to IPOPT. Default: None
+
+        Returns:
+            OptimisationResult:
+                Panel areas and the currents of all scenarios, scenario after scenario.
+        """
+
+        optimisation = src.stochastic_optimisation.StochasticOptimisation(self, power_draws, sun, weights,
+                                                                          solver_options)
+        if decomposed:
+            result = optimisation.solve_decomposed(processes)
+        else:
+            result = optimisation.solve()
+        self.apply_result(result)
+
+        return result
+
+    def shadow_prices(self, result=None):
+        """
+        Maps the dual values of a result to the lines and buses of the grid, to rank upgrades without solving again.
+
+        Args:
+            result (OptimisationResult):
+                Result of optimising this grid. Defaults to the grid's result.
+
+        Returns:
+            dict:
+                "line rating": pandas.DataFrame with the snapshots as index and the line keys as columns, how much
+                the objective would drop per unit more rating of the line, both directions summed.
+                "power draw": pandas.DataFrame with the snapshots as index and the keys of the buildings as columns,
+                how much the objective would rise per unit more power draw of the bus.
+                "total panel size": how much the objective would drop per square meter more panels.
+        """
+
+        if result is None:
+            result = self.result
+        assert result is not None
+        if result.rating_duals is None or result.balance_duals is None:
+            raise ValueError("The result has no dual values, e.g. because the solver did not converge.")
+
+        bus0, bus1, _, _ = self.create_line_arrays()
+        num_buses = len(self.buses)
+        entries = pd.Series(np.arange(result.flow_rows.size), index=result.flow_cols * num_buses + result.flow_rows)
+        forward = entries.loc[bus1 * num_buses + bus0].values      # Current from bus1 to bus0
+        backward = entries.loc[bus0 * num_buses + bus1].values
+        line_duals = result.rating_duals[:, forward] + result.rating_duals[:, backward]
+
+        return {"line rating": pd.DataFrame(line_duals, index=result.snapshots,
+                                            columns=self.ids.line_keys),
+                "power draw": pd.DataFrame(result.balance_duals, index=result.snapshots,
+                                           columns=self.ids.bus_keys[:len(self.building_buses)]),
+                "total panel size": result.budget_dual}
+
+    def flow_analytics(self, result=None, num_scenarios=1):
+        """
+        Line loading, congestion and self-consumption of a result.
+
+        Args:
+            result (OptimisationResult):
+                Result of optimising this grid. Defaults to the grid's result.
+
+            num_scenarios (int):
+                Number of scenarios stacked in the result's snapshots, e.g. from optimise_stochastic. Default: 1
+
+        Returns:
+            FlowAnalytics:
+                The analytics of the result.
+        """
+
+        if result is None:
+            result = self.result
+        assert result is not None
+
+        return src.flow_analytics.FlowAnalytics.from_result(self, result, num_scenarios)
+
+    def expand(self, candidates, integer_sizing=None, solver_options=None, screening=True):
+        """
+        Chooses which candidate lines to build together with the panel areas, adds the chosen lines to the grid and
+        builds out the panel areas, see GridExpansion.
+
+        Args:
+            candidates (list of CandidateLine):
+                The lines that could be built.
+
+            integer_sizing (IntegerPanelSizing):
+                Panel units of the mixed-integer problem. Default: None, whole square meters.
+
+            solver_options (dict):
+                Options handed to HiGHS. Default: None
+
+            screening (bool):
+                Drops candidates by their cost before solving. Default: True
+
+        Returns:
+            list of Line:
+                The built lines, in the order of the candidates.
+        """
+
+        expansion = src.grid_expansion.GridExpansion(self, candidates, integer_sizing, solver_options, screening)
+        result = expansion.solve()
+        built = [candidates[k].build() for k in result.stats["built"]]
+        self.lines = self.lines + built
+        self.apply_result(result, False)
+
+        return built
+
+    def upgrade_lines(self, catalogue, integer_sizing=None, solver_options=None):
+        """
+        Chooses which lines switch to a higher rated type of a catalogue together with the panel areas, changes
+        their types and builds out the panel areas, see LineUpgrade.
+
+        Args:
+            catalogue (list of LineType):
+                Types lines may switch to, each needs a rating and a cost.
+
+            integer_sizing (IntegerPanelSizing):
+                Panel units of the mixed-integer problem. Default: None, whole square meters.
+
+            solver_options (dict):
+                Options handed to HiGHS. Default: None
+
+        Returns:
+            dict:
+                The new type by line key of every upgraded line.
+        """
+
+        upgrade = src.line_upgrade.LineUpgrade(self, catalogue, integer_sizing, solver_options)
+        result = upgrade.solve()
+        upgrades = {key: catalogue[position] for key, position in result.stats["upgrades"].items()}
+        for key, line_type in upgrades.items():
+            self.ids.line(key).line_type = line_type
+        self._paths = None      # Bottleneck ratings changed
+        self._ids = None
+        self.apply_result(result, False)
+
+        return upgrades
+
+    def save(self, directory):
+        """
+        Writes the grid, its panel sizes and its result as memory-mappable arrays, see grid_archive.save_grid.
+
+        Args:
+            directory (str):
+                Directory to write to, created if missing.
+        """
+
+        src.grid_archive.save_grid(self, directory)
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        """
+        Reads a grid written by save, with the ids of all its objects.
+
+        Args:
+            directory (str):
+                Directory of the grid.
+
+            mmap_mode (str):
+                How the arrays are memory-mapped, see numpy.load. Default: "r", None reads them into memory.
+
+        Returns:
+            Grid:
+                The loaded grid.
+        """
+
+        grid = src.grid_archive.load_grid(directory, mmap_mode)
+        assert isinstance(grid, cls)
+
+        return grid
+
     def create_build_out(self, solution, a):
         """
 
@@ -271,3 +861,33 @@ class Grid:
         new_panel_size = solution.value(a).round()
         for bus in range(len(new_panel_size)):
             self.buses[bus].panel.size = new_panel_size[bus]
+
+
+def optimise_grid(grid, solver_options=None, cancel_event=None, budget=None):
+    """
+    Builds and solves a fresh optimisation task of the grid without changing the grid.
+    Lives on module level so process pools can pickle it.
+
+    Args:
+        grid (Grid):
+            The grid to optimise.
+
+        solver_options (dict):
+            Options handed to IPOPT. Default: None
+
+        cancel_event (threading.Event):
+            Stops IPOPT at its next iteration once set. Default: None
+
+        budget (SolverBudget):
+            Time and iteration limits and tolerance preset. Default: None
+
+    Returns:
+        OptimisationResult:
+            The solved task's result.
+    """
+
+    task = grid.new_optimisation_task()
+    task.create_optimisation_task()
+    task.solve(solver_options, verbose=False, cancel_event=cancel_event, budget=budget)
+
+    return task.result
@@ -0,0 +1,317 @@
+import itertools
+import json
+import math
+import os
+
+import numpy as np
+
+import src.bus
+import src.generator
+import src.grid
+import src.line
+import src.line_type
+import src.optimisation_result
+import src.panel
+import src.storage
+
+FORMAT_VERSION = 1
+
+RESULT_ARRAYS = ("snapshots", "flow_rows", "flow_cols", "flow_values", "panel_sizes", "storage_buses",
+                 "storage_levels", "rating_duals", "balance_duals")
+
+
+def optional(value):
+    """
+    Stores None as NaN in float columns.
+    """
+    return np.nan if value is None else value
+
+
+def restore_optional(value):
+    """
+    Reads a float column entry written with optional.
+    """
+    return None if math.isnan(value) else float(value)
+
+
+def number(value):
+    """
+    Turns a float read from an array back into an int if it is whole, like it was most likely given.
+    """
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def json_safe(value):
+    """
+    Converts solver statistics into what JSON can hold, values it can not hold are dropped.
+    """
+
+    if isinstance(value, dict):
+        converted = {str(key): json_safe(item) for key, item in value.items()}
+        return {key: item for key, item in converted.items() if item is not None}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [json_safe(item) for item in value]
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return float(value) if math.isfinite(value) else None
+    if isinstance(value, str):
+        return value
+    return None
+
+
+def write_arrays(directory, arrays):
+    os.makedirs(directory, exist_ok=True)
+    for name, values in arrays.items():
+        np.save(os.path.join(directory, name + ".npy"), values, allow_pickle=False)
+
+
+def read_array(directory, name, mmap_mode):
+    return np.load(os.path.join(directory, name + ".npy"), mmap_mode=mmap_mode, allow_pickle=False)
+
+
+def restore_id(item, identifier):
+    """
+    Gives a loaded object its saved id. The id setters refuse changes, so the attribute is written directly.
+    """
+    item._id = int(identifier)
+
+
+def advance_id_counter(cls, identifiers):
+    """
+    Moves the id counter of a class past loaded ids, so objects created later do not reuse them.
+    """
+
+    if len(identifiers) > 0:
+        cls.id_counter = itertools.count(max(next(cls.id_counter), int(np.max(identifiers)) + 1))
+
+
+def save_result(result, directory):
+    """
+    Writes a result as one .npy file per array and a JSON header with the objective and statistics.
+
+    Args:
+        result (OptimisationResult):
+            The result to save.
+
+        directory (str):
+            Directory to write to, created if missing. Existing files of a result are overwritten.
+    """
+
+    assert isinstance(result, src.optimisation_result.OptimisationResult)
+
+    arrays = {name: getattr(result, name) for name in RESULT_ARRAYS if getattr(result, name) is not None}
+    write_arrays(directory, arrays)
+    header = {"version": FORMAT_VERSION, "arrays": sorted(arrays), "objective": result.objective,
+              "budget_dual": result.budget_dual, "stats": json_safe(result.stats)}
+    with open(os.path.join(directory, "result.json"), "w", encoding="utf-8") as file:
+        json.dump(header, file)
+
+
+def load_result(directory, mmap_mode="r"):
+    """
+    Reads a result written by save_result.
+
+    Args:
+        directory (str):
+            Directory of the result.
+
+        mmap_mode (str):
+            How the arrays are memory-mapped, see numpy.load. The result's arrays are views of the files, only the
+            parts used are read. Default: "r", read-only. None reads them into memory.
+
+    Returns:
+        OptimisationResult:
+            The result with its flows, panel sizes, storage levels, duals, objective and statistics.
+    """
+
+    with open(os.path.join(directory, "result.json"), encoding="utf-8") as file:
+        header = json.load(file)
+    assert header["version"] == FORMAT_VERSION
+
+    arrays = {name: read_array(directory, name, mmap_mode) for name in header["arrays"]}
+
+    return src.optimisation_result.OptimisationResult(arrays["snapshots"], arrays["flow_values"],
+                                                      arrays["panel_sizes"], header["objective"], header["stats"],
+                                                      (arrays["flow_rows"], arrays["flow_cols"]),
+                                                      arrays["storage_levels"], arrays["storage_buses"],
+                                                      arrays.get("rating_duals"), arrays.get("balance_duals"),
+                                                      header["budget_dual"])
+
+
+def save_grid(grid, directory):
+    """
+    Writes a grid as columns, one .npy file per column, plus a JSON header with the line types, generators and
+    names. Buses and lines refer to each other by position, all objects keep their ids and names. The grid's
+    result is saved into the subdirectory "result".
+
+    Args:
+        grid (Grid):
+            The grid to save.
+
+        directory (str):
+            Directory to write to, created if missing. Existing files of a grid are overwritten.
+    """
+
+    assert isinstance(grid, src.grid.Grid)
+
+    buses = grid.buses
+    num_snapshots = len(grid.snapshots)
+    ids = grid.ids
+    line_types = ids.line_types
+    storage_buses = [bus for bus in buses if bus.storage is not None]
+
+    # Buses without power draw or sun profile get a row of NaN.
+    power_draws = np.full((len(buses), num_snapshots), np.nan)
+    sun_profiles = np.full((len(buses), num_snapshots), np.nan)
+    for position, bus in enumerate(buses):
+        if bus.power_draw is not None:
+            power_draws[position] = bus.power_draw
+        if bus.sun_profile is not None:
+            sun_profiles[position] = bus.sun_profile
+
+    bus0, bus1, lengths, _ = grid.create_line_arrays()
+    arrays = {
+        "snapshots": np.asarray(grid.snapshots, dtype=float),
+        "bus_ids": np.array([bus.id for bus in buses], dtype=np.int64),
+        "roof_sizes": np.array([bus.roof_size for bus in buses], dtype=float),
+        "power_draws": power_draws,
+        "sun_profiles": sun_profiles,
+        "panel_ids": np.array([bus.panel.id for bus in buses], dtype=np.int64),
+        "panel_sizes": np.array([bus.panel.size for bus in buses], dtype=float),
+        "panel_output_per_sqm": np.array([bus.panel.output_per_sqm for bus in buses], dtype=float),
+        "panel_orientation": np.array([bus.panel.orientation_factor for bus in buses], dtype=float),
+        "line_ids": np.array([line.id for line in grid.lines], dtype=np.int64),
+        "line_bus0": bus0,
+        "line_bus1": bus1,
+        "line_lengths": lengths,
+        "line_types": np.array([ids.line_type_index(line.line_type) for line in grid.lines], dtype=np.int64),
+        "line_loss_coefficients": np.array([optional(line.loss_coefficient) for line in grid.lines], dtype=float),
+        "line_loss_segments": np.array([line.loss_segments for line in grid.lines], dtype=np.int64),
+        "storage_ids": np.array([bus.storage.id for bus in storage_buses], dtype=np.int64),
+        "storage_buses": np.array([ids.bus_index(bus) for bus in storage_buses], dtype=np.int64),
+        "storage_values": np.array([[bus.storage.capacity, optional(bus.storage.charge_limit),
+                                     optional(bus.storage.discharge_limit), bus.storage.efficiency,
+                                     bus.storage.initial_charge] for bus in storage_buses],
+                                   dtype=float).reshape(-1, 5),
+    }
+    write_arrays(directory, arrays)
+
+    header = {
+        "version": FORMAT_VERSION,
+        "id": grid.id,
+        "slack_bus": ids.bus_index(grid.slack_bus),
+        "total_panel_size": grid.total_panel_size,
+        "line_types": [{"id": line_type._id, "name": line_type.name, "rating": line_type.rating,
+                        "cost": line_type.cost}
+                       for line_type in line_types],
+        "bus_names": [bus.name for bus in buses],
+        "line_names": [line.name for line in grid.lines],
+        "generators": [{"id": generator.id, "bus": ids.bus_index(generator.bus), "capacity": generator.capacity,
+                        "cost": generator.cost} for generator in grid.generators],
+        "result": grid.result is not None,
+    }
+    with open(os.path.join(directory, "grid.json"), "w", encoding="utf-8") as file:
+        json.dump(header, file)
+
+    if grid.result is not None:
+        save_result(grid.result, os.path.join(directory, "result"))
+
+
+def load_grid(directory, mmap_mode="r"):
+    """
+    Reads a grid written by save_grid. Buses, panels, lines, line types, storage and generators get their saved
+    ids back, the id counters of their classes are moved past them.
+
+    Args:
+        directory (str):
+            Directory of the grid.
+
+        mmap_mode (str):
+            How the columns are memory-mapped, see numpy.load. Default: "r", read-only. None reads them into memory.
+
+    Returns:
+        Grid:
+            The grid with its panel sizes and, if one was saved, its result.
+    """
+
+    with open(os.path.join(directory, "grid.json"), encoding="utf-8") as file:
+        header = json.load(file)
+    assert header["version"] == FORMAT_VERSION
+
+    def column(name):
+        return read_array(directory, name, mmap_mode)
+
+    power_draws = column("power_draws")
+    sun_profiles = column("sun_profiles")
+    has_power_draw = ~np.isnan(power_draws).any(axis=1)
+    has_sun_profile = ~np.isnan(sun_profiles).any(axis=1)
+    panel_output = column("panel_output_per_sqm").tolist()
+    panel_orientation = column("panel_orientation").tolist()
+
+    buses = []
+    for position, (bus_id, panel_id, roof_size, panel_size) in enumerate(zip(
+            column("bus_ids").tolist(), column("panel_ids").tolist(), column("roof_sizes").tolist(),
+            column("panel_sizes").tolist())):
+        power_draw = power_draws[position].tolist() if has_power_draw[position] else None
+        sun_profile = sun_profiles[position].tolist() if has_sun_profile[position] else None
+        bus = src.bus.Bus(number(roof_size), power_draw, number(panel_size), sun_profile,
+                          header["bus_names"][position])
+        bus.panel.output_per_sqm = number(panel_output[position])
+        bus.panel.orientation_factor = number(panel_orientation[position])
+        restore_id(bus, bus_id)
+        restore_id(bus.panel, panel_id)
+        buses.append(bus)
+
+    for storage_id, position, values in zip(column("storage_ids").tolist(), column("storage_buses").tolist(),
+                                            column("storage_values").tolist()):
+        capacity, charge_limit, discharge_limit, efficiency, initial_charge = values
+        storage = buses[position].add_storage(number(capacity), restore_optional(charge_limit),
+                                              restore_optional(discharge_limit), number(efficiency),
+                                              number(initial_charge))
+        restore_id(storage, storage_id)
+
+    line_types = []
+    for item in header["line_types"]:
+        line_type = src.line_type.LineType(item["name"], item["rating"], item.get("cost"))
+        restore_id(line_type, item["id"])
+        line_types.append(line_type)
+
+    lines = []
+    for line_id, name, bus0, bus1, length, line_type, coefficient, segments in zip(
+            column("line_ids").tolist(), header["line_names"], column("line_bus0").tolist(),
+            column("line_bus1").tolist(), column("line_lengths").tolist(), column("line_types").tolist(),
+            column("line_loss_coefficients").tolist(), column("line_loss_segments").tolist()):
+        line = src.line.Line(buses[bus0], buses[bus1], number(length), line_types[line_type],
+                             restore_optional(coefficient), segments, name)
+        restore_id(line, line_id)
+        lines.append(line)
+
+    generators = []
+    for item in header["generators"]:
+        cost = item["cost"]
+        if isinstance(cost, list):
+            cost = [tuple(breakpoint) for breakpoint in cost]
+        generator = src.generator.Generator(buses[item["bus"]], item["capacity"], cost)
+        restore_id(generator, item["id"])
+        generators.append(generator)
+
+    grid = src.grid.Grid(buses, lines, buses[header["slack_bus"]], column("snapshots").tolist(),
+                         header["total_panel_size"], generators)
+    restore_id(grid, header["id"])
+    if header["result"]:
+        grid._result = load_result(os.path.join(directory, "result"), mmap_mode)
+
+    for cls, identifiers in ((src.bus.Bus, [bus.id for bus in buses]),
+                             (src.panel.Panel, [bus.panel.id for bus in buses]),
+                             (src.storage.Storage, column("storage_ids")),
+                             (src.line.Line, [line.id for line in lines]),
+                             (src.line_type.LineType, [item["id"] for item in header["line_types"]]),
+                             (src.generator.Generator, [generator.id for generator in generators]),
+                             (src.grid.Grid, [grid.id])):
+        advance_id_counter(cls, identifiers)
+
+    return grid
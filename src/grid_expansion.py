@@ -0,0 +1,375 @@
+import casadi as ca
+import numpy as np
+
+import src.bus
+import src.feasibility_check
+import src.integer_panel_sizing
+import src.line
+import src.line_type
+
+
+class CandidateLine:
+    """
+    A line that could be built. Unlike a Line it does not connect its buses until it is built.
+
+    Args:
+        bus0 (Bus):
+            "Start"-point of the line.
+
+        bus1 (Bus):
+            "End"-point of the line.
+
+        length (int, float):
+            Length of the line in meters.
+
+        line_type (LineType):
+            Type of the line, its rating limits the current.
+
+        cost (int, float):
+            Cost of building the line, in units of the objective, where one unit of imported current costs
+            GENERATOR_COST.
+    """
+
+    def __init__(self, bus0, bus1, length, line_type, cost):
+
+        assert isinstance(bus0, src.bus.Bus) and isinstance(bus1, src.bus.Bus)
+        assert bus0 is not bus1
+        assert isinstance(length, (int, float)) and length >= 0
+        assert isinstance(line_type, src.line_type.LineType)
+        assert isinstance(line_type.rating, (int, float))
+        assert isinstance(cost, (int, float)) and cost >= 0
+
+        self._bus0 = bus0
+        self._bus1 = bus1
+        self._length = length
+        self._line_type = line_type
+        self._cost = cost
+
+    @property
+    def bus0(self):
+        return self._bus0
+
+    @property
+    def bus1(self):
+        return self._bus1
+
+    @property
+    def length(self):
+        return self._length
+
+    @property
+    def line_type(self):
+        return self._line_type
+
+    @property
+    def rating(self):
+        return self.line_type.rating
+
+    @property
+    def cost(self):
+        return self._cost
+
+    def build(self):
+        """
+        Creates the line, which connects its buses.
+
+        Returns:
+            Line:
+                The new line.
+        """
+
+        return src.line.Line(self.bus0, self.bus1, self.length, self.line_type)
+
+
+class GridExpansion:
+    """
+    Chooses which candidate lines to build together with the panel placement, as mixed-integer linear program
+    solved with HiGHS. Every candidate gets a binary build variable, its cost is added to the objective.
+
+    A candidate between two buses shares the current variables of that pair of buses with an existing line or
+    other candidates between them, which then carry the sum of the built ratings. The current of a pair is
+    bounded by the rating of its existing line plus big-M terms M * build of its candidates. M is the candidate's
+    rating, tightened at every snapshot to what the pair of buses can possibly exchange: what the sending bus can
+    produce, discharge or receive over its other lines and what the receiving bus can draw, charge or send on.
+    For buses in islands of the existing grid, found with the grid's path index, the whole island is the limit.
+
+    Before solving, candidates that can not carry current at any snapshot are dropped, and with screening also
+    candidates whose cost exceeds what any expansion can save: the objective of the existing grid minus the
+    operating cost with all candidates built.
+
+    Args:
+        grid (Grid):
+            The grid to expand. Its lines are the existing ones.
+
+        candidates (list of CandidateLine):
+            The lines that could be built. They need a rating, candidate lines are lossless.
+
+        integer_sizing (IntegerPanelSizing):
+            Panel units of the mixed-integer problem. Default: None, whole square meters.
+
+        solver_options (dict):
+            Options handed to HiGHS. Default: None
+
+        screening (bool):
+            Drops candidates by their cost before solving, which takes two additional solves. Default: True
+    """
+
+    def __init__(self, grid, candidates, integer_sizing=None, solver_options=None, screening=True):
+
+        assert isinstance(candidates, list)
+        for candidate in candidates:
+            assert isinstance(candidate, CandidateLine)
+            assert candidate.bus0 in grid.buses and candidate.bus1 in grid.buses
+        if integer_sizing is None:
+            integer_sizing = src.integer_panel_sizing.IntegerPanelSizing()
+        assert isinstance(integer_sizing, src.integer_panel_sizing.IntegerPanelSizing)
+
+        self._grid = grid
+        self._candidates = candidates
+        self._integer_sizing = integer_sizing
+        self._solver_options = solver_options
+        self._screening = screening
+        self._bounds = None
+
+    @property
+    def grid(self):
+        return self._grid
+
+    @property
+    def candidates(self):
+        return self._candidates
+
+    def candidate_arrays(self):
+        """
+        Describes the candidates as arrays, with the buses given by their position in the bus list.
+
+        Returns:
+            tuple of numpy.ndarray:
+                Start bus, end bus, length, rating and cost of each candidate.
+        """
+
+        positions = {bus: position for position, bus in enumerate(self.grid.buses)}
+
+        return (np.array([positions[candidate.bus0] for candidate in self.candidates], dtype=int),
+                np.array([positions[candidate.bus1] for candidate in self.candidates], dtype=int),
+                np.array([candidate.length for candidate in self.candidates], dtype=float),
+                np.array([candidate.rating for candidate in self.candidates], dtype=float),
+                np.array([candidate.cost for candidate in self.candidates], dtype=float))
+
+    def capacity_bounds(self):
+        """
+        Largest current each candidate can carry in each direction at each snapshot, the M of its big-M bound.
+
+        Returns:
+            numpy.ndarray:
+                Shape (snapshots, candidates, 2), index 0 of the last axis from bus0 to bus1, 1 the other way.
+        """
+
+        if self._bounds is not None:
+            return self._bounds
+
+        grid = self.grid
+        num_buses = len(grid.buses)
+        n = len(grid.building_buses)
+        num_snapshots = len(grid.snapshots)
+        bus0, bus1, _, ratings = grid.create_line_arrays()
+        cand0, cand1, _, cand_ratings, _ = self.candidate_arrays()
+
+        # What every bus can put into the grid and take out of it at every snapshot, besides its lines.
+        roof_sizes = np.array([bus.roof_size for bus in grid.building_buses], dtype=float)
+        if grid.total_panel_size is not None:
+            roof_sizes = np.minimum(roof_sizes, grid.total_panel_size)
+        supply = np.full((num_snapshots, num_buses), np.inf)
+        supply[:, :n] = grid.create_sun_matrix() * grid.create_panel_output_vector()[:n] * roof_sizes
+        for k, bus in enumerate(grid.buses[n:]):
+            capacities = [generator.capacity for generator in grid.generators if generator.bus is bus]
+            if capacities and None not in capacities:
+                supply[:, n + k] = sum(capacities)
+        demand = np.full((num_snapshots, num_buses), np.inf)       # Generators can take current out
+        demand[:, :n] = np.array([bus.power_draw for bus in grid.building_buses], dtype=float).T.reshape(-1, n)
+        for i, bus in enumerate(grid.building_buses):
+            if bus.storage is not None:
+                supply[:, i] += np.inf if bus.storage.discharge_limit is None else bus.storage.discharge_limit
+                demand[:, i] += np.inf if bus.storage.charge_limit is None else bus.storage.charge_limit
+
+        # Lines and candidates between the same buses do not count, the current would only go in circles.
+        pair_keys = np.minimum(cand0, cand1) * num_buses + np.maximum(cand0, cand1)
+        line_keys = np.minimum(bus0, bus1) * num_buses + np.maximum(bus0, bus1)
+        keys, pair_of = np.unique(np.concatenate([line_keys, pair_keys]), return_inverse=True)
+        pair_of_line, pair_of_candidate = pair_of[:line_keys.size], pair_of[line_keys.size:]
+        existing = np.bincount(pair_of_line, ratings, keys.size)[pair_of_candidate]
+        pair_capacity = existing + np.bincount(pair_of_candidate, cand_ratings, keys.size)[pair_of_candidate]
+        incident = np.bincount(bus0, ratings, num_buses) + np.bincount(bus1, ratings, num_buses) + \
+            np.bincount(cand0, cand_ratings, num_buses) + np.bincount(cand1, cand_ratings, num_buses)
+
+        # Islands of the existing grid, away from the slack bus, can only exchange what they hold.
+        island_supply = np.full((num_snapshots, num_buses), np.inf)
+        island_demand = np.full((num_snapshots, num_buses), np.inf)
+        labels = src.feasibility_check.connected_components(bus0, bus1, num_buses)
+        for label in np.unique(labels[~grid.paths.reachable]):
+            members = labels == label
+            crossing = members[cand0] != members[cand1]
+            border = cand_ratings[crossing].sum()
+            island_supply[:, members] = supply[:, members].sum(axis=1)[:, None] + border
+            island_demand[:, members] = demand[:, members].sum(axis=1)[:, None] + border
+
+        def exchange(sender, receiver):
+            return np.minimum.reduce([supply[:, sender] + incident[sender] - pair_capacity,
+                                      demand[:, receiver] + incident[receiver] - pair_capacity,
+                                      island_supply[:, sender], island_demand[:, receiver]])
+
+        bounds = np.stack([exchange(cand0, cand1), exchange(cand1, cand0)], axis=2) - existing[None, :, None]
+
+        self._bounds = np.clip(bounds, 0, cand_ratings[None, :, None])
+        return self._bounds
+
+    def create_task(self, selected, build=None, costs=True):
+        """
+        Builds the mixed-integer problem for some of the candidates.
+
+        Args:
+            selected (numpy.ndarray):
+                Positions of the candidates in the problem.
+
+            build (numpy.ndarray):
+                Fixes the build decision of every selected candidate to 0 or 1. Default: None, optimised.
+
+            costs (bool):
+                Adds the candidates' costs to the objective. Default: True
+
+        Returns:
+            tuple:
+                The configured OptimisationTask and the build variables.
+        """
+
+        grid = self.grid
+        num_buses = len(grid.buses)
+        task = grid.new_optimisation_task()
+        n = task.num_buildings
+        num_snaps = task.num_snapshots
+        cand0, cand1, lengths, cand_ratings, cand_costs = (values[selected] for values in self.candidate_arrays())
+        bounds = self.capacity_bounds()[:, selected]
+
+        task.create_problem_and_variables(n, num_snaps, 'conic')
+        task.integer_sizing = self._integer_sizing
+        opti = task.task
+
+        # Both directions of every selected candidate, one entry per pair of buses.
+        rows = np.concatenate([cand1, cand0])        # x[i, j] is the current from Bus_j to Bus_i
+        cols = np.concatenate([cand0, cand1])
+        keys = cols * num_buses + rows
+        stored = task.flow_cols * num_buses + task.flow_rows
+        unique_keys, entry_of_direction = np.unique(keys, return_inverse=True)
+        candidate_of_direction = np.tile(np.arange(selected.size), 2)
+        new = ~np.isin(unique_keys, stored)
+        entry_lengths = np.full(unique_keys.size, np.inf)       # The shortest candidate between the same buses
+        np.minimum.at(entry_lengths, entry_of_direction, np.tile(lengths, 2))
+        if new.any():
+            task.add_flow_block(unique_keys[new] % num_buses, unique_keys[new] // num_buses, entry_lengths[new],
+                                np.zeros(np.count_nonzero(new)))
+
+        # Positions of the entries in the flow vectors, after adding the new ones.
+        entry_positions = {key: position for position, key in
+                           enumerate((task.flow_cols * num_buses + task.flow_rows).tolist())}
+        positions = np.array([entry_positions[key] for key in unique_keys.tolist()], dtype=int)
+        existing = task.entry_ratings[positions].copy()
+        ratings = task.entry_ratings.copy()
+        np.add.at(ratings, positions[entry_of_direction], np.tile(cand_ratings, 2))
+
+        build_variables = opti.variable(selected.size)
+        opti.set_domain(build_variables, 'integer')
+        if selected.size > 0 and build is None:
+            task.subject_to("candidate line", opti.bounded(0, build_variables, 1))
+        elif selected.size > 0:
+            task.subject_to("candidate line", build_variables == np.asarray(build, dtype=float))
+
+        task.create_cost_function(n, num_snaps)
+        if costs and selected.size > 0:
+            opti.minimize(opti.f + ca.dot(ca.DM(cand_costs), build_variables))
+        task.create_constraint_total_panel_size(n)
+        task.create_constraint_panel_output(n, num_snaps, task.snapshots)
+        task.create_constraint_house_panel_size(n)
+        task.create_constraint_line_rating(n, num_snaps, ratings)
+        task.create_constraint_house_consumption(n, num_snaps)
+        task.create_constraint_generator_production(n, num_snaps)
+        task.create_constraint_generator_capacity(n, num_snaps)
+        task.create_constraint_line_losses(n, num_snaps)
+        task.create_constraint_storage(n, num_snaps, task.snapshots)
+        task.create_constraint_integer_panel_size(n)
+
+        # The current of a pair of buses is bounded by its existing rating and the M of its built candidates.
+        num_entries = unique_keys.size
+        if selected.size > 0:
+            for t in num_snaps:
+                weights = ca.DM.triplet(entry_of_direction.tolist(), candidate_of_direction.tolist(),
+                                        np.concatenate([bounds[t, :, 0], bounds[t, :, 1]]).tolist(), num_entries,
+                                        selected.size)
+                task.subject_to("candidate line", task.flow_task[t][positions.tolist()] <=
+                                existing + ca.mtimes(weights, build_variables))
+
+        task.configure_solver(self._solver_options, verbose=False)
+
+        return task, build_variables
+
+    def solve_fixed(self, selected, build, costs):
+        """
+        Solves with fixed build decisions, for screening.
+
+        Returns:
+            float:
+                The objective, infinity if the problem can not be solved.
+        """
+
+        task, _ = self.create_task(selected, build, costs)
+        try:
+            _, result = task.run_solver()
+        except RuntimeError:
+            return np.inf
+
+        return result.objective if result.success else np.inf
+
+    def screen(self):
+        """
+        Finds the candidates that can be dropped before solving.
+
+        Returns:
+            tuple:
+                Positions of the kept candidates and a dict with the positions dropped "without capacity" and "by
+                cost".
+        """
+
+        all_candidates = np.arange(len(self.candidates))
+        useful = (self.capacity_bounds() > 0).any(axis=(0, 2))
+        dropped = {"without capacity": all_candidates[~useful].tolist(), "by cost": []}
+        kept = all_candidates[useful]
+
+        if self._screening and kept.size > 0:
+            existing_objective = self.solve_fixed(kept, np.zeros(kept.size), costs=False)
+            operating_bound = self.solve_fixed(kept, np.ones(kept.size), costs=False)
+            if np.isfinite(existing_objective) and np.isfinite(operating_bound):
+                saving = existing_objective - operating_bound
+                costs = self.candidate_arrays()[4][kept]
+                dropped["by cost"] = kept[costs >= saving].tolist()
+                kept = kept[costs < saving]
+
+        return kept, dropped
+
+    def solve(self):
+        """
+        Screens the candidates and solves the expansion problem.
+
+        Returns:
+            OptimisationResult:
+                Panel areas and currents, the current matrices include the entries of the candidates. Its
+                statistics hold "built", the positions of the candidates to build, and "dropped" from screening.
+        """
+
+        selected, dropped = self.screen()
+        task, build_variables = self.create_task(selected)
+        solution, result = task.run_solver()
+
+        value = solution.value if solution is not None else task.task.debug.value
+        build = np.atleast_1d(value(build_variables)) if selected.size > 0 else np.zeros(0)
+        result.stats.update(built=selected[build > 0.5].tolist(), dropped=dropped)
+
+        return result
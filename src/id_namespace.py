@@ -0,0 +1,119 @@
+import numpy as np
+
+
+class IdNamespace:
+    """
+    Ids of the objects of one grid. Every bus, line, line type and generator gets an index, its position in the
+    grid, from 0 to n - 1, usable directly as position in the arrays of tasks and results. Buses and lines also
+    get a key, their name or else "bus<index>" and "line<index>". Indices and keys only depend on the grid's
+    lists, not on the order objects were created in, so they are the same in every process building the same grid.
+    Panels and storage share the index of their bus.
+
+    Args:
+        buses (list of Bus):
+            The buses of the grid, in their order.
+
+        lines (list of Line):
+            The lines of the grid, in their order.
+
+        generators (list of Generator):
+            The generators of the grid, in their order.
+    """
+
+    def __init__(self, buses, lines, generators):
+
+        self._bus_positions = {bus: position for position, bus in enumerate(buses)}
+        self._line_positions = {line: position for position, line in enumerate(lines)}
+        self._generator_positions = {generator: position for position, generator in enumerate(generators)}
+
+        # Line types are numbered in order of their first line.
+        self._line_types = list({id(line.line_type): line.line_type for line in lines}.values())
+        self._line_type_positions = {id(line_type): position for position, line_type in enumerate(self._line_types)}
+
+        self._bus_keys = np.array([f"bus{position}" if bus.name is None else bus.name
+                                   for position, bus in enumerate(buses)], dtype=str)
+        self._line_keys = np.array([f"line{position}" if line.name is None else line.name
+                                    for position, line in enumerate(lines)], dtype=str)
+        assert np.unique(self._bus_keys).size == self._bus_keys.size, "Bus names have to be unique within a grid."
+        assert np.unique(self._line_keys).size == self._line_keys.size, "Line names have to be unique within a grid."
+
+        self._buses = list(buses)
+        self._lines = list(lines)
+        self._bus_lookup = {key: position for position, key in enumerate(self._bus_keys.tolist())}
+        self._line_lookup = {key: position for position, key in enumerate(self._line_keys.tolist())}
+
+    @classmethod
+    def from_grid(cls, grid):
+        """
+        Creates the namespace of a grid.
+
+        Args:
+            grid (Grid):
+                The grid to number.
+
+        Returns:
+            IdNamespace:
+                The namespace.
+        """
+
+        return cls(grid.buses, grid.lines, grid.generators)
+
+    @property
+    def bus_keys(self):
+        return self._bus_keys
+
+    @property
+    def line_keys(self):
+        return self._line_keys
+
+    @property
+    def line_types(self):
+        return self._line_types
+
+    def bus_index(self, bus):
+        return self._bus_positions[bus]
+
+    def line_index(self, line):
+        return self._line_positions[line]
+
+    def line_type_index(self, line_type):
+        return self._line_type_positions[id(line_type)]
+
+    def generator_index(self, generator):
+        return self._generator_positions[generator]
+
+    def bus(self, key):
+        return self._buses[self._bus_lookup[key]]
+
+    def line(self, key):
+        return self._lines[self._line_lookup[key]]
+
+    def bus_indices(self, keys):
+        """
+        Positions of buses given by their keys.
+
+        Args:
+            keys (list of str):
+                Keys of the buses.
+
+        Returns:
+            numpy.ndarray:
+                Position of each bus.
+        """
+
+        return np.array([self._bus_lookup[key] for key in keys], dtype=int)
+
+    def line_indices(self, keys):
+        """
+        Positions of lines given by their keys.
+
+        Args:
+            keys (list of str):
+                Keys of the lines.
+
+        Returns:
+            numpy.ndarray:
+                Position of each line.
+        """
+
+        return np.array([self._line_lookup[key] for key in keys], dtype=int)
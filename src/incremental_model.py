@@ -0,0 +1,504 @@
+import casadi as ca
+import numpy as np
+
+import src.bus
+import src.grid
+import src.line
+import src.optimisation_result
+import src.optimisation_task
+
+
+class IncrementalModel:
+    """
+    Optimisation problem of a grid that can be edited after it was built, for what-if planning.
+    Buses, lines and snapshots can be added or removed and line ratings changed without creating the grid's
+    problem from scratch.
+
+    Everything that can be switched off is a parameter: the rating of every current entry, whether a bus is active
+    and whether a snapshot is active. Removing something or changing a rating only changes parameter values, the
+    next solve reuses the solver. Adding a snapshot adds its variables and the constraints of this snapshot only.
+    Adding a bus or a line adds variables for the new entries of the current matrices and their constraints. The
+    balance constraints and the total panel size contain the new entries next to the old ones, so they are created
+    again. CasADi can only drop all constraints at once, so this clears the constraint set and adds every other
+    constraint again from its stored expression. Any added variable makes CasADi build the solver again on the next
+    solve, so edits that add something cost about as much as building the problem, removals do not.
+
+    Args:
+        grid (Grid):
+            The grid to start from. Its buses, lines and snapshots are not changed by the model.
+
+        solver_options (dict):
+            Options handed to IPOPT. Default: None
+
+        verbose (bool):
+            If False IPOPT does not print anything to the console. Default: False
+
+        budget (SolverBudget):
+            Limits for each solve. Default: None
+    """
+
+    def __init__(self, grid, solver_options=None, verbose=False, budget=None):
+
+        self._grid = None
+        self._task = None
+        self._lines = {}
+        self._line_ratings = {}
+        self._line_entries = {}
+        self._ratings = None
+        self._rating_parameters = []
+        self._bus_active = []
+        self._bus_values = None
+        self._snapshot_active = []
+        self._snapshot_values = None
+        self._power_draws = None
+        self._sun = None
+        self._roof_sizes = None
+        self._total_panel_size_parameter = None
+        self._total_panel_size = None
+        self._budget = budget
+
+        self.grid = grid
+
+        self.create_task(solver_options, verbose, budget)
+
+    @property
+    def grid(self):
+        return self._grid
+
+    @grid.setter
+    def grid(self, value):
+        if self._grid is not None:
+            raise PermissionError("The grid of an incremental model is fixed, edit the model instead.")
+
+        assert isinstance(value, src.grid.Grid)
+        self._grid = value
+
+    @property
+    def task(self):
+        return self._task
+
+    @property
+    def buses(self):
+        return self.task.buses
+
+    @property
+    def lines(self):
+        return list(self._lines.values())
+
+    @property
+    def snapshots(self):
+        return self.task.snapshots
+
+    @property
+    def num_buildings(self):
+        return self.task.num_buildings
+
+    @property
+    def active_snapshots(self):
+        return np.flatnonzero(self._snapshot_values).tolist()
+
+    def rating_expression(self):
+        return ca.vertcat(*self._rating_parameters)
+
+    def bus_active_expression(self):
+        return ca.vertcat(*self._bus_active)
+
+    def snapshot_active_expression(self):
+        return ca.vertcat(*self._snapshot_active)
+
+    def power_draw_expression(self):
+        """
+        Power draws as (T, n) expression, zero for removed buses and removed snapshots.
+        """
+        active = ca.mtimes(self.snapshot_active_expression(), self.bus_active_expression().T)
+        return ca.DM(self._power_draws) * active
+
+    def sun_expression(self):
+        """
+        Sun factors as (T, n) expression, zero for removed snapshots.
+        """
+        active = ca.repmat(self.snapshot_active_expression(), 1, self.num_buildings)
+        return ca.DM(self._sun) * active
+
+    def create_task(self, solver_options=None, verbose=False, budget=None):
+        """
+        Builds the problem of the grid with the ratings, the active buses and the active snapshots as parameters.
+
+        Args:
+            solver_options (dict):
+                Options handed to IPOPT. Default: None
+
+            verbose (bool):
+                If False IPOPT does not print anything to the console. Default: False
+
+            budget (SolverBudget):
+                Limits for each solve. Default: None
+        """
+
+        grid = self.grid
+        task = grid.new_optimisation_task()
+        n = task.num_buildings
+        num_snaps = task.num_snapshots
+
+        task.create_problem_and_variables(n, num_snaps)
+        opti = task.task
+        self._task = task
+
+        self._ratings = task.entry_ratings.copy()
+        self._rating_parameters = [opti.parameter(self._ratings.size)]
+        self._bus_values = np.ones(n)
+        self._bus_active = [opti.parameter(n)]
+        self._snapshot_values = np.ones(len(num_snaps))
+        self._snapshot_active = [opti.parameter(len(num_snaps))]
+        self._power_draws = np.array(task.power_draws, dtype=float)
+        self._sun = grid.create_sun_matrix()
+        self._roof_sizes = np.array([bus.roof_size for bus in grid.buses[:n]], dtype=float)
+        self._total_panel_size = grid.total_panel_size
+        if self._total_panel_size is None:
+            self._total_panel_size = float(self._roof_sizes.sum())
+        self._total_panel_size_parameter = opti.parameter()
+
+        positions = {bus: position for position, bus in enumerate(grid.buses)}
+        for line in grid.lines:
+            self._lines[line.id] = line
+            self._line_ratings[line.id] = line.line_type.rating
+            self._line_entries[line.id] = self.find_entries(positions[line.bus0], positions[line.bus1])
+        self.update_ratings(np.concatenate(list(self._line_entries.values())) if self._lines else [])
+
+        # Removed snapshots do not charge for panels either.
+        task.create_cost_function(n, num_snaps, panel_cost_weights=self.snapshot_active_expression())
+        task.create_constraint_total_panel_size(n, self._total_panel_size_parameter)
+        task.create_constraint_panel_output(n, num_snaps, task.snapshots, sun_factors=self.sun_expression())
+        task.create_constraint_house_panel_size(n, ca.DM(self._roof_sizes) * self.bus_active_expression())
+        task.create_constraint_line_rating(n, num_snaps, self.rating_expression())
+        task.create_constraint_house_consumption(n, num_snaps, self.power_draw_expression())
+        task.create_constraint_generator_production(n, num_snaps)
+        task.create_constraint_generator_capacity(n, num_snaps)
+        task.create_constraint_line_losses(n, num_snaps)
+        task.create_constraint_storage(n, num_snaps, task.snapshots)
+
+        task.configure_solver(solver_options, verbose, budget)
+
+    def find_entries(self, i, j):
+        """
+        Positions of the entries x[i, j] and x[j, i] in the flow vector of a snapshot.
+
+        Args:
+            i (int):
+                Position of the first bus.
+
+            j (int):
+                Position of the second bus.
+
+        Returns:
+            numpy.ndarray:
+                The two positions, empty if the buses are not connected by the current matrices.
+        """
+
+        rows = self.task.flow_rows
+        cols = self.task.flow_cols
+
+        return np.flatnonzero(((rows == i) & (cols == j)) | ((rows == j) & (cols == i)))
+
+    def update_ratings(self, entries):
+        """
+        Sets the rating of current entries to the summed ratings of the active lines on them.
+
+        Args:
+            entries (list of int, numpy.ndarray):
+                Positions in the flow vector.
+        """
+
+        entries = np.asarray(entries, dtype=int)
+        self._ratings[entries] = 0
+        for line_id, line_entries in self._line_entries.items():
+            if line_id in self._lines and np.isin(line_entries, entries).any():
+                self._ratings[line_entries] += self._line_ratings[line_id]
+
+    def position(self, bus):
+        assert bus in self.buses
+        return self.buses.index(bus)
+
+    def check_building(self, bus):
+        position = self.position(bus)
+        assert position < self.num_buildings      # Generator buses can not be edited
+        return position
+
+    def set_line_rating(self, line, rating):
+        """
+        Changes the rating of an active line. Only a parameter value changes.
+
+        Args:
+            line (Line):
+                The line, added to the model before.
+
+            rating (int, float):
+                The new rating, the line type of the line is not changed. Greater or equal to zero.
+        """
+
+        assert line.id in self._lines
+        assert isinstance(rating, (int, float))
+        assert rating >= 0
+
+        self._line_ratings[line.id] = rating
+        self.update_ratings(self._line_entries[line.id])
+
+    def remove_line(self, line):
+        """
+        Removes a line by setting the rating of its entries to zero. Only a parameter value changes.
+
+        Args:
+            line (Line):
+                The line, added to the model before.
+        """
+
+        assert line.id in self._lines
+
+        del self._lines[line.id]
+        self.update_ratings(self._line_entries[line.id])
+
+    def add_line(self, line):
+        """
+        Adds a line between two buses of the model. A line between already connected buses only changes ratings,
+        the length of the existing entries is kept. Otherwise two entries are added to the problem.
+
+        Args:
+            line (Line):
+                The new line, or a line removed before.
+        """
+
+        if self.connect(line):
+            self.update_balance()
+
+    def connect(self, line):
+        """
+        Adds a line without creating the balance constraints again.
+
+        Args:
+            line (Line):
+                The new line.
+
+        Returns:
+            bool:
+                True if new entries were added and the balance constraints have to be created again.
+        """
+
+        assert isinstance(line, src.line.Line)
+        assert line.id not in self._lines
+        i = self.position(line.bus0)
+        j = self.position(line.bus1)
+
+        entries = self.find_entries(i, j)
+        self._lines[line.id] = line
+        self._line_ratings[line.id] = line.line_type.rating
+        if entries.size > 0:
+            self._line_entries[line.id] = entries
+            self.update_ratings(entries)
+            return False
+
+        assert line.loss_coefficient is None      # The loss segments of the problem are fixed
+        task = self.task
+        opti = task.task
+        entries = np.array(task.add_flow_block([i, j], [j, i], [line.length] * 2, [line.line_type.rating] * 2))
+        self._line_entries[line.id] = entries
+        self._ratings = np.concatenate([self._ratings, np.zeros(2)])
+        self._rating_parameters.append(opti.parameter(2))
+        self.update_ratings(entries)
+
+        ratings = self._rating_parameters[-1]
+        cost = 0
+        for t in range(len(self.snapshots)):
+            flows = task.flow_task[t][entries.tolist()]
+            task.subject_to("line rating", flows <= ratings, (t, entries.tolist()))
+            task.subject_to("current direction", flows >= 0)
+            cost += line.length * ca.sum1(flows)
+        opti.minimize(opti.f + cost)
+
+        return True
+
+    def update_balance(self):
+        """
+        Creates the balance constraints of all snapshots again and the total panel size, which sums over all
+        buildings. The other constraints keep their expressions, but the whole constraint set of the problem is
+        cleared and added again, see OptimisationTask.remove_constraint_blocks.
+        """
+
+        task = self.task
+        n = self.num_buildings
+        num_snaps = range(len(self.snapshots))
+
+        task.remove_constraint_blocks("house consumption", "generator production", "total panel size")
+        task.create_constraint_total_panel_size(n, self._total_panel_size_parameter)
+        task.create_constraint_house_consumption(n, num_snaps, self.power_draw_expression())
+        task.create_constraint_generator_production(n, num_snaps)
+
+    def remove_bus(self, bus):
+        """
+        Removes a building: its power draw and roof become zero and its lines are removed. Only parameter values
+        change.
+
+        Args:
+            bus (Bus):
+                A building of the model, not a generator bus.
+        """
+
+        position = self.check_building(bus)
+
+        self._bus_values[position] = 0
+        for line in self.lines:
+            if bus in (line.bus0, line.bus1):
+                self.remove_line(line)
+
+    def add_bus(self, bus, lines):
+        """
+        Adds a building with its lines. Its power draw has one value per snapshot of the model.
+
+        Args:
+            bus (Bus):
+                The new bus, without storage.
+
+            lines (list of Line):
+                Lines connecting the bus to buses of the model.
+        """
+
+        assert isinstance(bus, src.bus.Bus)
+        assert all(bus in (line.bus0, line.bus1) for line in lines)
+        num_snapshots = len(self.snapshots)
+        power_draw = np.zeros(num_snapshots) if bus.power_draw is None else np.asarray(bus.power_draw, dtype=float)
+        assert power_draw.shape == (num_snapshots,)
+
+        task = self.task
+        opti = task.task
+        n = self.num_buildings
+        panel_size = task.add_building(bus)
+        entry = task.flow_rows.size - 1
+
+        self._ratings = np.concatenate([self._ratings, [0]])
+        self._rating_parameters.append(opti.parameter(1))
+        self._bus_values = np.append(self._bus_values, 1)
+        self._bus_active.append(opti.parameter())
+        self._power_draws = np.column_stack([self._power_draws, power_draw])
+        if bus.sun_profile is not None:
+            sun = np.asarray(bus.sun_profile, dtype=float)
+        else:
+            sun = np.atleast_1d(task.sun(self.snapshots))
+        self._sun = np.column_stack([self._sun, sun])
+        self._roof_sizes = np.append(self._roof_sizes, bus.roof_size)
+
+        # The constraints of the new building, the ones of the other buildings do not change.
+        sun = self.sun_expression()
+        output = bus.panel.effective_output_per_sqm
+        for t in range(num_snapshots):
+            production = task.flow_task[t][entry]
+            task.subject_to("panel output", production == sun[t, n] * output * panel_size)
+            task.subject_to("current direction", production >= 0)
+        task.subject_to("house panel size", opti.bounded(0, panel_size, bus.roof_size * self._bus_active[-1]))
+        active_snapshots = ca.sum1(self.snapshot_active_expression())
+        opti.minimize(opti.f + panel_size * src.optimisation_task.PANEL_COST * active_snapshots)
+
+        for line in lines:
+            self.connect(line)
+        self.update_balance()
+
+    def add_snapshot(self, snapshot, power_draw):
+        """
+        Adds a snapshot with its own variables and constraints. Not possible for grids with storage, which couples
+        all snapshots.
+
+        Args:
+            snapshot (int, float):
+                Point in time (hours).
+
+            power_draw (list, numpy.ndarray):
+                Power draw of every building of the model, in the order of the buses.
+
+        Returns:
+            int:
+                Position of the snapshot, used to remove it again.
+        """
+
+        power_draw = np.asarray(power_draw, dtype=float)
+        assert power_draw.shape == (self.num_buildings,)
+        assert (power_draw >= 0).all()
+
+        task = self.task
+        n = self.num_buildings
+        t = task.add_snapshot(snapshot)
+        num_snaps = range(t, t + 1)
+
+        self._snapshot_values = np.append(self._snapshot_values, 1)
+        self._snapshot_active.append(task.task.parameter())
+        self._power_draws = np.vstack([self._power_draws, power_draw])
+        self._sun = np.vstack([self._sun, np.full(n, task.sun(snapshot))])
+
+        task.create_cost_function(n, num_snaps, add_to_objective=True,
+                                  panel_cost_weights=self.snapshot_active_expression())
+        task.create_constraint_panel_output(n, num_snaps, task.snapshots, sun_factors=self.sun_expression())
+        task.create_constraint_line_rating(n, num_snaps, self.rating_expression())
+        task.create_constraint_house_consumption(n, num_snaps, self.power_draw_expression())
+        task.create_constraint_generator_production(n, num_snaps)
+        task.create_constraint_generator_capacity(n, num_snaps)
+        task.create_constraint_line_losses(n, num_snaps)
+
+        return t
+
+    def remove_snapshot(self, index):
+        """
+        Removes a snapshot by setting its power draws, its sun and its panel cost to zero. Only parameter values
+        change.
+
+        Args:
+            index (int):
+                Position of the snapshot.
+        """
+
+        assert 0 <= index < len(self.snapshots)
+        assert not self.task.storage_buses     # The charge would still be carried through the snapshot
+        self._snapshot_values[index] = 0
+
+    def set_total_panel_size(self, value):
+        """
+        Changes the square meters of panels that can be distributed. Only a parameter value changes.
+
+        Args:
+            value (int, float):
+                Available square meters of panels. Greater or equal to zero.
+        """
+
+        assert isinstance(value, (int, float))
+        assert value >= 0
+        self._total_panel_size = value
+
+    def set_parameter_values(self):
+        """
+        Hands the ratings, the active buses and snapshots and the total panel size to the problem.
+        """
+
+        opti = self.task.task
+        for parameters, values in [(self._rating_parameters, self._ratings), (self._bus_active, self._bus_values),
+                                   (self._snapshot_active, self._snapshot_values)]:
+            start = 0
+            for parameter in parameters:    # One parameter per edit, in the order of the values
+                opti.set_value(parameter, values[start:start + parameter.numel()])
+                start += parameter.numel()
+        opti.set_value(self._total_panel_size_parameter, self._total_panel_size)
+
+    def solve(self):
+        """
+        Solves the problem in its current state.
+
+        Returns:
+            OptimisationResult:
+                Currents and panel sizes of the active snapshots, with the flow index of the current entries.
+                Removed buses have zero panel size and no currents.
+        """
+
+        self.set_parameter_values()
+        _, result = self.task.run_solver(self._budget)
+
+        active = self.active_snapshots
+        storage_levels = None if result.storage_levels is None else result.storage_levels[active]
+        return src.optimisation_result.OptimisationResult(result.snapshots[active], result.flow_values[active],
+                                                          result.panel_sizes, result.objective, result.stats,
+                                                          (result.flow_rows, result.flow_cols), storage_levels,
+                                                          result.storage_buses)
@@ -0,0 +1,101 @@
+import numpy as np
+
+
+class IntegerPanelSizing:
+    """
+    Makes the panel areas whole multiples of a panel unit instead of rounding continuous areas afterwards.
+    The problem then becomes a mixed-integer linear program and is solved with HiGHS instead of IPOPT.
+
+    Args:
+        panel_unit_size (int, float, list):
+            Square meters of one panel unit, for all buses or one entry per bus excluding the slack bus.
+            Default: 1, whole square meters.
+
+        installation_cost (int, float, list):
+            Fixed cost added to the cost function for each bus that gets any panel, for all buses or one entry per
+            bus excluding the slack bus. Default: 0
+
+        presolve (bool):
+            Whether HiGHS simplifies the problem before branching. Default: True
+    """
+
+    def __init__(self, panel_unit_size=1, installation_cost=0, presolve=True):
+
+        self._panel_unit_size = None
+        self._installation_cost = None
+        self._presolve = None
+
+        self.panel_unit_size = panel_unit_size
+        self.installation_cost = installation_cost
+        self.presolve = presolve
+
+    @property
+    def panel_unit_size(self):
+        return self._panel_unit_size
+
+    @panel_unit_size.setter
+    def panel_unit_size(self, value):
+        assert isinstance(value, (int, float, list, np.ndarray))
+        assert (np.asarray(value) > 0).all()
+
+        self._panel_unit_size = value
+
+    @property
+    def installation_cost(self):
+        return self._installation_cost
+
+    @installation_cost.setter
+    def installation_cost(self, value):
+        assert isinstance(value, (int, float, list, np.ndarray))
+        assert (np.asarray(value) >= 0).all()
+
+        self._installation_cost = value
+
+    @property
+    def presolve(self):
+        return self._presolve
+
+    @presolve.setter
+    def presolve(self, value):
+        assert isinstance(value, bool)
+
+        self._presolve = value
+
+    @property
+    def has_installation_cost(self):
+        return bool((np.asarray(self.installation_cost) > 0).any())
+
+    def unit_sizes(self, n):
+        """
+        Panel unit size of each bus.
+
+        Args:
+            n (int):
+                The number of buildings/buses, excluding the generator/slack node.
+
+        Returns:
+            numpy.ndarray:
+                Vector with n entries.
+        """
+
+        return self._per_bus(self.panel_unit_size, n)
+
+    def installation_costs(self, n):
+        """
+        Fixed installation cost of each bus.
+
+        Args:
+            n (int):
+                The number of buildings/buses, excluding the generator/slack node.
+
+        Returns:
+            numpy.ndarray:
+                Vector with n entries.
+        """
+
+        return self._per_bus(self.installation_cost, n)
+
+    @staticmethod
+    def _per_bus(value, n):
+        values = np.broadcast_to(np.asarray(value, dtype=float), (n,))
+        return values.copy()
@@ -20,23 +20,39 @@ class Line:
 
         line_type (Line_Type):
             Type of the line. Determines the rating of the line aka how much current can be carried.
+
+        loss_coefficient (int, float):
+            Losses of the line are loss_coefficient * current ** 2, taken from the receiving end.
+            Default: None, lossless.
+
+        loss_segments (int):
+            Number of linear pieces approximating the losses between zero and the rating. Default: 4
+
+        name (str):
+            External id of the line, unique within its grid. Default: None, the grid names it after its position.
     """
 
     id_counter = itertools.count()
 
-    def __init__(self, bus0, bus1, length, line_type):
+    def __init__(self, bus0, bus1, length, line_type, loss_coefficient=None, loss_segments=4, name=None):
 
-        self._id = next(Line.id_counter)
+        self._id = next(Line.id_counter)     # Unique within this process only, see Grid.ids for stable ones
+        self._name = None
 
         self._bus0 = None
         self._bus1 = None
         self._length = None
         self._line_type = None
+        self._loss_coefficient = None
+        self._loss_segments = None
 
         self.bus0 = bus0
         self.bus1 = bus1
         self.length = length
         self.line_type = line_type
+        self.loss_coefficient = loss_coefficient
+        self.loss_segments = loss_segments
+        self.name = name
 
     @property
     def id(self):
@@ -46,6 +62,20 @@ class Line:
     def id(self, value):
         raise PermissionError("No changes in ID of Line possible.")
 
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        if self._name is not None:
+            raise PermissionError("The name of a line can be set only once.")
+        assert isinstance(value, (type(None), str))
+        if value is not None:
+            assert len(value) > 0
+
+        self._name = value
+
     @property
     def bus0(self):
         return self._bus0
@@ -98,3 +128,26 @@ class Line:
         assert isinstance(value, src.line_type.LineType)
 
         self._line_type = value
+
+    @property
+    def loss_coefficient(self):
+        return self._loss_coefficient
+
+    @loss_coefficient.setter
+    def loss_coefficient(self, value):
+        assert isinstance(value, (type(None), int, float))
+        if value is not None:
+            assert value >= 0
+
+        self._loss_coefficient = value
+
+    @property
+    def loss_segments(self):
+        return self._loss_segments
+
+    @loss_segments.setter
+    def loss_segments(self, value):
+        assert isinstance(value, int)
+        assert value > 0
+
+        self._loss_segments = value
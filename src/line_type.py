@@ -12,19 +12,25 @@ class LineType:
 
         rating (int, float):
             The rating in kW (?)
+
+        cost (int, float):
+            Cost per meter of laying a line of this type, in units of the objective. Types with a cost can be chosen
+            when upgrading lines, see LineUpgrade. Default: None
     """
 
     id_counter = itertools.count()
 
-    def __init__(self, name, rating):
+    def __init__(self, name, rating, cost=None):
 
         self._id = next(LineType.id_counter)
 
         self._name = None
         self._rating = None
+        self._cost = None
 
         self.name = name
         self.rating = rating
+        self.cost = cost
 
     @property
     def name(self):
@@ -52,3 +58,15 @@ class LineType:
             assert value >= 0
 
         self._rating = value
+
+    @property
+    def cost(self):
+        return self._cost
+
+    @cost.setter
+    def cost(self, value):
+        if value is not None:
+            assert isinstance(value, (int, float))
+            assert value >= 0
+
+        self._cost = value
@@ -0,0 +1,162 @@
+import casadi as ca
+import numpy as np
+
+import src.flow_analytics
+import src.integer_panel_sizing
+import src.line_type
+
+
+class LineUpgrade:
+    """
+    Chooses which lines to upgrade to a higher rated type of a catalogue together with the panel placement, as
+    mixed-integer linear program solved with HiGHS. A line can switch to every catalogue type with a cost and a
+    higher rating than its own type, at the type's cost per meter times the line's length. Every such choice gets a
+    binary variable, at most one per line is taken, and it raises the rating of both directions of the line.
+
+    Choices are assembled as sparse matrices from the sorted catalogue, nothing of size lines times catalogue
+    entries is built, so grids with thousands of lines and large catalogues stay small. The line losses keep the
+    approximation of the current type, for currents above its rating the last secant is extended.
+
+    Args:
+        grid (Grid):
+            The grid whose lines may be upgraded.
+
+        catalogue (list of LineType):
+            Types lines may switch to, each needs a rating and a cost.
+
+        integer_sizing (IntegerPanelSizing):
+            Panel units of the mixed-integer problem. Default: None, whole square meters.
+
+        solver_options (dict):
+            Options handed to HiGHS. Default: None
+    """
+
+    def __init__(self, grid, catalogue, integer_sizing=None, solver_options=None):
+
+        assert isinstance(catalogue, list)
+        for line_type in catalogue:
+            assert isinstance(line_type, src.line_type.LineType)
+            assert line_type.rating is not None and line_type.cost is not None
+        if integer_sizing is None:
+            integer_sizing = src.integer_panel_sizing.IntegerPanelSizing()
+        assert isinstance(integer_sizing, src.integer_panel_sizing.IntegerPanelSizing)
+
+        self._grid = grid
+        self._catalogue = catalogue
+        self._integer_sizing = integer_sizing
+        self._solver_options = solver_options
+        self._choices = None
+
+    @property
+    def grid(self):
+        return self._grid
+
+    @property
+    def catalogue(self):
+        return self._catalogue
+
+    @property
+    def choices(self):
+        """
+        Every upgrade a line can get.
+
+        Returns:
+            tuple of numpy.ndarray:
+                Line position, catalogue position, added rating and cost of each choice, grouped by line.
+        """
+
+        if self._choices is None:
+            _, _, lengths, ratings = self.grid.create_line_arrays()
+            type_ratings = np.array([line_type.rating for line_type in self.catalogue], dtype=float)
+            type_costs = np.array([line_type.cost for line_type in self.catalogue], dtype=float)
+            order = np.argsort(type_ratings, kind="stable")
+
+            # The types rated above a line are a tail of the sorted catalogue.
+            first = np.searchsorted(type_ratings[order], ratings, side="right")
+            counts = order.size - first
+            lines = np.repeat(np.arange(ratings.size), counts)
+            offsets = np.cumsum(counts) - counts
+            types = order[first[lines] + np.arange(lines.size) - offsets[lines]]
+
+            self._choices = (lines, types, type_ratings[types] - ratings[lines], type_costs[types] * lengths[lines])
+
+        return self._choices
+
+    def create_task(self):
+        """
+        Builds the mixed-integer problem.
+
+        Returns:
+            tuple:
+                The configured OptimisationTask and the choice variables.
+        """
+
+        grid = self.grid
+        num_buses = len(grid.buses)
+        bus0, bus1, _, _ = grid.create_line_arrays()
+        lines, _, added_ratings, costs = self.choices
+        num_choices = lines.size
+
+        task = grid.new_optimisation_task()
+        n = task.num_buildings
+        num_snaps = task.num_snapshots
+        task.create_problem_and_variables(n, num_snaps, 'conic')
+        task.integer_sizing = self._integer_sizing
+        opti = task.task
+        choices = opti.variable(num_choices)
+        opti.set_domain(choices, 'integer')
+
+        # A choice raises the rating of the entries of both directions of its line.
+        num_entries = task.flow_rows.size
+        forward = src.flow_analytics.find_entries(task.flow_rows, task.flow_cols, bus1, bus0, num_buses)
+        backward = src.flow_analytics.find_entries(task.flow_rows, task.flow_cols, bus0, bus1, num_buses)
+        upgrades = ca.DM.triplet(np.concatenate([forward[lines], backward[lines]]).tolist(),
+                                 np.tile(np.arange(num_choices), 2).tolist(), np.tile(added_ratings, 2).tolist(),
+                                 num_entries, num_choices)
+        ratings = ca.DM(task.entry_ratings) + ca.mtimes(upgrades, choices)
+
+        task.create_cost_function(n, num_snaps)
+        if num_choices > 0:
+            opti.minimize(opti.f + ca.dot(ca.DM(costs), choices))
+            upgraded_lines, choice_line = np.unique(lines, return_inverse=True)
+            per_line = ca.DM.triplet(choice_line.tolist(), list(range(num_choices)), [1.0] * num_choices,
+                                     upgraded_lines.size, num_choices)
+            task.subject_to("line upgrade", choices >= 0)
+            task.subject_to("line upgrade", ca.mtimes(per_line, choices) <= 1)
+        task.create_constraint_total_panel_size(n)
+        task.create_constraint_panel_output(n, num_snaps, task.snapshots)
+        task.create_constraint_house_panel_size(n)
+        task.create_constraint_line_rating(n, num_snaps, ratings)
+        task.create_constraint_house_consumption(n, num_snaps)
+        task.create_constraint_generator_production(n, num_snaps)
+        task.create_constraint_generator_capacity(n, num_snaps)
+        task.create_constraint_line_losses(n, num_snaps)
+        task.create_constraint_storage(n, num_snaps, task.snapshots)
+        task.create_constraint_integer_panel_size(n)
+        task.configure_solver(self._solver_options, verbose=False)
+
+        return task, choices
+
+    def solve(self):
+        """
+        Solves the upgrade problem.
+
+        Returns:
+            OptimisationResult:
+                Panel areas and currents. Its statistics hold "upgrades", the catalogue position of the new type
+                by line key for every upgraded line.
+        """
+
+        task, choices = self.create_task()
+        solution, result = task.run_solver()
+
+        lines, types, _, _ = self.choices
+        taken = np.zeros(0, dtype=bool)
+        if lines.size > 0:
+            value = solution.value if solution is not None else task.task.debug.value
+            taken = np.atleast_1d(value(choices)) > 0.5
+        keys = self.grid.ids.line_keys
+        result.stats["upgrades"] = {str(keys[line]): int(line_type) for line, line_type in
+                                    zip(lines[taken], types[taken])}
+
+        return result
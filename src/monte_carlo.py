@@ -0,0 +1,424 @@
+import concurrent.futures
+import os
+
+import numpy as np
+import pandas as pd
+
+import src.grid
+
+
+class ScenarioSampler:
+    """
+    Draws random power draw and sun trajectories around the deterministic ones of a grid.
+
+    Both are disturbed by standard normal noise that is correlated between the buildings, through a factor shared
+    by all of them, and over time, as an autoregressive process from one snapshot to the next. Power draws are
+    scaled log-normally, which keeps them positive and their mean unchanged. Sun factors are scaled by one plus
+    the noise, cut at zero.
+
+    Args:
+        grid (Grid):
+            The grid whose power draws and sun factors are the expected values.
+
+        demand_sigma (int, float):
+            Standard deviation of the logarithm of the power draw factors. Default: 0.1
+
+        sun_sigma (int, float):
+            Standard deviation of the sun factors relative to their expected value. Default: 0.3
+
+        spatial_correlation (int, float):
+            Correlation of the noise between two buildings at the same snapshot, between 0 and 1. Default: 0.5
+
+        temporal_correlation (int, float):
+            Correlation of the noise of a building between two following snapshots, between 0 and 1. Default: 0.8
+    """
+
+    def __init__(self, grid, demand_sigma=0.1, sun_sigma=0.3, spatial_correlation=0.5, temporal_correlation=0.8):
+
+        assert isinstance(grid, src.grid.Grid)
+        for value in (demand_sigma, sun_sigma):
+            assert isinstance(value, (int, float)) and value >= 0
+        for value in (spatial_correlation, temporal_correlation):
+            assert isinstance(value, (int, float)) and 0 <= value <= 1
+
+        n = len(grid.building_buses)
+        self._power_draws = np.array([bus.power_draw for bus in grid.building_buses], dtype=float).T.reshape(
+            len(grid.snapshots), n)
+        self._sun = grid.create_sun_matrix()
+        self._demand_sigma = demand_sigma
+        self._sun_sigma = sun_sigma
+        self._spatial_correlation = spatial_correlation
+        self._temporal_correlation = temporal_correlation
+
+    @property
+    def power_draws(self):
+        return self._power_draws
+
+    @property
+    def sun(self):
+        return self._sun
+
+    def correlated_noise(self, generator, num_samples):
+        """
+        Standard normal noise with the spatial and temporal correlation of the sampler.
+
+        Args:
+            generator (numpy.random.Generator):
+                Source of the random numbers.
+
+            num_samples (int):
+                Number of trajectories.
+
+        Returns:
+            numpy.ndarray:
+                Noise of shape (samples, snapshots, buildings).
+        """
+
+        num_snapshots, n = self.power_draws.shape
+        shared = generator.standard_normal((num_samples, num_snapshots, 1))
+        local = generator.standard_normal((num_samples, num_snapshots, n))
+        noise = np.sqrt(self._spatial_correlation) * shared + np.sqrt(1 - self._spatial_correlation) * local
+
+        phi = self._temporal_correlation
+        for t in range(1, num_snapshots):
+            noise[:, t] = phi * noise[:, t - 1] + np.sqrt(1 - phi ** 2) * noise[:, t]
+
+        return noise
+
+    def sample(self, num_samples, seed=None):
+        """
+        Draws trajectories of all buildings at all snapshots of the grid at once.
+
+        Args:
+            num_samples (int):
+                Number of trajectories.
+
+            seed (int, numpy.random.SeedSequence):
+                Seed of the random numbers, equal seeds give equal samples. Default: None
+
+        Returns:
+            tuple of numpy.ndarray:
+                Power draws and sun factors, both of shape (samples, snapshots, buildings).
+        """
+
+        assert isinstance(num_samples, int) and num_samples >= 0
+        generator = np.random.default_rng(seed)
+
+        sigma = self._demand_sigma
+        power_draws = self.power_draws * np.exp(sigma * self.correlated_noise(generator, num_samples) - sigma ** 2 / 2)
+        sun = self.sun * np.clip(1 + self._sun_sigma * self.correlated_noise(generator, num_samples), 0, None)
+
+        return power_draws, sun
+
+
+def create_flow_task(grid, solver_options=None):
+    """
+    Builds the problem of the grid with its current build out fixed and the power draws and sun factors as
+    parameters, so it can be solved for many trajectories without building it again.
+
+    Args:
+        grid (Grid):
+            The grid, its panel sizes are the build out.
+
+        solver_options (dict):
+            Options handed to IPOPT. Default: None
+
+    Returns:
+        tuple:
+            The OptimisationTask, the power draw parameter and the sun parameter, both (snapshots, buildings).
+    """
+
+    n = len(grid.building_buses)
+    task = grid.new_optimisation_task()
+    num_snaps = task.num_snapshots
+
+    task.create_problem_and_variables(n, num_snaps)
+    power_draw_parameter = task.task.parameter(len(num_snaps), n)
+    sun_parameter = task.task.parameter(len(num_snaps), n)
+
+    task.create_cost_function(n, num_snaps)
+    task.create_constraint_fixed_panel_size(n, [bus.panel.size for bus in grid.building_buses])
+    task.create_constraint_panel_output(n, num_snaps, task.snapshots, sun_factors=sun_parameter)
+    task.create_constraint_line_rating(n, num_snaps)
+    task.create_constraint_house_consumption(n, num_snaps, power_draws=power_draw_parameter)
+    task.create_constraint_generator_production(n, num_snaps)
+    task.create_constraint_generator_capacity(n, num_snaps)
+    task.create_constraint_line_losses(n, num_snaps)
+    task.create_constraint_storage(n, num_snaps, task.snapshots)
+
+    task.configure_solver(solver_options, verbose=False)
+
+    return task, power_draw_parameter, sun_parameter
+
+
+def evaluate_samples(grid, sampler, directory, start, stop, seed, solver_options=None):
+    """
+    Draws and evaluates the samples start to stop and writes their outcome into the files of the directory.
+    Lives on module level so process pools can pickle it.
+
+    Args:
+        grid (Grid):
+            The grid with its build out.
+
+        sampler (ScenarioSampler):
+            Draws the trajectories.
+
+        directory (str):
+            Folder with the files created by MonteCarloEvaluation.run.
+
+        start (int):
+            Position of the first sample.
+
+        stop (int):
+            Position after the last sample.
+
+        seed (numpy.random.SeedSequence):
+            Seed of this block of samples.
+
+        solver_options (dict):
+            Options handed to IPOPT. Default: None
+    """
+
+    task, power_draw_parameter, sun_parameter = create_flow_task(grid, solver_options)
+    opti = task.task
+    power_draws, sun = sampler.sample(stop - start, seed)
+
+    bus0, bus1, _, ratings = grid.create_line_arrays()
+    num_buses = len(grid.buses)
+    entries = pd.Series(np.arange(task.flow_rows.size), index=task.flow_cols * num_buses + task.flow_rows)
+    forward = entries.loc[bus1 * num_buses + bus0].values
+    backward = entries.loc[bus0 * num_buses + bus1].values
+
+    generator_import = np.load(os.path.join(directory, "generator_import.npy"), mmap_mode="r+")
+    line_loading = np.load(os.path.join(directory, "line_loading.npy"), mmap_mode="r+")
+    success = np.load(os.path.join(directory, "success.npy"), mmap_mode="r+")
+
+    previous = None
+    for k in range(stop - start):
+        opti.set_value(power_draw_parameter, power_draws[k])
+        opti.set_value(sun_parameter, sun[k])
+        if previous is not None:
+            opti.set_initial(previous.value_variables())     # Samples are alike, the last one is a good start
+
+        try:
+            solution, result = task.run_solver()
+        except RuntimeError:
+            success[start + k] = False       # Infeasible trajectory, e.g. more demand than the lines carry
+            continue
+
+        previous = solution
+        flows = result.flow_values
+        generator_import[start + k] = result.generator_import
+        line_loading[start + k] = (flows[:, forward] + flows[:, backward]) / np.where(ratings > 0, ratings, np.inf)
+        success[start + k] = result.success
+
+    for values in (generator_import, line_loading, success):
+        values.flush()
+
+
+class MonteCarloReport:
+    """
+    Outcome of a Monte Carlo evaluation, read from its directory. The arrays are memory mapped, so only the parts
+    used are loaded.
+
+    Args:
+        directory (str):
+            Folder written by MonteCarloEvaluation.run.
+    """
+
+    def __init__(self, directory):
+        self._directory = directory
+        self._generator_import = np.load(os.path.join(directory, "generator_import.npy"), mmap_mode="r")
+        self._line_loading = np.load(os.path.join(directory, "line_loading.npy"), mmap_mode="r")
+        self._success = np.load(os.path.join(directory, "success.npy"), mmap_mode="r")
+        self._line_keys = np.load(os.path.join(directory, "line_keys.npy"))
+
+    @property
+    def directory(self):
+        return self._directory
+
+    @property
+    def generator_import(self):
+        """
+        Generator production of every sample at every snapshot, NaN for failed samples.
+        """
+        return self._generator_import
+
+    @property
+    def line_loading(self):
+        """
+        Current over rating of every sample, snapshot and line, NaN for failed samples.
+        """
+        return self._line_loading
+
+    @property
+    def success(self):
+        return self._success
+
+    @property
+    def line_keys(self):
+        return self._line_keys
+
+    @property
+    def num_samples(self):
+        return self.success.size
+
+    @property
+    def failure_rate(self):
+        return 1 - float(self.success.mean()) if self.num_samples else 0.0
+
+    def import_quantiles(self, quantiles=(0.05, 0.5, 0.95)):
+        """
+        Distribution of the generator import over the successful samples.
+
+        Args:
+            quantiles (tuple of float):
+                Probabilities between 0 and 1. Default: (0.05, 0.5, 0.95)
+
+        Returns:
+            numpy.ndarray:
+                Quantile q of the import at snapshot t in its entry [q, t].
+        """
+
+        return np.quantile(self.generator_import[self.success], quantiles, axis=0)
+
+    def loading_quantiles(self, quantiles=(0.05, 0.5, 0.95), block_size=1000):
+        """
+        Distribution of the peak loading of every line, the highest loading over the snapshots of a sample.
+        Read in blocks of samples, so the loadings never have to fit into memory at once.
+
+        Args:
+            quantiles (tuple of float):
+                Probabilities between 0 and 1. Default: (0.05, 0.5, 0.95)
+
+            block_size (int):
+                Number of samples read at once. Default: 1000
+
+        Returns:
+            pandas.DataFrame:
+                The quantiles as index and the line keys as columns.
+        """
+
+        peaks = np.empty((self.num_samples, self.line_keys.size))
+        for start in range(0, self.num_samples, block_size):
+            peaks[start:start + block_size] = self.line_loading[start:start + block_size].max(axis=1)
+
+        return pd.DataFrame(np.quantile(peaks[self.success], quantiles, axis=0), index=list(quantiles),
+                            columns=self.line_keys)
+
+    def overload_probability(self, threshold=0.99, block_size=1000):
+        """
+        Share of the successful samples in which a line reaches a loading at some snapshot.
+
+        Args:
+            threshold (int, float):
+                Loading that counts, 1 is the full rating. Default: 0.99
+
+            block_size (int):
+                Number of samples read at once. Default: 1000
+
+        Returns:
+            pandas.Series:
+                The probability of every line, indexed by line key.
+        """
+
+        counts = np.zeros(self.line_keys.size)
+        for start in range(0, self.num_samples, block_size):
+            loading = self.line_loading[start:start + block_size][self.success[start:start + block_size]]
+            counts += (loading >= threshold).any(axis=1).sum(axis=0)
+
+        return pd.Series(counts / max(1, int(self.success.sum())), index=self.line_keys)
+
+
+class MonteCarloEvaluation:
+    """
+    Evaluates the current build out of a grid against many random trajectories of power draws and sun factors.
+    Only the currents are optimised, the problem is built once per worker and re-solved for each sample. Outcomes
+    are written into memory mapped files as they come in, so the samples never have to fit into memory.
+
+    Args:
+        grid (Grid):
+            The grid with its build out, e.g. after Grid.optimise.
+
+        sampler (ScenarioSampler):
+            Draws the trajectories. Default: None, a ScenarioSampler with its default spread.
+
+        solver_options (dict):
+            Options handed to IPOPT. Default: None
+    """
+
+    def __init__(self, grid, sampler=None, solver_options=None):
+
+        assert isinstance(grid, src.grid.Grid)
+        if sampler is None:
+            sampler = ScenarioSampler(grid)
+        assert isinstance(sampler, ScenarioSampler)
+
+        self._grid = grid
+        self._sampler = sampler
+        self._solver_options = solver_options
+
+    @property
+    def grid(self):
+        return self._grid
+
+    @property
+    def sampler(self):
+        return self._sampler
+
+    def run(self, num_samples, directory, seed=None, block_size=100, processes=None):
+        """
+        Draws and evaluates the samples in blocks, in parallel if wanted. Every block has its own seed derived from
+        the given one, so the samples do not depend on the number of processes.
+
+        Args:
+            num_samples (int):
+                Number of trajectories.
+
+            directory (str):
+                Folder for the result files, created if missing. Existing results are overwritten.
+
+            seed (int):
+                Seed of the random numbers. Default: None
+
+            block_size (int):
+                Samples drawn and evaluated by one worker at once. Default: 100
+
+            processes (int):
+                Number of worker processes. Default: None, all blocks are evaluated in this process.
+
+        Returns:
+            MonteCarloReport:
+                Distributions of the generator import and the line loadings.
+        """
+
+        assert isinstance(num_samples, int) and num_samples > 0
+        assert isinstance(block_size, int) and block_size > 0
+        os.makedirs(directory, exist_ok=True)
+
+        num_snapshots = len(self.grid.snapshots)
+        files = {"generator_import": (np.float64, (num_samples, num_snapshots), np.nan),
+                 "line_loading": (np.float64, (num_samples, num_snapshots, len(self.grid.lines)), np.nan),
+                 "success": (np.bool_, (num_samples,), False)}
+        for name, (dtype, shape, fill) in files.items():
+            values = np.lib.format.open_memmap(os.path.join(directory, name + ".npy"), mode="w+", dtype=dtype,
+                                               shape=shape)
+            values[:] = fill
+            values.flush()
+            del values
+        np.save(os.path.join(directory, "line_keys.npy"), self.grid.ids.line_keys)
+
+        starts = list(range(0, num_samples, block_size))
+        seeds = np.random.SeedSequence(seed).spawn(len(starts))
+        blocks = [(self.grid, self.sampler, directory, start, min(start + block_size, num_samples), block_seed,
+                   self._solver_options) for start, block_seed in zip(starts, seeds)]
+
+        if processes is None:
+            for block in blocks:
+                evaluate_samples(*block)
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+                for future in [executor.submit(evaluate_samples, *block) for block in blocks]:
+                    future.result()
+
+        return MonteCarloReport(directory)
@@ -0,0 +1,344 @@
+import numpy as np
+
+
+class OptimisationResult:
+    """
+    The numbers of a solved optimisation task, detached from CasADi so they can be stored, pickled or sent around.
+
+    Args:
+        snapshots (numpy.ndarray, list):
+            Points in time (hours) the flows belong to.
+
+        flows (numpy.ndarray):
+            Array of shape (snapshots, num_buses, num_buses) holding the current matrix xt of every snapshot.
+            Entry [t, i, j] is the current from Bus_j to Bus_i, the diagonal is the production of the bus.
+            The last rows and columns belong to the generator buses.
+            If flow_index is given, only the stored entries as array of shape (snapshots, entries).
+
+        panel_sizes (numpy.ndarray):
+            The optimised panel area of each bus, excluding the generator buses.
+
+        objective (int, float):
+            Value of the cost function at the solution. Can be None if it is not meaningful, e.g. for a single
+            step taken out of a larger window.
+
+        stats (dict):
+            Solver statistics as returned by CasADi. Default: None
+
+        flow_index (tuple of numpy.ndarray):
+            Row and column of each stored entry of the current matrices, has to contain the whole diagonal.
+            Entries not stored are zero. Default: None, flows are dense matrices.
+
+        storage_levels (numpy.ndarray):
+            Matrix with the state of charge of storage k at the end of snapshot t in its entry [t, k].
+            Default: None, no storage.
+
+        storage_buses (list of int):
+            Position of the bus of each storage. Default: None, no storage.
+
+        rating_duals (numpy.ndarray):
+            Dual values of the line ratings, shape (snapshots, entries) like the stored flows: what the objective
+            would drop per unit more rating of the entry. Default: None, not available.
+
+        balance_duals (numpy.ndarray):
+            Dual values of the balance of the buildings, shape (snapshots, buildings): what the objective would
+            rise per unit more power draw. Default: None, not available.
+
+        budget_dual (float):
+            Dual value of the total panel size: what the objective would drop per square meter more panels.
+            Default: None, not available.
+    """
+
+    def __init__(self, snapshots, flows, panel_sizes, objective=None, stats=None, flow_index=None,
+                 storage_levels=None, storage_buses=None, rating_duals=None, balance_duals=None, budget_dual=None):
+
+        self._snapshots = None
+        self._flow_values = None
+        self._flow_rows = None
+        self._flow_cols = None
+        self._flows = None
+        self._storage_levels = None
+        self._storage_buses = None
+        self._panel_sizes = None
+        self._rating_duals = None
+        self._balance_duals = None
+        self._budget_dual = None
+        self._objective = None
+        self._stats = None
+
+        self.snapshots = snapshots
+        if flow_index is None:
+            flows = np.asarray(flows, dtype=float)
+            assert flows.ndim == 3
+            assert flows.shape[1] == flows.shape[2]
+
+            # Only entries that are nonzero at some snapshot are kept, the diagonal always.
+            stored = (flows != 0).any(axis=0) | np.eye(flows.shape[1], dtype=bool)
+            flow_index = np.nonzero(stored)
+            flows = flows[:, flow_index[0], flow_index[1]]
+        self.flow_rows, self.flow_cols = flow_index
+        self.flow_values = flows
+        self.panel_sizes = panel_sizes
+        self.storage_buses = storage_buses
+        self.storage_levels = storage_levels
+        self.rating_duals = rating_duals
+        self.balance_duals = balance_duals
+        self.budget_dual = budget_dual
+        self.objective = objective
+        self.stats = stats
+
+    @property
+    def snapshots(self):
+        return self._snapshots
+
+    @snapshots.setter
+    def snapshots(self, value):
+        if self._snapshots is not None:
+            raise PermissionError("Snapshots of a result can not be changed.")
+
+        assert isinstance(value, (np.ndarray, list))
+        self._snapshots = np.asarray(value, dtype=float)
+
+    @property
+    def flow_rows(self):
+        return self._flow_rows
+
+    @flow_rows.setter
+    def flow_rows(self, value):
+        if self._flow_rows is not None:
+            raise PermissionError("Flows of a result can not be changed.")
+
+        self._flow_rows = np.asarray(value, dtype=int).reshape(-1)
+
+    @property
+    def flow_cols(self):
+        return self._flow_cols
+
+    @flow_cols.setter
+    def flow_cols(self, value):
+        if self._flow_cols is not None:
+            raise PermissionError("Flows of a result can not be changed.")
+
+        value = np.asarray(value, dtype=int).reshape(-1)
+        assert value.shape == self.flow_rows.shape
+
+        self._flow_cols = value
+
+    @property
+    def flow_values(self):
+        return self._flow_values
+
+    @flow_values.setter
+    def flow_values(self, value):
+        if self._flow_values is not None:
+            raise PermissionError("Flows of a result can not be changed.")
+
+        value = np.asarray(value, dtype=float)
+        assert value.ndim == 2
+        assert value.shape == (self.snapshots.size, self.flow_rows.size)
+
+        self._flow_values = value
+
+    @property
+    def num_buses(self):
+        return int(np.count_nonzero(self.flow_rows == self.flow_cols))      # Every bus has a diagonal entry
+
+    @property
+    def num_generators(self):
+        return self.num_buses - self.panel_sizes.size     # Generators do not have a roof
+
+    @property
+    def flows(self):
+        """
+        Dense current matrices, built from the stored entries when first needed.
+
+        Returns:
+            numpy.ndarray:
+                Array of shape (snapshots, num_buses, num_buses).
+        """
+
+        if self._flows is None:
+            flows = np.zeros((self.snapshots.size, self.num_buses, self.num_buses))
+            flows[:, self.flow_rows, self.flow_cols] = self.flow_values
+            self._flows = flows
+
+        return self._flows
+
+    @property
+    def production(self):
+        """
+        Production of every bus for each snapshot, panel output for buildings and import for generators.
+
+        Returns:
+            numpy.ndarray:
+                Matrix of shape (snapshots, num_buses).
+        """
+
+        diagonal = np.flatnonzero(self.flow_rows == self.flow_cols)
+        production = np.zeros((self.snapshots.size, self.num_buses))
+        production[:, self.flow_rows[diagonal]] = self.flow_values[:, diagonal]
+
+        return production
+
+    @property
+    def panel_sizes(self):
+        return self._panel_sizes
+
+    @panel_sizes.setter
+    def panel_sizes(self, value):
+        if self._panel_sizes is not None:
+            raise PermissionError("Panel sizes of a result can not be changed.")
+
+        value = np.asarray(value, dtype=float).reshape(-1)
+        assert value.size < self.num_buses     # At least one generator, which does not have a roof
+
+        self._panel_sizes = value
+
+    @property
+    def storage_buses(self):
+        return self._storage_buses
+
+    @storage_buses.setter
+    def storage_buses(self, value):
+        if self._storage_buses is not None:
+            raise PermissionError("Storage of a result can not be changed.")
+
+        self._storage_buses = np.asarray([] if value is None else value, dtype=int).reshape(-1)
+
+    @property
+    def storage_levels(self):
+        return self._storage_levels
+
+    @storage_levels.setter
+    def storage_levels(self, value):
+        if self._storage_levels is not None:
+            raise PermissionError("Storage of a result can not be changed.")
+
+        if value is None:
+            value = np.zeros((self.snapshots.size, 0))
+        value = np.asarray(value, dtype=float)
+        assert value.shape == (self.snapshots.size, self.storage_buses.size)
+
+        self._storage_levels = value
+
+    @property
+    def rating_duals(self):
+        return self._rating_duals
+
+    @rating_duals.setter
+    def rating_duals(self, value):
+        if self._rating_duals is not None:
+            raise PermissionError("Duals of a result can not be changed.")
+
+        if value is not None:
+            value = np.asarray(value, dtype=float)
+            assert value.shape == self.flow_values.shape
+        self._rating_duals = value
+
+    @property
+    def balance_duals(self):
+        return self._balance_duals
+
+    @balance_duals.setter
+    def balance_duals(self, value):
+        if self._balance_duals is not None:
+            raise PermissionError("Duals of a result can not be changed.")
+
+        if value is not None:
+            value = np.asarray(value, dtype=float)
+            assert value.shape == (self.snapshots.size, self.panel_sizes.size)
+        self._balance_duals = value
+
+    @property
+    def budget_dual(self):
+        return self._budget_dual
+
+    @budget_dual.setter
+    def budget_dual(self, value):
+        if self._budget_dual is not None:
+            raise PermissionError("Duals of a result can not be changed.")
+
+        assert isinstance(value, (type(None), int, float))
+        self._budget_dual = value
+
+    @property
+    def objective(self):
+        return self._objective
+
+    @objective.setter
+    def objective(self, value):
+        assert isinstance(value, (type(None), int, float))
+        self._objective = value
+
+    @property
+    def stats(self):
+        return self._stats
+
+    @stats.setter
+    def stats(self, value):
+        assert isinstance(value, (type(None), dict))
+        self._stats = {} if value is None else value
+
+    @property
+    def status(self):
+        return self.stats.get("return_status")
+
+    @property
+    def success(self):
+        return bool(self.stats.get("success", False))
+
+    @property
+    def feasible(self):
+        return bool(self.stats.get("feasible", self.success))
+
+    @property
+    def budget_exhausted(self):
+        return bool(self.stats.get("budget_exhausted", False))
+
+    @property
+    def generator_production(self):
+        """
+        Production of each generator for each snapshot, negative values are fed back out of the grid.
+
+        Returns:
+            numpy.ndarray:
+                Matrix of shape (snapshots, num_generators), generators in the order of their buses.
+        """
+
+        return self.production[:, self.panel_sizes.size:]
+
+    @property
+    def generator_import(self):
+        """
+        Production of all generators for each snapshot, negative values are fed back out of the grid.
+
+        Returns:
+            numpy.ndarray:
+                Vector with one entry per snapshot.
+        """
+
+        return self.generator_production.sum(axis=1)
+
+    def select(self, snapshot_indices):
+        """
+        Creates a result containing only some of the snapshots, e.g. to hand out single time steps.
+
+        Args:
+            snapshot_indices (int, list of int, slice):
+                Positions of the snapshots to keep.
+
+        Returns:
+            OptimisationResult:
+                New result sharing the panel sizes and statistics, without an objective and budget dual.
+        """
+
+        if isinstance(snapshot_indices, (int, np.integer)):
+            snapshot_indices = [snapshot_indices]
+
+        rating_duals = None if self.rating_duals is None else self.rating_duals[snapshot_indices]
+        balance_duals = None if self.balance_duals is None else self.balance_duals[snapshot_indices]
+
+        return OptimisationResult(self.snapshots[snapshot_indices], self.flow_values[snapshot_indices],
+                                  self.panel_sizes.copy(), None, dict(self.stats), (self.flow_rows, self.flow_cols),
+                                  self.storage_levels[snapshot_indices], self.storage_buses, rating_duals,
+                                  balance_duals)
@@ -1,10 +1,20 @@
 import casadi
+import concurrent.futures
 import pandas as pd
 import numpy as np
 import casadi as ca
 import math
 
 import src.bus
+import src.generator
+import src.optimisation_result
+import src.solver_budget
+import src.integer_panel_sizing
+import src.profiler
+
+GENERATOR_COST = 999999999      # Punishes generator current hard, solar power on the roofs is always preferred
+NO_LINE_LENGTH = 99999999999    # Length matrix entry of bus pairs without a line
+PANEL_COST = 0.0001             # Cost of a square meter of panel per snapshot, keeps panels off useless roofs
 
 
 class OptimisationTask:
@@ -24,9 +34,29 @@ class OptimisationTask:
 
         a (pandas.Series):
             Vector A that has the roof area of Bus_i in its i-th entry.
+
+        power_draws (numpy.ndarray):
+            Matrix with the power draw of Bus_i at snapshot t in its entry [t, i], excluding the generator buses.
+            Defaults to the power draws stored in the buses.
+
+        generators (list of Generator instances):
+            Generators of the grid, their buses have to be the last buses. Default: None, a single generator with
+            unlimited capacity and GENERATOR_COST at the last bus.
+
+        sun_factors (numpy.ndarray):
+            Matrix with the sun factor of Bus_i at snapshot t in its entry [t, i], excluding the generator buses.
+            Default: None, the sun of each snapshot for every bus.
+
+        line_losses (pandas.DataFrame):
+            Lines with losses, columns bus0 and bus1 (bus positions), coefficient and segments, see Line.
+            Default: None, lossless lines.
+
+    The currents are modelled sparse: only entries of xt belonging to a line or to the diagonal are variables,
+    so the problem grows linearly with the number of lines.
     """
 
-    def __init__(self, line_length, line_rating, a, total_panel_size, panel_output_per_sqm, snapshots, buses):
+    def __init__(self, line_length, line_rating, a, total_panel_size, panel_output_per_sqm, snapshots, buses,
+                 power_draws=None, generators=None, sun_factors=None, line_losses=None):
 
         self._L = None
         self._R = None
@@ -35,6 +65,10 @@ class OptimisationTask:
         self._panel_output_per_sqm = None
         self._task = None
         self._solution = None
+        self._result = None
+        self._integer_sizing = None
+        self._total_panel_size_parameter = None
+        self._generator_cost_parameter = None
         self._x_task = None
         self._a_task = None
         self._snapshots = None
@@ -43,6 +77,27 @@ class OptimisationTask:
         self._xt = None
         self._a = None
         self._buses = None
+        self._generators = None
+        self._power_draws = None
+        self._sun_factors = None
+        self._line_losses = None
+        self._flow_task = None
+        self._loss_task = None
+        self._loss_entries = None
+        self._loss_segments = None
+        self._flow_rows = None
+        self._flow_cols = None
+        self._balance_matrix = None
+        self._storage_level = None
+        self._storage_charge = None
+        self._storage_discharge = None
+        self._loss_balance = None
+        self._flow_blocks = None
+        self._entry_lengths = None
+        self._entry_ratings = None
+        self._constraint_blocks = {}
+        self._constraint_index = {}
+        self._profiler = None
 
         self.line_length = line_length
         self.line_rating = line_rating
@@ -51,6 +106,10 @@ class OptimisationTask:
         self.panel_output_per_sqm = panel_output_per_sqm
         self.snapshots = snapshots
         self.buses = buses
+        self.generators = generators
+        self.power_draws = power_draws
+        self.sun_factors = sun_factors
+        self.line_losses = line_losses
 
     @property
     def line_length(self):
@@ -59,11 +118,10 @@ class OptimisationTask:
     @line_length.setter
     def line_length(self, value):
         assert isinstance(value, pd.DataFrame)
-        for row in value.index.values:
-            for column in value.columns.values:
-                assert isinstance(value.loc[row, column], (np.int64, np.float64))
-                assert value.loc[row, column] == value.loc[column, row]     # Symmetry test
-            assert value.loc[row, row] == 0
+        values = value.values
+        assert np.issubdtype(values.dtype, np.number)
+        assert (values == values.T).all()       # Symmetry test
+        assert (np.diag(values) == 0).all()
 
         self._L = value
 
@@ -74,10 +132,9 @@ class OptimisationTask:
     @line_rating.setter
     def line_rating(self, value):
         assert isinstance(value, pd.DataFrame)
-        for row in value.index.values:
-            for column in value.columns.values:
-                assert isinstance(value.loc[row, column], (np.int64, np.float64))
-                assert value.loc[row, column] == value.loc[column, row]     # Tests symmetry
+        values = value.values
+        assert np.issubdtype(values.dtype, np.number)
+        assert (values == values.T).all()       # Tests symmetry
 
         self._R = value
 
@@ -108,7 +165,9 @@ class OptimisationTask:
 
     @panel_output_per_sqm.setter
     def panel_output_per_sqm(self, value):
-        assert isinstance(value, (int, float))
+        # Either the same for every panel or one entry per bus.
+        assert isinstance(value, (int, float, np.ndarray))
+        assert (np.asarray(value) >= 0).all()
 
         self._panel_output_per_sqm = value
 
@@ -134,6 +193,44 @@ class OptimisationTask:
         if self.x is not None:
             raise PermissionError("Not settable")
 
+    @property
+    def x_task(self):
+        return self._x_task
+
+    @property
+    def a_task(self):
+        return self._a_task
+
+    @property
+    def flow_task(self):
+        """
+        The variables of each snapshot, one per stored entry of xt in the order of flow_rows and flow_cols.
+        """
+        return self._flow_task
+
+    @property
+    def storage_level_task(self):
+        """
+        State of charge of each storage at the end of each snapshot, matrix with one row per storage bus.
+        """
+        return self._storage_level
+
+    @property
+    def flow_rows(self):
+        return self._flow_rows
+
+    @property
+    def flow_cols(self):
+        return self._flow_cols
+
+    @property
+    def entry_lengths(self):
+        return self._entry_lengths
+
+    @property
+    def entry_ratings(self):
+        return self._entry_ratings
+
     @property
     def snapshots(self):
         return self._snapshots
@@ -176,6 +273,84 @@ class OptimisationTask:
 
         self._buses = value
 
+    @property
+    def generators(self):
+        return self._generators
+
+    @generators.setter
+    def generators(self, value):
+        if value is None:
+            value = [src.generator.Generator(self.buses[-1])]
+        assert isinstance(value, list)
+        assert len(value) > 0
+        for item in value:
+            assert isinstance(item, src.generator.Generator)
+            assert item.bus.storage is None     # Storage is only modelled at buildings
+
+        # Generators are kept in the order of their buses, which have to close the bus list.
+        positions = sorted((self.buses.index(generator.bus), k) for k, generator in enumerate(value))
+        assert [position for position, _ in positions] == list(range(len(self.buses) - len(value), len(self.buses)))
+
+        self._generators = [value[k] for _, k in positions]
+
+    @property
+    def num_buildings(self):
+        return len(self.buses) - len(self.generators)
+
+    @property
+    def sun_factors(self):
+        return self._sun_factors
+
+    @sun_factors.setter
+    def sun_factors(self, value):
+        if value is not None:
+            value = np.asarray(value, dtype=float)
+            assert value.shape == (len(self.snapshots), self.num_buildings)
+            assert (value >= 0).all()
+
+        self._sun_factors = value
+
+    @property
+    def line_losses(self):
+        return self._line_losses
+
+    @line_losses.setter
+    def line_losses(self, value):
+        if value is not None:
+            assert isinstance(value, pd.DataFrame)
+            assert {"bus0", "bus1", "coefficient", "segments"} <= set(value.columns)
+            assert (value["coefficient"] >= 0).all()
+            assert (value["segments"] > 0).all()
+
+        self._line_losses = value
+
+    @property
+    def storage_buses(self):
+        """
+        Positions of the buildings with a storage.
+        """
+        return [i for i, bus in enumerate(self.buses[:self.num_buildings]) if bus.storage is not None]
+
+    @property
+    def power_draws(self):
+        if self._power_draws is None:
+            # Generator buses are the last buses and do not draw power themselves.
+            n = self.num_buildings
+            return np.array([bus.power_draw for bus in self.buses[:n]], dtype=float).T.reshape(len(self.snapshots), n)
+
+        return self._power_draws
+
+    @power_draws.setter
+    def power_draws(self, value):
+        if value is None:
+            self._power_draws = None
+        else:
+            value = np.asarray(value, dtype=float)
+            assert value.shape == (len(self.snapshots), self.num_buildings)
+            assert (value >= 0).all()       # Power draw is non-negative
+
+            self._power_draws = value
+
     @staticmethod
     def create_energy_consumption(c_max_arg, c_min_arg, t_arg):
         """
@@ -225,216 +400,1087 @@ class OptimisationTask:
         Define function for amount of sunlight we get at given time t
 
         Args:
-            t_arg:
+            t_arg (int, float, list, numpy.ndarray):
+                Hour of the day from 0 to 24, or several of them at once.
 
         Returns:
+            float, numpy.ndarray:
+                The sun factor, an array of them for several hours.
+        """
+        hours = np.asarray(t_arg, dtype=float)
+        s = np.sin(2 * np.pi * (1 / 48) * (hours - 8.5) - 4 / 5 * np.pi) ** 4
+        s = np.where((hours >= 0) & (hours < 16), s, 0.0)     # No sun in the evening and at night
+
+        return float(s) if s.ndim == 0 else s
 
+    @staticmethod
+    def snapshot_durations(snapshots):
         """
-        s = 0
-        if 16 > t_arg >= 0:
-            s = (math.sin((2 * np.pi * (1 / 48) * (t_arg - 8.5) - 4 / 5 * math.pi))) ** 4
-        elif 16 <= t_arg:
-            s = 0
-        if s <= 0:
-            s = 0
+        Hours each snapshot lasts: the gap to the next snapshot, wrapping around midnight.
+        The last snapshot lasts as long as the one before, a single snapshot one hour.
+
+        Args:
+            snapshots (list, numpy.ndarray):
+                Points in time (hours).
+
+        Returns:
+            numpy.ndarray:
+                Duration of each snapshot.
+        """
+        snapshots = np.asarray(snapshots, dtype=float)
+        if snapshots.size < 2:
+            return np.ones(snapshots.size)
+
+        gaps = np.diff(snapshots) % 24
+        return np.append(gaps, gaps[-1])
+
+    @property
+    def constraint_blocks(self):
+        """
+        The constraints of the problem by block name, e.g. "line rating", in the order they were added.
+        """
+        return self._constraint_blocks
+
+    def subject_to(self, block, constraint, index=None):
+        """
+        Adds a constraint to the problem and remembers it in a named block, so the block can later be dropped
+        without building the others again.
+
+        Args:
+            block (str):
+                Name of the block, usually the constraint family.
+
+            constraint (casadi.MX):
+                The constraint expression.
+
+            index (tuple):
+                What the rows of the constraint belong to, e.g. the snapshot and the flow entries, so their dual
+                values can be mapped back. Default: None
+        """
+        self._constraint_blocks.setdefault(block, []).append(constraint)
+        self._constraint_index.setdefault(block, []).append(index)
+        self.task.subject_to(constraint)
+
+    def remove_constraint_blocks(self, *blocks):
+        """
+        Drops whole constraint blocks. CasADi can only drop all constraints at once, so the constraint set of the
+        problem is cleared and every remaining constraint is added again from its stored expression. The
+        expressions are reused, but the next solve builds the solver for all constraints again.
+
+        Args:
+            *blocks (str):
+                Names of the blocks to drop.
+        """
+        for block in blocks:
+            self._constraint_blocks.pop(block, None)
+            self._constraint_index.pop(block, None)
+
+        self.task.subject_to()
+        for constraints in self._constraint_blocks.values():
+            for constraint in constraints:
+                self.task.subject_to(constraint)
+
+    def add_flow_block(self, rows, cols, lengths, ratings):
+        """
+        Adds entries to the current matrices after the problem was created, e.g. for a new line. Every snapshot
+        gets new variables that are appended to its flow vector. Constraints using the balance matrices have to be
+        created again, all other constraints stay valid. The next solve builds the solver again.
+
+        Args:
+            rows (list of int):
+                Row of each new entry, the receiving bus.
+
+            cols (list of int):
+                Column of each new entry, the sending bus.
+
+            lengths (list of int, float):
+                Line length of each new entry, 0 for diagonal entries.
+
+            ratings (list of int, float):
+                Line rating of each new entry, 0 for diagonal entries.
+
+        Returns:
+            list of int:
+                Positions of the new entries in the flow vector of each snapshot.
+        """
+        rows = np.asarray(rows, dtype=int)
+        cols = np.asarray(cols, dtype=int)
+        stored = set(zip(self.flow_rows.tolist(), self.flow_cols.tolist()))
+        assert not stored & set(zip(rows.tolist(), cols.tolist()))     # Entries are unique
+
+        positions = list(range(self.flow_rows.size, self.flow_rows.size + rows.size))
+        self._flow_rows = np.concatenate([self.flow_rows, rows])
+        self._flow_cols = np.concatenate([self.flow_cols, cols])
+        self._entry_lengths = np.concatenate([self._entry_lengths, np.asarray(lengths, dtype=float)])
+        self._entry_ratings = np.concatenate([self._entry_ratings, np.asarray(ratings, dtype=float)])
+
+        for t, blocks in enumerate(self._flow_blocks):
+            blocks.append(self.task.variable(rows.size))
+            self._flow_task[t] = ca.vertcat(*blocks)
+        self.update_balance_matrices()
+        self.update_current_matrices()
+
+        return positions
+
+    def add_building(self, bus):
+        """
+        Adds a building bus after the problem was created. It is placed behind the other buildings, the generator
+        buses move one position back. Its panel area is appended to a_task and its production gets a new entry.
+
+        Args:
+            bus (Bus):
+                The new bus, not yet part of the task.
+
+        Returns:
+            casadi.MX:
+                The panel area variable of the new bus.
+        """
+        assert isinstance(bus, src.bus.Bus)
+        assert bus not in self.buses
+        assert bus.storage is None      # Storage couples all snapshots, it can not be added later
+
+        n = self.num_buildings
+        self._flow_rows = np.where(self.flow_rows >= n, self.flow_rows + 1, self.flow_rows)
+        self._flow_cols = np.where(self.flow_cols >= n, self.flow_cols + 1, self.flow_cols)
+        self._buses = self.buses[:n] + [bus] + self.buses[n:]
+        if np.ndim(self.panel_output_per_sqm) > 0:
+            self._panel_output_per_sqm = np.insert(self.panel_output_per_sqm, n, bus.panel.effective_output_per_sqm)
+
+        panel_size = self.task.variable()
+        self._a_task = ca.vertcat(self._a_task, panel_size)
+        self.add_flow_block([n], [n], [0], [0])
+
+        return panel_size
+
+    def add_snapshot(self, snapshot):
+        """
+        Adds variables for one more snapshot after the problem was created. Its constraints and costs are added
+        by calling the creating methods with a range holding only the new snapshot.
+
+        Args:
+            snapshot (int, float):
+                Point in time (hours).
+
+        Returns:
+            int:
+                Position of the new snapshot.
+        """
+        assert isinstance(snapshot, (int, float))
+        assert not self.storage_buses      # Storage couples all snapshots, they can not be added later
+
+        self._snapshots = list(self.snapshots) + [snapshot]
+        self._flow_blocks.append([self.task.variable(self.flow_rows.size)])
+        self._flow_task.append(self._flow_blocks[-1][0])
+        if self._loss_entries is not None:
+            self._loss_task.append(self.task.variable(self._loss_entries.size))
+        self.update_current_matrices()
 
-        return s
+        return len(self.snapshots) - 1
+
+    def update_current_matrices(self):
+        """
+        Builds xt of every snapshot again from its flow variables, after entries or snapshots were added.
+        """
+
+        num_buses = len(self.buses)
+        order = np.lexsort((self.flow_rows, self.flow_cols))     # Column major, the order of the casadi nonzeros
+        sparsity = ca.Sparsity.triplet(num_buses, num_buses, self.flow_rows[order].tolist(),
+                                       self.flow_cols[order].tolist())
+        self._x_task = [ca.MX(sparsity, flows[order.tolist()]) for flows in self._flow_task]
+
+    def create_flow_structure(self, n):
+        """
+        Finds the entries of xt that get a variable: both directions of every line and the diagonal.
+        Also creates the balance matrix B, (B @ flows)[i] is the production plus inflow minus outflow of Bus_i.
+
+        Args:
+            n (int):
+                The number of buildings/buses, excluding the generator buses.
+
+        Returns:
+            casadi.Sparsity:
+                The sparsity pattern of xt.
+        """
+
+        num_buses = len(self.line_length)
+        stored = (self.line_length.values < NO_LINE_LENGTH) | np.eye(num_buses, dtype=bool)
+        cols, rows = np.nonzero(stored.T)       # Column major, the order of the casadi nonzeros
+        sparsity = ca.Sparsity.triplet(num_buses, num_buses, rows.tolist(), cols.tolist())
+
+        self._flow_rows = rows
+        self._flow_cols = cols
+        self._entry_lengths = np.where(rows != cols, self.line_length.values[rows, cols], 0).astype(float)
+        self._entry_ratings = np.where(rows != cols, self.line_rating.values[rows, cols], 0).astype(float)
+        self.create_loss_structure(num_buses)
+        self.update_balance_matrices()
+
+        return sparsity
+
+    def update_balance_matrices(self):
+        """
+        Builds the balance matrix B from the stored entries, (B @ flows)[i] is the production plus inflow minus
+        outflow of Bus_i, and the matrix taking the line losses from the receiving buses.
+        """
 
-    def create_problem_and_variables(self, n, num_snaps):
+        rows = self.flow_rows
+        cols = self.flow_cols
+        num_buses = len(self.buses)
+
+        entries = np.arange(rows.size)
+        off_diagonal = rows != cols
+        # x[i, j] flows into i and out of j, the diagonal is production.
+        balance_rows = np.concatenate([rows, cols[off_diagonal]])
+        balance_cols = np.concatenate([entries, entries[off_diagonal]])
+        balance_values = np.concatenate([np.ones(rows.size), -np.ones(np.count_nonzero(off_diagonal))])
+        self._balance_matrix = ca.DM.triplet(balance_rows.tolist(), balance_cols.tolist(), balance_values.tolist(),
+                                             num_buses, rows.size)
+
+        if self._loss_entries is not None:
+            # The receiving bus of x[i, j] is i, it gets the current minus the loss.
+            loss_entries = self._loss_entries
+            self._loss_balance = ca.DM.triplet(rows[loss_entries].tolist(), list(range(loss_entries.size)),
+                                               [-1.0] * loss_entries.size, num_buses, loss_entries.size)
+
+    def create_loss_structure(self, num_buses):
+        """
+        Prepares the piecewise-linear line losses: both directions of every lossy line get a loss variable that
+        lies above the secants of coefficient * current ** 2 between equally spaced currents from zero to the
+        rating. All secants of all lines are stacked into one sparse matrix.
+
+        Args:
+            num_buses (int):
+                Number of buses, including the generator buses.
+        """
+
+        self._loss_entries = None
+        if self.line_losses is None or len(self.line_losses) == 0:
+            return
+
+        bus0 = self.line_losses["bus0"].values.astype(int)
+        bus1 = self.line_losses["bus1"].values.astype(int)
+        # Entries are sorted by column, then row, so their linear position finds them.
+        linear_entries = self.flow_cols * num_buses + self.flow_rows
+        entries = np.searchsorted(linear_entries, np.concatenate([bus0 * num_buses + bus1, bus1 * num_buses + bus0]))
+        coefficients = np.tile(self.line_losses["coefficient"].values.astype(float), 2)
+        segments = np.tile(self.line_losses["segments"].values.astype(int), 2)
+        ratings = self.line_rating.values[self.flow_rows[entries], self.flow_cols[entries]].astype(float)
+
+        # One secant per row: loss_k >= slope * current_k + intercept
+        loss_index = np.repeat(np.arange(entries.size), segments)
+        piece = np.concatenate([np.arange(count) for count in segments])
+        lower = ratings[loss_index] * piece / segments[loss_index]
+        upper = ratings[loss_index] * (piece + 1) / segments[loss_index]
+        slopes = coefficients[loss_index] * (lower + upper)
+        intercepts = -coefficients[loss_index] * lower * upper
+
+        num_secants = loss_index.size
+        self._loss_entries = entries
+        self._loss_segments = (ca.DM.triplet(list(range(num_secants)), loss_index.tolist(), [1.0] * num_secants,
+                                             num_secants, entries.size),
+                               ca.DM.triplet(list(range(num_secants)), entries[loss_index].tolist(), slopes.tolist(),
+                                             num_secants, self.flow_rows.size),
+                               ca.DM(intercepts))
+
+    def flow_entries(self, n, kind):
+        """
+        Positions of entries in the flow variables of a snapshot.
+
+        Args:
+            n (int):
+                The number of buildings/buses, excluding the generator buses.
+
+            kind (str):
+                "line" for line currents, "panel" for building production or "generator" for generator production.
+
+        Returns:
+            list of int:
+                Positions, diagonal entries in the order of their buses.
+        """
+
+        rows = self.flow_rows
+        cols = self.flow_cols
+        if kind == "line":
+            return np.flatnonzero(rows != cols).tolist()
+        if kind == "panel":
+            return np.flatnonzero((rows == cols) & (rows < n)).tolist()
+        if kind == "generator":
+            return np.flatnonzero((rows == cols) & (rows >= n)).tolist()
+
+        raise ValueError(f"Unknown kind of flow entry '{kind}'.")
+
+    def create_problem_and_variables(self, n, num_snaps, problem_type='nlp'):
         """
         Initialises the optimisation problem and its variables.
         Args:
             n (int):
-                The number of buildings/buses, excluding the generator/slack node.
+                The number of buildings/buses, excluding the generator buses.
 
             num_snaps (range):
                 Number of snapshots.
 
+            problem_type (str):
+                'nlp' for IPOPT or 'conic' for linear solvers like HiGHS. Default: 'nlp'
+
         """
 
         # create empty optimization problem
-        opti = ca.Opti()
+        opti = ca.Opti(problem_type)
 
-        # define variable(nxn matrix)
+        # define variable(sparse (N)x(N) matrix, only lines and diagonal)
+        sparsity = self.create_flow_structure(n)
 
+        flows = []
         xt = []
+        losses = []
         for _ in num_snaps:
-            xt.append(opti.variable(n + 1, n + 1))
+            flows.append(opti.variable(sparsity.nnz()))
+            xt.append(ca.MX(sparsity, flows[-1]))
+            if self._loss_entries is not None:
+                losses.append(opti.variable(self._loss_entries.size))
 
         a = opti.variable(n, 1)
 
+        num_storages = len(self.storage_buses)
+        if num_storages > 0:
+            self._storage_level = opti.variable(num_storages, len(num_snaps))
+            self._storage_charge = opti.variable(num_storages, len(num_snaps))
+            self._storage_discharge = opti.variable(num_storages, len(num_snaps))
+
         self.task = opti
+        self._flow_blocks = [[variable] for variable in flows]
+        self._flow_task = flows
+        self._loss_task = losses
         self._x_task = xt
         self._a_task = a
 
-    def create_cost_function(self, n, num_snaps, line_ratings=None):
+    def create_cost_function(self, n, num_snaps, line_ratings=None, generator_cost=None, add_to_objective=False,
+                             snapshot_weights=None, panel_cost_weights=None):
         """
         Adds the cost function to the optimisation problem.
 
         Args:
             n (int):
-                The number of buildings/buses, excluding the generator/slack node.
+                The number of buildings/buses, excluding the generator buses.
 
             num_snaps (range):
                 Number of snapshots.
 
             line_ratings (pandas.DataFrame):
                 The length of power lines from each house to another, 0 for house to itself and very high value for
-                nonexistent lines.
+                nonexistent lines. Defaults to the lengths of the stored entries.
+
+            generator_cost (int, float, casadi.MX):
+                Cost per unit of generator current of generators without an own cost, weighs importing against
+                line losses. Default: GENERATOR_COST
+
+            add_to_objective (bool):
+                Adds the costs of the snapshots to the existing objective instead of replacing it, e.g. for
+                snapshots added later. Default: False
+
+            snapshot_weights (list, numpy.ndarray):
+                Weight of the cost of each snapshot, e.g. the probability of the scenario it belongs to.
+                Default: None, every snapshot weighs 1.
+
+            panel_cost_weights (list, numpy.ndarray, casadi.MX):
+                Weight of the panel cost of each snapshot, e.g. parameters switching snapshots off.
+                Default: None, every snapshot weighs 1.
 
         """
-        # define objective, only sum over elements below and in main diagonal
+        # define objective, lines are punished by their length, generators by their cost curves
         opti = self.task
-        xt = self._x_task
         a = self._a_task
+        if generator_cost is None:
+            generator_cost = GENERATOR_COST
+
+        lines = self.flow_entries(n, "line")
+        generators = self.flow_entries(n, "generator")
         if line_ratings is None:
-            line_ratings = self.line_length
+            lengths = self._entry_lengths[lines]
+        else:
+            lengths = line_ratings.values[self.flow_rows[lines], self.flow_cols[lines]].astype(float)
 
         f = 0
         for t in num_snaps:
-            for i in range(n + 1):
-                for j in range(n + 1):
-                    if i == j and i < n:
-                        f += a[i] * 0.0001  # Generator does not have a roof
-                    elif i == j and i == n:
-                        f += 999999999 * (xt[t][n, n])  # Punish generator current hard
-                    else:
-                        # Only x[t][i, j] or x[t][j, i] should ever be nonzero due to >= 0 and cost function punishing
-                        # f += L.iloc[i, j] * xt[t][i, j]  # Punish including generator lines
-                        length = line_ratings.iloc[i, j]
-                        power_flow = xt[t][i, j]
-                        f += length * power_flow      # Punish including generator lines
-
-        opti.minimize(f)
+            flows = self._flow_task[t]
+            weight = 1 if snapshot_weights is None else float(snapshot_weights[t])
+            panel_weight = 1 if panel_cost_weights is None else panel_cost_weights[t]
+            f_t = ca.sum1(a) * PANEL_COST * panel_weight     # Generators do not have a roof
+            # Only x[t][i, j] or x[t][j, i] should ever be nonzero due to >= 0 and cost function punishing
+            f_t += ca.dot(lengths, flows[lines])      # Punish including generator lines
+
+            for generator, entry in zip(self.generators, generators):
+                production = flows[entry]
+                if generator.piecewise:
+                    # Epigraph of the convex cost curve: the cost lies above every segment.
+                    slopes, intercepts = generator.cost_segments()
+                    cost = opti.variable()
+                    self.subject_to("generator cost", cost >= ca.DM(slopes) * production + ca.DM(intercepts))
+                    f_t += cost
+                elif generator.cost is None:
+                    f_t += generator_cost * production     # Punish generator current hard
+                else:
+                    f_t += generator.cost * production
+            f += weight * f_t
+
+        opti.minimize(opti.f + f if add_to_objective else f)
 
     def create_constraint_total_panel_size(self, n, available_panel_size=None):
-        opti = self.task
         a = self._a_task
         if available_panel_size is None:
             available_panel_size = self.total_panel_size
-        # constraint for maximal panel-area we have
-        area_sum = 0
-        for i in range(n):
-            area_sum += a[i]
 
         # constraint how much area of solar panels, we can distribute in total
-        opti.subject_to(area_sum <= available_panel_size)
+        self.subject_to("total panel size", ca.sum1(a) <= available_panel_size)
 
-    def create_constraint_panel_output(self, n, num_snaps, snapshots, maximum_output_per_sqm=None):
-        opti = self.task
-        xt = self._x_task
+    def create_constraint_panel_output(self, n, num_snaps, snapshots, maximum_output_per_sqm=None, sun_factors=None):
         a = self._a_task
         if maximum_output_per_sqm is None:
             maximum_output_per_sqm = self.panel_output_per_sqm
+        if sun_factors is None:
+            sun_factors = self.sun_factors
+        if sun_factors is None:
+            sun_factors = self.sun(snapshots)    # Can also be a casadi parameter
+        output = np.asarray(maximum_output_per_sqm, dtype=float)
+        if output.ndim > 0:
+            output = output[:n]     # Generators at the end of the bus list do not have panels
+        output = ca.DM(np.broadcast_to(output, (n,)))
+        if not isinstance(sun_factors, ca.MX):
+            sun_factors = np.asarray(sun_factors, dtype=float)
+        panels = self.flow_entries(n, "panel")
         # constraint how energy production of house i is connected to area of solar panels
         for t in num_snaps:
-            for i in range(n):
-                opti.subject_to(xt[t][i, i] == maximum_output_per_sqm * self.sun(snapshots[t]) * a[i])
+            if isinstance(sun_factors, ca.MX):
+                # One column is the same sun for every bus, otherwise one column per bus.
+                sun = sun_factors[t, 0] if sun_factors.shape[1] == 1 else sun_factors[t, :].T
+            else:
+                sun = ca.DM(np.broadcast_to(sun_factors[t], (n,)))
+            self.subject_to("panel output", self._flow_task[t][panels] == sun * output * a)
 
     def create_constraint_house_panel_size(self, n, roof_sizes=None):
         opti = self.task
         a = self._a_task
         if roof_sizes is None:
             roof_sizes = self.a     # Different from a_task, a_task is variable, a is actual roof size
-        # constraint that roof area is limited for each house i
-        for bus_num in range(n):
-            opti.subject_to(a[bus_num] <= roof_sizes.iloc[bus_num])
-            opti.subject_to(0 <= a[bus_num])
+        if isinstance(roof_sizes, pd.Series):
+            roof_sizes = roof_sizes.values[:n].astype(float)    # Can also be a casadi expression
+        # constraint that roof area is limited for each house i, panels can not be negative even without sun
+        self.subject_to("house panel size", opti.bounded(0, a, roof_sizes))
 
-    def create_constraint_line_rating(self, n, num_snaps, line_ratings=None):
+    def create_constraint_fixed_panel_size(self, n, panel_sizes):
+        """
+        Fixes the panel areas to an existing build out, leaving only the currents to be optimised.
+        Replaces the total panel size and roof size constraints.
+
+        Args:
+            n (int):
+                The number of buildings/buses, excluding the generator buses.
+
+            panel_sizes (list, numpy.ndarray):
+                Installed panel area of each bus, excluding the generator buses.
+        """
+        a = self._a_task
+        assert len(panel_sizes) == n
+
+        self.subject_to("fixed panel size", a == np.asarray(panel_sizes, dtype=float))
+
+    def create_constraint_integer_panel_size(self, n, integer_sizing=None, roof_sizes=None):
+        """
+        Makes the panel area of each bus a whole number of panel units and adds the fixed installation costs.
+
+        Args:
+            n (int):
+                The number of buildings/buses, excluding the generator buses.
+
+            integer_sizing (IntegerPanelSizing):
+                Panel unit sizes and installation costs, defaults to the integer sizing of the task.
+
+            roof_sizes (pandas.Series):
+                Roof area of each bus, defaults to the roof sizes of the task.
+        """
         opti = self.task
-        xt = self._x_task
+        a = self._a_task
+        if integer_sizing is None:
+            integer_sizing = self.integer_sizing
+        if roof_sizes is None:
+            roof_sizes = self.a
+
+        units = opti.variable(n, 1)
+        opti.set_domain(units, 'integer')
+        self.subject_to("integer panel size", a == integer_sizing.unit_sizes(n) * units)
+        self.subject_to("integer panel size", units >= 0)
+
+        if integer_sizing.has_installation_cost:
+            installed = opti.variable(n, 1)
+            opti.set_domain(installed, 'integer')
+            self.subject_to("integer panel size", opti.bounded(0, installed, 1))
+            # A bus without installation can not have any panel.
+            self.subject_to("integer panel size", a <= roof_sizes.values[:n] * installed)
+
+            opti.minimize(opti.f + ca.dot(integer_sizing.installation_costs(n), installed))
+
+    def create_constraint_line_rating(self, n, num_snaps, line_ratings=None):
+        """
+        Bounds the line currents by the ratings and keeps currents and panel production non-negative.
+
+        Args:
+            n (int):
+                The number of buildings/buses, excluding the generator buses.
+
+            num_snaps (range):
+                Number of snapshots.
+
+            line_ratings (pandas.DataFrame, numpy.ndarray, casadi.MX):
+                The rating matrix R, or a rating for every stored entry in the order of flow_rows.
+                Defaults to the ratings of the stored entries.
+        """
+        lines = self.flow_entries(n, "line")
+        panels = self.flow_entries(n, "panel")
         if line_ratings is None:
-            line_ratings = self.line_rating
+            ratings = self._entry_ratings[lines]
+        elif isinstance(line_ratings, pd.DataFrame):
+            ratings = line_ratings.values[self.flow_rows[lines], self.flow_cols[lines]].astype(float)
+        else:
+            ratings = line_ratings[lines]
         # constraint that each individual power line can only transport in one direction(positivity)
         for t in num_snaps:
-            for i in range(n + 1):
-                for j in range(n + 1):
-                    if [i, j] == [n, n]:
-                        continue        # The generator can take current out of the system.
-                    elif i == j:
-                        opti.subject_to(xt[t][i, j] >= 0)
-                    else:
-                        opti.subject_to(xt[t][i, j] <= line_ratings.iloc[i, j])
-                        opti.subject_to(xt[t][i, j] >= 0)
-
-    def create_constraint_house_consumption(self, n, num_snaps):
-        opti = self.task
-        xt = self._x_task
+            flows = self._flow_task[t]
+            self.subject_to("line rating", flows[lines] <= ratings, (t, lines))
+            self.subject_to("current direction", flows[lines] >= 0)
+            self.subject_to("current direction", flows[panels] >= 0)     # Generators can take current out.
+
+    def create_constraint_house_consumption(self, n, num_snaps, power_draws=None):
+        if power_draws is None:
+            power_draws = self.power_draws      # Can also be a casadi parameter
         # constraint for the amount of energy each individual house consumes for N discrete times between
-        # 0 and 24 hours
+        # 0 and 24 hours: production plus inflow minus outflow, minus what goes into storage
+        balance = self._balance_matrix[:n, :]
+        storage_buses = self.storage_buses
+        placement = ca.DM.triplet(storage_buses, list(range(len(storage_buses))), [1.0] * len(storage_buses), n,
+                                  len(storage_buses))
+        for t in num_snaps:
+            supply = ca.mtimes(balance, self._flow_task[t])
+            if self._loss_entries is not None:
+                supply += ca.mtimes(self._loss_balance[:n, :], self._loss_task[t])
+            if storage_buses:
+                supply -= ca.mtimes(placement, self._storage_charge[:, t] - self._storage_discharge[:, t])
+            self.subject_to("house consumption", supply == ca.reshape(power_draws[t, :], n, 1), (t, list(range(n))))
 
-        current_ending = []
+    def create_constraint_generator_production(self, n, num_snaps):
+        # constraint for the generators: what is coming out minus what is coming in is their production
+        balance = self._balance_matrix[n:, :]
         for t in num_snaps:
-            current_ending.append([])
-            for i in range(n):
-                current_ending[t].append([0])
+            supply = ca.mtimes(balance, self._flow_task[t])
+            if self._loss_entries is not None:
+                supply += ca.mtimes(self._loss_balance[n:, :], self._loss_task[t])
+            self.subject_to("generator production", supply == 0)
+
+    def create_constraint_line_losses(self, n, num_snaps):
+        """
+        Puts the loss of each direction of each lossy line above its secants, so it is at least the piecewise-linear
+        approximation of coefficient * current ** 2. Losses only hurt, the solver keeps them at the approximation.
+
+        Args:
+            n (int):
+                The number of buildings/buses, excluding the generator buses.
+
+            num_snaps (range):
+                Number of snapshots.
+        """
+        if self._loss_entries is None:
+            return
+
+        secant_losses, secant_slopes, intercepts = self._loss_segments
         for t in num_snaps:
-            for i in range(n):
-                for j in range(n + 1):
-                    current_ending[t][i] += xt[t][i, j]
-                    current_ending[t][i] += -xt[t][j, i]
-                current_ending[t][i] += xt[t][i, i]
-                opti.subject_to(self.buses[i].power_draw[t] == current_ending[t][i])
+            losses = self._loss_task[t]
+            secants = ca.mtimes(secant_slopes, self._flow_task[t][:secant_slopes.shape[1]]) + intercepts
+            self.subject_to("line losses", ca.mtimes(secant_losses, losses) >= secants)
+            self.subject_to("line losses", losses >= 0)
 
-    def create_constraint_generator_production(self, n, num_snaps):
-        opti = self.task
-        xt = self._x_task
-        # constraint for the generator
-        current_ending_gen = [0] * len(num_snaps)
+    def create_constraint_generator_capacity(self, n, num_snaps):
+        """
+        Limits the production of generators with a capacity.
+
+        Args:
+            n (int):
+                The number of buildings/buses, excluding the generator buses.
+
+            num_snaps (range):
+                Number of snapshots.
+        """
+        limited = [k for k, generator in enumerate(self.generators) if generator.capacity is not None]
+        if not limited:
+            return
+
+        entries = [self.flow_entries(n, "generator")[k] for k in limited]
+        capacities = np.array([self.generators[k].capacity for k in limited], dtype=float)
         for t in num_snaps:
-            for j in range(n):
-                # What is coming out minus what is coming in, aka production of gen should be xt[t][N, N]
-                current_ending_gen[t] += xt[t][j, n]
-                current_ending_gen[t] += -xt[t][n, j]
-            opti.subject_to(xt[t][n, n] == current_ending_gen[t])
+            self.subject_to("generator capacity", self._flow_task[t][entries] <= capacities)
+
+    def create_constraint_storage(self, n, num_snaps, snapshots, durations=None, initial_charge=None):
+        """
+        Links the state of charge of consecutive snapshots and bounds charge, discharge and state of charge.
+        All snapshots are handled in one vectorised constraint whose Jacobian is banded, each row only touches a
+        state of charge, its predecessor and one charge and discharge variable.
+
+        Args:
+            n (int):
+                The number of buildings/buses, excluding the generator buses.
+
+            num_snaps (range):
+                Number of snapshots.
+
+            snapshots (list, numpy.ndarray):
+                Points in time (hours).
+
+            durations (numpy.ndarray, casadi.MX):
+                Hours each snapshot lasts. Default: None, computed from the snapshots.
 
-    def solve(self):
+            initial_charge (numpy.ndarray, casadi.MX):
+                Energy in each storage before the first snapshot. Default: None, the initial charge of the storages.
+        """
+        storages = [self.buses[i].storage for i in self.storage_buses]
+        if not storages:
+            return
+
+        opti = self.task
+        level = self._storage_level
+        charge = self._storage_charge
+        discharge = self._storage_discharge
+        num_storages = len(storages)
+        num_steps = len(num_snaps)
+        if durations is None:
+            durations = self.snapshot_durations(snapshots)
+        if initial_charge is None:
+            initial_charge = np.array([storage.initial_charge for storage in storages], dtype=float)
+
+        efficiency = ca.repmat(ca.DM([storage.one_way_efficiency for storage in storages]), 1, num_steps)
+        hours = ca.repmat(ca.reshape(durations, 1, num_steps), num_storages, 1)
+        previous = ca.horzcat(ca.reshape(initial_charge, num_storages, 1), level[:, :-1])
+
+        self.subject_to("storage", level == previous + (charge * efficiency - discharge / efficiency) * hours)
+
+        def limits(values):
+            return ca.repmat(ca.DM([np.inf if value is None else value for value in values]), 1, num_steps)
+
+        capacities = limits([storage.capacity for storage in storages])
+        charge_limits = limits([storage.charge_limit for storage in storages])
+        discharge_limits = limits([storage.discharge_limit for storage in storages])
+        self.subject_to("storage", opti.bounded(0, level, capacities))
+        self.subject_to("storage", opti.bounded(0, charge, charge_limits))
+        self.subject_to("storage", opti.bounded(0, discharge, discharge_limits))
+
+    def configure_solver(self, solver_options=None, verbose=True, budget=None):
+        """
+        Sets IPOPT as solver of the task.
+
+        Args:
+            solver_options (dict):
+                Options handed to IPOPT, e.g. {"max_iter": 100}. They overrule the budget. Default: None
+
+            verbose (bool):
+                If False IPOPT does not print anything to the console. Default: True
+
+            budget (SolverBudget):
+                Time and iteration limits and tolerance preset. Default: None
+        """
         opti = self.task
+        if self.integer_sizing is not None:
+            self.configure_integer_solver(solver_options, verbose, budget)
+            return
+
+        plugin_options = {}
+        ipopt_options = {}
+        if not verbose:
+            plugin_options["print_time"] = False
+            ipopt_options["print_level"] = 0
+            ipopt_options["sb"] = "yes"     # Suppresses the IPOPT banner
+        if budget is not None:
+            assert isinstance(budget, src.solver_budget.SolverBudget)
+            ipopt_options.update(budget.ipopt_options())
+        if solver_options is not None:
+            assert isinstance(solver_options, dict)
+            ipopt_options.update(solver_options)
+
+        opti.solver('ipopt', plugin_options, ipopt_options)  # Use IPOPT as solver
+
+    def configure_integer_solver(self, solver_options=None, verbose=True, budget=None):
+        """
+        Sets HiGHS as solver of the task, used for integer panel sizing.
+
+        Args:
+            solver_options (dict):
+                Options handed to HiGHS, e.g. {"mip_rel_gap": 0.01}. They overrule the budget. Default: None
+
+            verbose (bool):
+                If False HiGHS does not print anything to the console. Default: True
+
+            budget (SolverBudget):
+                Time and node limits and gap preset. Default: None
+        """
+        opti = self.task
+        highs_options = {"presolve": "on" if self.integer_sizing.presolve else "off", "output_flag": verbose}
+        if budget is not None:
+            assert isinstance(budget, src.solver_budget.SolverBudget)
+            highs_options.update(budget.highs_options())
+        if solver_options is not None:
+            assert isinstance(solver_options, dict)
+            highs_options.update(solver_options)
+
+        # Without error_on_fail HiGHS would not hand out its incumbent when a limit is hit.
+        opti.solver('highs', {"error_on_fail": False, "highs": highs_options})
+
+    def run_solver(self, budget=None, cancel_event=None, keep_failed=False):
+        """
+        Runs the configured solver once, without storing anything in the task. Can be called repeatedly,
+        e.g. after changing parameter values.
+
+        With a budget, the best point of all iterations is remembered: the feasible one with the lowest objective or,
+        if there is none, the one with the smallest constraint violation. If the budget runs out it is returned
+        instead of raising the solver error.
+
+        Args:
+            budget (SolverBudget):
+                Has to be the budget the solver was configured with. Default: None
+
+            cancel_event (threading.Event):
+                Stops IPOPT at its next iteration once set, e.g. from another thread. Default: None
+
+            keep_failed (bool):
+                If True, a failed solve returns the solver's last point with "success" False instead of raising,
+                e.g. to go on with the next point of a sweep. Default: False
+
+        Returns:
+            tuple:
+                The casadi.OptiSol, None if the budget ran out or the solve failed, and the OptimisationResult.
+
+        Raises:
+            concurrent.futures.CancelledError:
+                If the solve was stopped by the cancel event.
+        """
+        if self.integer_sizing is not None:
+            return self.run_integer_solver(budget, keep_failed)
+
+        opti = self.task
+        best = {}
+        variables = ca.symvar(opti.x)
+        profiler = self.profiler if self.profiler is not None and self.profiler.records_iterations else None
+
+        def after_iteration(iteration):
+            if cancel_event is not None and cancel_event.is_set():
+                # Raising in the callback makes IPOPT stop with User_Requested_Stop
+                raise concurrent.futures.CancelledError(f"Cancelled in iteration {iteration}.")
+            if budget is not None:
+                violation = self.constraint_violation(opti.debug.value)
+                objective = float(opti.debug.value(opti.f))
+                feasible = violation <= budget.feasibility_tolerance
+
+                # Feasible points beat infeasible ones, then lower objective or lower violation wins.
+                key = (0, objective) if feasible else (1, violation)
+                if not best or key < best["key"]:
+                    best.update(key=key, x=[opti.debug.value(variable) for variable in variables],
+                                iteration=iteration, feasible=feasible, violation=violation)
+            if profiler is not None:
+                profiler.iteration(iteration, float(opti.debug.value(opti.f)),
+                                   self.constraint_violation(opti.debug.value))
+
+        if cancel_event is not None or budget is not None or profiler is not None:
+            opti.callback(after_iteration)
+        else:
+            opti.callback()     # Removes callbacks of earlier runs
+
+        try:
+            solution = opti.solve()
+        except RuntimeError as error:
+            if cancel_event is not None and cancel_event.is_set():
+                raise concurrent.futures.CancelledError("Optimisation was cancelled.") from error
+
+            stats = dict(opti.stats())
+            if budget is None or not budget.keep_best or not budget.is_exhausted(stats.get("return_status")) \
+                    or not best:
+                if not keep_failed:
+                    raise
+                stats.update(success=False, budget_exhausted=False, feasible=False)
+                return None, self.create_result(opti.debug.value, stats)
+
+            stats.update(budget_exhausted=True, feasible=best["feasible"], best_iteration=best["iteration"],
+                         constraint_violation=best["violation"])
+            at_best = [variable == value for variable, value in zip(variables, best["x"])]
+
+            return None, self.create_result(lambda expression: opti.debug.value(expression, at_best), stats)
+
+        stats = dict(solution.stats())
+        stats.update(budget_exhausted=False, feasible=bool(stats.get("success", False)))
+
+        return solution, self.create_result(solution, stats)
+
+    def run_integer_solver(self, budget=None, keep_failed=False):
+        """
+        Runs the configured HiGHS solver once, without storing anything in the task.
+        If the budget runs out, HiGHS's best integer point so far (its incumbent) is returned.
+
+        Args:
+            budget (SolverBudget):
+                Has to be the budget the solver was configured with. Default: None
+
+            keep_failed (bool):
+                If True, a failed solve returns the solver's last point with "success" False instead of raising.
+                Default: False
+
+        Returns:
+            tuple:
+                The casadi.OptiSol, None if the budget ran out, and the OptimisationResult.
+        """
+        opti = self.task
+        try:
+            solution = opti.solve_limited()
+        except RuntimeError:
+            solution = None     # Not every limit is accepted by solve_limited, the incumbent is still readable.
+        stats = dict(opti.stats())
+        status = stats.get("return_status")
+
+        if solution is not None and stats.get("success", False):
+            stats.update(budget_exhausted=False, feasible=True)
+            return solution, self.create_result(solution, stats)
+
+        if budget is None or not budget.keep_best or not budget.is_exhausted(status):
+            if not keep_failed:
+                raise RuntimeError(f"HiGHS failed, return_status is '{status}'.")
+            stats.update(success=False, budget_exhausted=False, feasible=False)
+            return None, self.create_result(opti.debug.value, stats)
+
+        violation = self.constraint_violation(opti.debug.value)
+        stats.update(budget_exhausted=True, feasible=violation <= budget.feasibility_tolerance,
+                     constraint_violation=violation)
+
+        return None, self.create_result(opti.debug.value, stats)
+
+    def constraint_violation(self, value):
+        """
+        Largest violation of any constraint of the problem.
+
+        Args:
+            value (callable):
+                Returns the value of an expression at the point to check, e.g. opti.debug.value.
+
+        Returns:
+            float:
+                Zero if all constraints hold.
+        """
+        opti = self.task
+        constraints = np.atleast_1d(value(opti.g))
+        violation = np.maximum(np.atleast_1d(value(opti.lbg)) - constraints,
+                               constraints - np.atleast_1d(value(opti.ubg)))
+
+        return float(max(violation.max(initial=0), 0))
+
+    def solve(self, solver_options=None, verbose=True, cancel_event=None, budget=None):
+        """
+        Solves the problem with IPOPT, or HiGHS for integer panel sizing, and stores the solution and its result.
+
+        Args:
+            solver_options (dict):
+                Options handed to IPOPT. Default: None
+
+            verbose (bool):
+                If False IPOPT does not print anything to the console. Default: True
+
+            cancel_event (threading.Event):
+                Stops IPOPT at its next iteration once set, e.g. from another thread. HiGHS can not be stopped.
+                Default: None
+
+            budget (SolverBudget):
+                Time and iteration limits and tolerance preset. If it runs out, the result holds the best point
+                found and the solution stays None. Default: None
+
+        Raises:
+            concurrent.futures.CancelledError:
+                If the solve was stopped by the cancel event.
+        """
         # define solver
-        opti.solver('ipopt')  # Use IPOPT as solver
+        self.configure_solver(solver_options, verbose, budget)
 
         # solve optimization problem
-        self.solution = opti.solve()
+        solution, result = self.run_solver(budget, cancel_event)
+        if solution is not None:
+            self.solution = solution
+        self.result = result
+
+    @property
+    def profiler(self):
+        return self._profiler
+
+    @profiler.setter
+    def profiler(self, value):
+        if self._profiler is not None:
+            raise PermissionError("The profiler of a task can be set only once.")
+        assert isinstance(value, src.profiler.Profiler)
+
+        value.instrument(self)      # Steps taken from now on are recorded
+        self._profiler = value
+
+    @property
+    def integer_sizing(self):
+        return self._integer_sizing
+
+    @integer_sizing.setter
+    def integer_sizing(self, value):
+        if self.integer_sizing is not None:
+            raise PermissionError("Integer sizing settable only once.")
+        else:
+            assert isinstance(value, src.integer_panel_sizing.IntegerPanelSizing)
+            self._integer_sizing = value
+
+    @property
+    def total_panel_size_parameter(self):
+        return self._total_panel_size_parameter
+
+    @property
+    def generator_cost_parameter(self):
+        return self._generator_cost_parameter
+
+    @property
+    def result(self):
+        return self._result
+
+    @result.setter
+    def result(self, value):
+        if self.result is not None:
+            raise PermissionError("Result settable only once.")
+        else:
+            assert isinstance(value, src.optimisation_result.OptimisationResult)
+            self._result = value
+
+    def create_result(self, solution=None, stats=None):
+        """
+        Copies the values of the solved problem into an OptimisationResult.
+
+        Args:
+            solution (casadi.OptiSol, callable):
+                Solution to read, or a function returning the value of an expression. Defaults to the solution of
+                the task.
+
+            stats (dict):
+                Solver statistics, defaults to the ones of the solution.
+
+        Returns:
+            OptimisationResult:
+                Flows of each snapshot, panel sizes, objective value and solver statistics.
+        """
+        if solution is None:
+            solution = self.solution
+        value = solution if callable(solution) else solution.value
+        if stats is None:
+            stats = dict(solution.stats())
+
+        flows = np.array([np.atleast_1d(value(flows)) for flows in self._flow_task])
+        panel_sizes = np.atleast_1d(value(self._a_task))
+        storage_levels = None
+        if self.storage_buses:
+            storage_levels = np.reshape(value(self._storage_level), (len(self.storage_buses), -1)).T
+        duals = (None, None, None)
+        if not callable(solution) and self.integer_sizing is None:
+            duals = self.create_duals(solution)     # Only a converged continuous problem has meaningful duals
+
+        return src.optimisation_result.OptimisationResult(np.asarray(self.snapshots, dtype=float), flows,
+                                                          panel_sizes, float(value(self.task.f)), stats,
+                                                          (self.flow_rows, self.flow_cols), storage_levels,
+                                                          self.storage_buses, *duals)
+
+    def create_duals(self, solution):
+        """
+        Reads the dual values of the line ratings, the balance of the buildings and the total panel size from the
+        solution, as sensitivities of the objective. Positive values of line ratings and the total panel size are
+        what the objective would drop per unit more rating or panel area, the balance duals are what it would rise
+        per unit more power draw.
+
+        Args:
+            solution (casadi.OptiSol):
+                Solution of the task.
+
+        Returns:
+            tuple:
+                Line rating duals of shape (snapshots, entries) in the order of flow_rows, zero on the diagonal,
+                balance duals of shape (snapshots, num_buildings) and the total panel size dual, each None if the
+                problem does not have the constraints.
+        """
+
+        opti = self.task
+        shape = (len(self.snapshots), self.flow_rows.size)
+        values = {}
+        for block in ("line rating", "house consumption", "total panel size"):
+            constraints = self._constraint_blocks.get(block, [])
+            if constraints:
+                duals = np.atleast_1d(solution.value(ca.vertcat(*[opti.dual(c) for c in constraints])))
+                values[block] = np.split(duals, np.cumsum([c.numel() for c in constraints])[:-1])
+
+        rating_duals = None
+        if "line rating" in values:
+            rating_duals = np.zeros(shape)
+            for (t, entries), duals in zip(self._constraint_index["line rating"], values["line rating"]):
+                rating_duals[t, entries] = duals
+
+        balance_duals = None
+        if "house consumption" in values:
+            balance_duals = np.zeros((shape[0], self.num_buildings))
+            for (t, buses), duals in zip(self._constraint_index["house consumption"], values["house consumption"]):
+                balance_duals[t, buses] = -duals      # The draw is on the right hand side of the equality
+
+        budget_dual = None
+        if "total panel size" in values:
+            budget_dual = float(values["total panel size"][-1][0])
+
+        return rating_duals, balance_duals, budget_dual
 
     def print_solution(self):
-        xt = self._x_task
-        a = self._a_task
-        sol = self.solution
+        result = self.result
         num_snaps = self.num_snapshots
 
         # read and print solution
-        xopt = []
-        for t in num_snaps:
-            xopt.append(sol.value(xt[t]))
-        aopt = sol.value(a)
         print("#########################################")
         for t in num_snaps:
-            print(xopt[t].round(decimals=2))
+            print(result.flows[t].round(decimals=2))
             print("#########################################")
-        print(aopt.round(decimals=2))
+        print(result.panel_sizes.round(decimals=2))
 
         # display(yopt)
         # to see some more info
         # print(yopt)
-        print(sol.stats)
+        print(result.stats)
 
-    def create_optimisation_task(self):
+    def create_optimisation_task(self, integer_sizing=None, parametric=False):
         """
         Creates the pulp variables P_ij for the lines.
+
+        Args:
+            integer_sizing (IntegerPanelSizing):
+                If given, panel areas are whole multiples of panel units and the problem is solved as mixed-integer
+                linear program with HiGHS. Default: None
+
+            parametric (bool):
+                If True, the total panel size and the generator cost become parameters of the problem that can be
+                changed with set_parameters without building it again. Default: False
         """
 
-        n_const = self.a.size - 1       # Slack bus is a regular bus, but is not counted in n
+        n_const = self.num_buildings       # Generator buses are regular buses, but are not counted in n
         num_snaps = self.num_snapshots
         snapshots = self.snapshots
 
-        self.create_problem_and_variables(n_const, num_snaps)
+        if integer_sizing is None:
+            self.create_problem_and_variables(n_const, num_snaps)
+        else:
+            self.integer_sizing = integer_sizing
+            self.create_problem_and_variables(n_const, num_snaps, 'conic')
+
+        if parametric:
+            self._total_panel_size_parameter = self.task.parameter()
+            self._generator_cost_parameter = self.task.parameter()
+            self.set_parameters(self.total_panel_size, GENERATOR_COST)
 
         # self.create_cost_function(n_const, num_snaps, L_const)
-        self.create_cost_function(n_const, num_snaps)
+        self.create_cost_function(n_const, num_snaps, generator_cost=self.generator_cost_parameter)
 
         # self.create_constraint_total_panel_size(n_const, available_panel_size_const)
-        self.create_constraint_total_panel_size(n_const)
+        self.create_constraint_total_panel_size(n_const, self.total_panel_size_parameter)
 
         # self.create_constraint_panel_output(n_const, num_snaps, K_const)
         self.create_constraint_panel_output(n_const, num_snaps, snapshots)
@@ -450,19 +1496,58 @@ class OptimisationTask:
 
         self.create_constraint_generator_production(n_const, num_snaps)
 
-    def optimise(self):
+        self.create_constraint_generator_capacity(n_const, num_snaps)
+
+        self.create_constraint_line_losses(n_const, num_snaps)
+
+        self.create_constraint_storage(n_const, num_snaps, snapshots)
+
+        if integer_sizing is not None:
+            self.create_constraint_integer_panel_size(n_const)
+
+    def set_parameters(self, total_panel_size=None, generator_cost=None):
+        """
+        Changes the parameters of a parametric problem. The next solve uses them without rebuilding the problem.
+
+        Args:
+            total_panel_size (int, float):
+                Available square meters of panels. Default: None, unchanged.
+
+            generator_cost (int, float):
+                Cost per unit of generator current. Default: None, unchanged.
+        """
+        if self.total_panel_size_parameter is None:
+            raise PermissionError("The problem was not created parametric.")
+
+        if total_panel_size is not None:
+            assert isinstance(total_panel_size, (int, float))
+            self.task.set_value(self.total_panel_size_parameter, total_panel_size)
+        if generator_cost is not None:
+            assert isinstance(generator_cost, (int, float))
+            self.task.set_value(self.generator_cost_parameter, generator_cost)
+
+    def optimise(self, solver_options=None, verbose=True, budget=None):
         """
         Runs the optimiser (ipopt).
 
         Args:
+            solver_options (dict):
+                Options handed to IPOPT. Default: None
+
+            verbose (bool):
+                If False neither IPOPT nor the solution are printed. Default: True
 
+            budget (SolverBudget):
+                Time and iteration limits and tolerance preset. Default: None
 
         Returns:
             The current on each line as a matrix with directed line entries.
+            The solution is None if the budget ran out, the best point is then in the result of the task.
         """
 
-        self.solve()
+        self.solve(solver_options, verbose, budget=budget)
 
-        self.print_solution()
+        if verbose:
+            self.print_solution()
 
         return self.solution, self._x_task, self._a_task
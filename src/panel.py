@@ -15,20 +15,29 @@ class Panel:
         size (int, float):
             The size of the solar panel in square meters. Has to be smaller or equal to roof size (Bus.size).
 
+        output_per_sqm (int, float):
+            Output of the panel per square meter in full sun. Default: 180
+
+        orientation_factor (int, float):
+            Share of the full sun output the panel gets due to its tilt and direction, between 0 and 1. Default: 1
+
     """
 
     id_counter = itertools.count()
 
-    def __init__(self, bus, size):
+    def __init__(self, bus, size, output_per_sqm=180, orientation_factor=1):
 
         self._id = next(Panel.id_counter)
 
         self._bus = None
         self._size = None
-        self._output_per_sqm = 180
+        self._output_per_sqm = None
+        self._orientation_factor = None
 
         self.bus = bus
         self.size = size
+        self.output_per_sqm = output_per_sqm
+        self.orientation_factor = orientation_factor
 
     @property
     def id(self):
@@ -67,6 +76,28 @@ class Panel:
     def output_per_sqm(self):
         return self._output_per_sqm
 
+    @output_per_sqm.setter
+    def output_per_sqm(self, value):
+        assert isinstance(value, (int, float))
+        assert value >= 0
+
+        self._output_per_sqm = value
+
+    @property
+    def orientation_factor(self):
+        return self._orientation_factor
+
+    @orientation_factor.setter
+    def orientation_factor(self, value):
+        assert isinstance(value, (int, float))
+        assert 0 <= value <= 1
+
+        self._orientation_factor = value
+
+    @property
+    def effective_output_per_sqm(self):
+        return self.output_per_sqm * self.orientation_factor
+
     def change_panel_size(self, factor):
         """
         Adds or removes square meters of solar panel, depending on signum of factor. [New_Size] = [Old_Size] + factor
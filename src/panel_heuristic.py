@@ -0,0 +1,243 @@
+import numpy as np
+
+import src.optimisation_task
+
+
+class GreedyPlacement:
+    """
+    Fast approximate panel placement for screening many grids, without a solver. The budget of panel area goes
+    greedily to the roofs with the highest marginal benefit per square meter.
+
+    The benefit of a square meter at a building, summed over the snapshots, depends on where its power goes. While
+    the panel output stays below the building's own power draw, the power is used on the roof. This saves importing
+    it from the slack bus over the path's length. Above that, the power is exported to the slack bus, up to the
+    bottleneck rating of the path, and earns the import price minus the path length. Panels can not be curtailed,
+    so no roof gets more area than it can get rid of at its least favourable snapshot.
+
+    This makes each building's benefit a concave piecewise-linear function of its panel area. Its pieces are built
+    for all buildings and snapshots at once, then sorted by their benefit and filled until the budget or the roofs
+    run out. The work grows with buildings times snapshots, times the logarithm of that for the one sort.
+
+    Storage, line losses, the neighbours' power draws and lines shared between several paths are ignored. The
+    placement can be evaluated by solving only the currents for it, and compared against the optimum of the full
+    problem, see gap.
+
+    Args:
+        grid (Grid):
+            The grid to place panels in.
+
+        snapshots (list, numpy.ndarray):
+            Points in time. Default: None, the snapshots of the grid.
+
+        power_draws (numpy.ndarray):
+            Power draws of shape (snapshots, buildings). Default: None, the power draws of the buses.
+    """
+
+    def __init__(self, grid, snapshots=None, power_draws=None):
+
+        n = len(grid.building_buses)
+        sun = grid.create_sun_matrix(snapshots)
+        if snapshots is None:
+            snapshots = grid.snapshots
+        if power_draws is None:
+            power_draws = np.array([bus.power_draw for bus in grid.building_buses],
+                                   dtype=float).T.reshape(len(snapshots), n)
+        power_draws = np.asarray(power_draws, dtype=float)
+        assert power_draws.shape == sun.shape
+
+        self._grid = grid
+        self._snapshots = snapshots
+        self._power_draws = power_draws
+        self._production = sun * grid.create_panel_output_vector()[:n]     # Output of a square meter
+        self._panel_sizes = None
+        self._estimate = None
+        self._result = None
+
+    @property
+    def grid(self):
+        return self._grid
+
+    @property
+    def panel_sizes(self):
+        return self._panel_sizes
+
+    @property
+    def estimate(self):
+        """
+        The objective the heuristic expects for its placement, from the same simplified benefits.
+        """
+        return self._estimate
+
+    @property
+    def result(self):
+        """
+        The result of evaluating the placement, see evaluate.
+        """
+        return self._result
+
+    def import_price(self):
+        """
+        Cost of a unit of current from the slack bus's generator.
+        """
+
+        generator = next(generator for generator in self.grid.generators if generator.bus is self.grid.slack_bus)
+        if generator.cost is None:
+            return float(src.optimisation_task.GENERATOR_COST)
+        if generator.piecewise:
+            return float(generator.cost_segments()[0][0])       # The price of the first unit
+        return float(generator.cost)
+
+    def segments(self):
+        """
+        The linear pieces of every building's benefit of panel area.
+
+        Returns:
+            tuple of numpy.ndarray:
+                Building, length in square meters and benefit per square meter of each piece, the pieces of a
+                building in order of increasing area.
+        """
+
+        grid = self.grid
+        n = self._production.shape[1]
+        price = self.import_price()
+        reachable = grid.paths.reachable[:n]
+        distance = np.where(reachable, grid.paths.distance[:n], 0)
+        bottleneck = np.where(reachable, grid.paths.bottleneck[:n], 0)
+        roof_sizes = np.array([bus.roof_size for bus in grid.building_buses], dtype=float)
+        production = self._production
+
+        # The benefit drops where the output exceeds the power draw and again where the path is full.
+        with np.errstate(divide="ignore", invalid="ignore"):
+            own_use = np.where(production > 0, self._power_draws / production, np.inf)
+            exported = np.where(production > 0, (self._power_draws + bottleneck) / production, np.inf)
+        roof_sizes = np.minimum(roof_sizes, exported.min(axis=0, initial=np.inf))
+        areas = np.concatenate([own_use, exported])
+        drops = np.concatenate([production * 2 * distance, production * (price - distance)])
+
+        order = np.argsort(areas, axis=0, kind="stable")
+        areas = np.take_along_axis(areas, order, axis=0)
+        drops = np.take_along_axis(drops, order, axis=0)
+
+        # Every snapshot's panels pay the small cost per square meter of the objective.
+        initial = (production * (price + distance)).sum(axis=0) - src.optimisation_task.PANEL_COST * production.shape[0]
+        benefits = initial[None, :] - np.vstack([np.zeros((1, n)), np.cumsum(drops, axis=0)])
+        starts = np.minimum(np.vstack([np.zeros((1, n)), areas]), roof_sizes)
+        ends = np.minimum(np.vstack([areas, np.full((1, n), np.inf)]), roof_sizes)
+
+        buildings = np.broadcast_to(np.arange(n), starts.shape)
+        lengths = ends - starts
+        useful = (lengths > 0) & (benefits > 0)
+
+        return buildings[useful], lengths[useful], benefits[useful]
+
+    def solve(self):
+        """
+        Places the panels.
+
+        Returns:
+            numpy.ndarray:
+                Panel area of every building.
+        """
+
+        n = self._production.shape[1]
+        buildings, lengths, benefits = self.segments()
+        budget = self.grid.total_panel_size
+        if budget is None:
+            budget = np.inf
+
+        # Concave benefits: taking the best pieces first never skips a piece of the same building.
+        order = np.argsort(-benefits, kind="stable")
+        lengths = lengths[order]
+        before = np.cumsum(lengths) - lengths
+        taken = np.clip(budget - before, 0, lengths)
+        panel_sizes = np.bincount(buildings[order], taken, n)
+
+        distance = np.where(self.grid.paths.reachable[:n], self.grid.paths.distance[:n], 0)
+        imports = (self._power_draws * (self.import_price() + distance)).sum()
+
+        self._panel_sizes = panel_sizes
+        self._estimate = float(imports - (taken * benefits[order]).sum())
+
+        return panel_sizes
+
+    def create_task(self):
+        """
+        Builds the problem of the currents for the placed panels.
+
+        Returns:
+            OptimisationTask:
+                The task with fixed panel areas, its solver not configured yet.
+        """
+
+        if self.panel_sizes is None:
+            self.solve()
+
+        task = self.grid.new_optimisation_task(self._snapshots, self._power_draws)
+        n = task.num_buildings
+        num_snaps = task.num_snapshots
+        task.create_problem_and_variables(n, num_snaps)
+        task.create_cost_function(n, num_snaps)
+        task.create_constraint_fixed_panel_size(n, self.panel_sizes)
+        task.create_constraint_panel_output(n, num_snaps, task.snapshots)
+        task.create_constraint_line_rating(n, num_snaps)
+        task.create_constraint_house_consumption(n, num_snaps)
+        task.create_constraint_generator_production(n, num_snaps)
+        task.create_constraint_generator_capacity(n, num_snaps)
+        task.create_constraint_line_losses(n, num_snaps)
+        task.create_constraint_storage(n, num_snaps, task.snapshots)
+
+        return task
+
+    def evaluate(self, solver_options=None):
+        """
+        Solves the currents for the placed panels. Its objective is the real cost of the placement, an upper bound
+        of the optimum.
+
+        Args:
+            solver_options (dict):
+                Options handed to IPOPT. Default: None
+
+        Returns:
+            OptimisationResult:
+                The result of the placement.
+
+        Raises:
+            RuntimeError:
+                If the lines can not carry the output of the placement, e.g. a line shared by several paths.
+        """
+
+        task = self.create_task()
+        task.solve(solver_options, verbose=False)
+        self._result = task.result
+
+        return self._result
+
+    def gap(self, bound=None, solver_options=None):
+        """
+        Relative optimality gap of the placement, (objective - bound) / |bound|. The placement is evaluated first if
+        it was not.
+
+        Args:
+            bound (int, float, OptimisationResult):
+                Objective of the full problem, or a lower bound of it. Default: None, the full linear problem is
+                solved for it.
+
+            solver_options (dict):
+                Options handed to IPOPT. Default: None
+
+        Returns:
+            float:
+                The gap, 0 if the placement is optimal.
+        """
+
+        if self.result is None:
+            self.evaluate(solver_options)
+        if bound is None:
+            task = self.grid.new_optimisation_task(self._snapshots, self._power_draws)
+            task.create_optimisation_task()
+            task.solve(solver_options, verbose=False)
+            bound = task.result
+        if not isinstance(bound, (int, float)):
+            bound = bound.objective
+
+        return (self.result.objective - bound) / max(abs(bound), 1e-12)
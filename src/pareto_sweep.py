@@ -0,0 +1,203 @@
+import itertools
+
+import numpy as np
+
+import src.grid
+import src.optimisation_task
+
+
+class ParetoFrontier:
+    """
+    Outcome of a ParetoSweep, one entry per solved combination of panel budget and generator cost.
+
+    Args:
+        budgets (numpy.ndarray):
+            Total panel size of each point.
+
+        generator_costs (numpy.ndarray):
+            Cost per unit of generator current of each point.
+
+        objective (numpy.ndarray):
+            Value of the cost function of each point.
+
+        line_cost (numpy.ndarray):
+            Length weighted currents on the lines, summed over all snapshots, the proxy for line losses.
+
+        generator_import (numpy.ndarray):
+            Generator production summed over all snapshots.
+
+        panel_sizes (numpy.ndarray):
+            Matrix with the panel area of Bus_i at point k in its entry [k, i], excluding the generator buses.
+
+        success (numpy.ndarray):
+            Whether the solver converged for each point.
+    """
+
+    def __init__(self, budgets, generator_costs, objective, line_cost, generator_import, panel_sizes, success):
+
+        self._budgets = np.asarray(budgets, dtype=float)
+        self._generator_costs = np.asarray(generator_costs, dtype=float)
+        self._objective = np.asarray(objective, dtype=float)
+        self._line_cost = np.asarray(line_cost, dtype=float)
+        self._generator_import = np.asarray(generator_import, dtype=float)
+        self._panel_sizes = np.asarray(panel_sizes, dtype=float)
+        self._success = np.asarray(success, dtype=bool)
+
+        assert self.panel_sizes.ndim == 2
+        for values in (self.generator_costs, self.objective, self.line_cost, self.generator_import, self.success):
+            assert values.shape == self.budgets.shape
+        assert self.panel_sizes.shape[0] == self.budgets.size
+
+    @property
+    def budgets(self):
+        return self._budgets
+
+    @property
+    def generator_costs(self):
+        return self._generator_costs
+
+    @property
+    def objective(self):
+        return self._objective
+
+    @property
+    def line_cost(self):
+        return self._line_cost
+
+    @property
+    def generator_import(self):
+        return self._generator_import
+
+    @property
+    def panel_sizes(self):
+        return self._panel_sizes
+
+    @property
+    def success(self):
+        return self._success
+
+    def __len__(self):
+        return self.budgets.size
+
+    def efficient(self):
+        """
+        Finds the points no other converged point beats in used panel area, line cost and generator import at once.
+
+        Returns:
+            numpy.ndarray:
+                Boolean mask over the points, True for points on the Pareto frontier.
+        """
+
+        criteria = np.column_stack([self.panel_sizes.sum(axis=1), self.line_cost, self.generator_import])
+        criteria = np.where(self.success[:, None], criteria, np.inf)
+
+        # Point k is dominated if some point is at least as good everywhere and strictly better somewhere.
+        at_least_as_good = (criteria[:, None, :] <= criteria[None, :, :]).all(axis=2)
+        strictly_better = (criteria[:, None, :] < criteria[None, :, :]).any(axis=2)
+        dominated = (at_least_as_good & strictly_better).any(axis=0)
+
+        return self.success & ~dominated
+
+
+class ParetoSweep:
+    """
+    Solves a grid for many panel budgets and generator costs with one parametric problem.
+    The problem is built once, every further point only changes its parameters and starts from the previous solution.
+
+    Args:
+        grid (Grid):
+            The grid to optimise.
+
+        solver_options (dict):
+            Options handed to IPOPT. Default: None
+
+        verbose (bool):
+            If False IPOPT does not print anything to the console. Default: False
+
+        budget (SolverBudget):
+            Limits for each single solve. Default: None
+    """
+
+    def __init__(self, grid, solver_options=None, verbose=False, budget=None):
+
+        assert isinstance(grid, src.grid.Grid)
+
+        self._grid = grid
+        self._budget = budget
+        self._task = grid.new_optimisation_task()
+
+        self._task.create_optimisation_task(parametric=True)
+        self._task.configure_solver(solver_options, verbose, budget)
+
+    @property
+    def grid(self):
+        return self._grid
+
+    @property
+    def task(self):
+        return self._task
+
+    def run(self, budgets=None, generator_costs=None):
+        """
+        Solves every combination of the given budgets and generator costs.
+        Budgets are solved in increasing order, so neighbouring points warm start each other.
+
+        Args:
+            budgets (list, numpy.ndarray):
+                Total panel sizes to solve for. Default: None, the total panel size of the grid.
+
+            generator_costs (list, numpy.ndarray):
+                Costs per unit of generator current to solve for, applied to all generators without an own cost.
+                Default: None, GENERATOR_COST.
+
+        Returns:
+            ParetoFrontier:
+                Objective, its parts and the panel sizes of every combination.
+        """
+
+        if budgets is None:
+            budgets = [self.task.total_panel_size]
+        if generator_costs is None:
+            generator_costs = [src.optimisation_task.GENERATOR_COST]
+        budgets = np.sort(np.asarray(budgets, dtype=float).reshape(-1))
+        generator_costs = np.asarray(generator_costs, dtype=float).reshape(-1)
+        assert (budgets >= 0).all()
+
+        opti = self.task.task
+        points = []
+        for generator_cost, total_panel_size in itertools.product(generator_costs, budgets):
+            self.task.set_parameters(float(total_panel_size), float(generator_cost))
+
+            # A point that fails is kept with success False, the sweep goes on from the last good point.
+            solution, result = self.task.run_solver(self._budget, keep_failed=True)
+            if solution is not None:
+                opti.set_initial(solution.value_variables())    # Warm start of the next point
+
+            line_cost, generator_import = self.evaluate_cost_terms(result)
+            points.append((total_panel_size, generator_cost, result.objective, line_cost, generator_import,
+                           result.panel_sizes, result.success))
+
+        columns = list(zip(*points))
+        return ParetoFrontier(columns[0], columns[1], columns[2], columns[3], columns[4], np.array(columns[5]),
+                              columns[6])
+
+    def evaluate_cost_terms(self, result):
+        """
+        Splits the cost of a result into its line part and its generator part.
+
+        Args:
+            result (OptimisationResult):
+                Result of the sweep's problem.
+
+        Returns:
+            tuple:
+                Length weighted line currents and generator production, both summed over all snapshots.
+        """
+
+        lengths = self.task.line_length.values.astype(float)[result.flow_rows, result.flow_cols]
+        lengths[result.flow_rows == result.flow_cols] = 0    # The diagonal holds production, not line currents
+
+        line_cost = float((result.flow_values * lengths[None, :]).sum())
+        generator_import = float(result.generator_import.sum())
+
+        return line_cost, generator_import
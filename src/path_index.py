@@ -0,0 +1,208 @@
+import heapq
+
+import numpy as np
+
+
+class PathIndex:
+    """
+    Shortest electrical paths of a grid, measured in line length, with their hop counts and bottleneck ratings.
+    Paths to the slack bus are computed with one Dijkstra run on creation, all-pairs paths only when first needed.
+    Buses are addressed by their position in the grid's bus list.
+
+    Args:
+        bus0 (numpy.ndarray):
+            Position of the start bus of each line.
+
+        bus1 (numpy.ndarray):
+            Position of the end bus of each line.
+
+        lengths (numpy.ndarray):
+            Length of each line in meters.
+
+        ratings (numpy.ndarray):
+            Rating of each line.
+
+        num_buses (int):
+            Number of buses in the grid.
+
+        source (int):
+            Position of the bus all paths lead to, usually the slack bus.
+    """
+
+    def __init__(self, bus0, bus1, lengths, ratings, num_buses, source):
+
+        self._bus0 = np.asarray(bus0, dtype=int)
+        self._bus1 = np.asarray(bus1, dtype=int)
+        self._lengths = np.asarray(lengths, dtype=float)
+        self._ratings = np.asarray(ratings, dtype=float)
+        self._num_buses = num_buses
+        self._source = source
+        self._all_pairs = None
+
+        assert self._bus0.shape == self._bus1.shape == self._lengths.shape == self._ratings.shape
+        assert (self._lengths >= 0).all()
+        assert 0 <= source < num_buses
+
+        self.create_adjacency()
+        self._distance, self._hops, self._bottleneck, self._predecessor, self._predecessor_line = \
+            self.dijkstra(source)
+
+    @classmethod
+    def from_grid(cls, grid):
+        """
+        Creates the index of paths to the slack bus of a grid.
+
+        Args:
+            grid (Grid):
+                The grid to index.
+
+        Returns:
+            PathIndex:
+                The index.
+        """
+
+        bus0, bus1, lengths, ratings = grid.create_line_arrays()
+        return cls(bus0, bus1, lengths, ratings, len(grid.buses), grid.buses.index(grid.slack_bus))
+
+    @property
+    def source(self):
+        return self._source
+
+    @property
+    def distance(self):
+        return self._distance
+
+    @property
+    def hops(self):
+        return self._hops
+
+    @property
+    def bottleneck(self):
+        return self._bottleneck
+
+    @property
+    def predecessor(self):
+        return self._predecessor
+
+    @property
+    def predecessor_line(self):
+        return self._predecessor_line
+
+    @property
+    def reachable(self):
+        return np.isfinite(self.distance)
+
+    def create_adjacency(self):
+        """
+        Stores the lines as compressed adjacency arrays: the neighbours of bus i are
+        neighbours[offsets[i]:offsets[i + 1]], reached through the lines in neighbour_lines at the same positions.
+        """
+
+        line_ids = np.arange(self._bus0.size)
+        starts = np.concatenate([self._bus0, self._bus1])
+        ends = np.concatenate([self._bus1, self._bus0])
+        lines = np.concatenate([line_ids, line_ids])
+
+        order = np.argsort(starts, kind="stable")
+        self._neighbours = ends[order]
+        self._neighbour_lines = lines[order]
+        self._offsets = np.concatenate([[0], np.cumsum(np.bincount(starts, minlength=self._num_buses))])
+
+    def dijkstra(self, source):
+        """
+        Shortest paths from one bus to all others.
+
+        Args:
+            source (int):
+                Position of the start bus.
+
+        Returns:
+            tuple:
+                Arrays with distance, hop count, bottleneck rating, predecessor bus and predecessor line of each bus.
+                Unreachable buses have an infinite distance, zero bottleneck and -1 as predecessors.
+        """
+
+        distance = np.full(self._num_buses, np.inf)
+        hops = np.full(self._num_buses, -1)
+        bottleneck = np.zeros(self._num_buses)
+        predecessor = np.full(self._num_buses, -1)
+        predecessor_line = np.full(self._num_buses, -1)
+        done = np.zeros(self._num_buses, dtype=bool)
+
+        distance[source] = 0
+        hops[source] = 0
+        bottleneck[source] = np.inf
+        queue = [(0.0, source)]
+
+        while queue:
+            current_distance, bus = heapq.heappop(queue)
+            if done[bus]:
+                continue
+            done[bus] = True
+
+            for k in range(self._offsets[bus], self._offsets[bus + 1]):
+                neighbour = self._neighbours[k]
+                line = self._neighbour_lines[k]
+                new_distance = current_distance + self._lengths[line]
+                if new_distance < distance[neighbour]:
+                    distance[neighbour] = new_distance
+                    hops[neighbour] = hops[bus] + 1
+                    bottleneck[neighbour] = min(bottleneck[bus], self._ratings[line])
+                    predecessor[neighbour] = bus
+                    predecessor_line[neighbour] = line
+                    heapq.heappush(queue, (new_distance, neighbour))
+
+        return distance, hops, bottleneck, predecessor, predecessor_line
+
+    def path(self, bus):
+        """
+        Buses on the shortest path from a bus to the source.
+
+        Args:
+            bus (int):
+                Position of the bus.
+
+        Returns:
+            list of int:
+                Positions from the bus to the source, empty if the source can not be reached.
+        """
+
+        if not self.reachable[bus]:
+            return []
+
+        path = [bus]
+        while path[-1] != self.source:
+            path.append(int(self.predecessor[path[-1]]))
+
+        return path
+
+    def path_lines(self, bus):
+        """
+        Lines on the shortest path from a bus to the source.
+
+        Args:
+            bus (int):
+                Position of the bus.
+
+        Returns:
+            list of int:
+                Positions of the lines in the grid's line list, from the bus to the source.
+        """
+
+        return [int(self.predecessor_line[node]) for node in self.path(bus)[:-1]]
+
+    def all_pairs(self):
+        """
+        Shortest paths between all pairs of buses, computed once with one Dijkstra run per bus.
+
+        Returns:
+            tuple:
+                Matrices with distance, hop count and bottleneck rating, entry [i, j] belongs to the path from
+                bus i to bus j.
+        """
+
+        if self._all_pairs is None:
+            runs = [self.dijkstra(bus)[:3] for bus in range(self._num_buses)]
+            self._all_pairs = tuple(np.array([run[k] for run in runs]) for k in range(3))
+
+        return self._all_pairs
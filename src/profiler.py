@@ -0,0 +1,237 @@
+import cProfile
+import contextlib
+import functools
+import json
+import pstats
+import time
+import tracemalloc
+
+
+class Profiler:
+    """
+    Opt-in instrumentation of an OptimisationTask. Records how long every problem builder and solver run takes,
+    optionally with cProfile function statistics and tracemalloc memory use, and the objective and constraint
+    violation after every IPOPT iteration. Set it as profiler of a task before building its problem, e.g. with
+    Grid.create_optimisation_task(profiler=...).
+
+    The trace is written in the Chrome trace event format, which chrome://tracing, Perfetto or speedscope show as
+    timeline. The collected cProfile statistics can be written as .prof file for flame chart viewers like snakeviz.
+
+    Args:
+        cprofile (bool):
+            Collects cProfile statistics of every builder and solver run. Default: False
+
+        memory (bool):
+            Records memory allocated by every builder and solver run with tracemalloc. Default: False
+
+        iterations (bool):
+            Records every IPOPT iteration. Costs an evaluation of the objective and the constraints per iteration.
+            Default: True
+
+        top (int):
+            Number of functions with the highest cumulative time stored with each recorded step. Default: 20
+    """
+
+    # Methods of OptimisationTask that are recorded.
+    builders = ("create_problem_and_variables", "create_cost_function")
+    solvers = ("run_solver",)
+
+    def __init__(self, cprofile=False, memory=False, iterations=True, top=20):
+
+        assert isinstance(top, int) and top >= 0
+
+        self._cprofile = cprofile
+        self._memory = memory
+        self._iterations = iterations
+        self._top = top
+        self._origin = time.perf_counter_ns()
+        self._events = []
+        self._stats = None
+        self._depth = 0
+        self._last_iteration = None
+
+    @property
+    def events(self):
+        return self._events
+
+    @property
+    def stats(self):
+        """
+        cProfile statistics of all recorded steps together, None without cProfile.
+        """
+        return self._stats
+
+    @property
+    def records_iterations(self):
+        return self._iterations
+
+    def now(self):
+        """
+        Microseconds since the profiler was created, the time unit of the trace.
+        """
+        return (time.perf_counter_ns() - self._origin) / 1000
+
+    @contextlib.contextmanager
+    def record(self, name, category="build", **arguments):
+        """
+        Records a step as one event of the timeline. Only the outermost of nested steps is profiled with cProfile
+        and tracemalloc.
+
+        Args:
+            name (str):
+                Name of the step.
+
+            category (str):
+                Category of the step in the trace, e.g. "build" or "solve". Default: "build"
+
+            arguments:
+                Further values stored with the event.
+        """
+
+        profile = None
+        outermost = self._depth == 0
+        started_tracing = False
+        if outermost and self._cprofile:
+            profile = cProfile.Profile()
+        if outermost and self._memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True      # Stopped again afterwards, tracing slows down everything else
+            tracemalloc.reset_peak()
+            memory_before = tracemalloc.get_traced_memory()[0]
+
+        event = {"name": name, "cat": category, "ph": "X", "pid": 0, "tid": 0, "args": dict(arguments)}
+        self._depth += 1
+        start = self.now()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield event["args"]
+        finally:
+            if profile is not None:
+                profile.disable()
+            end = self.now()
+            self._depth -= 1
+
+            if outermost and self._memory:
+                current, peak = tracemalloc.get_traced_memory()
+                event["args"].update(allocated=current - memory_before, peak=peak - memory_before)
+                if started_tracing:
+                    tracemalloc.stop()
+            if profile is not None:
+                event["args"]["functions"] = self.top_functions(pstats.Stats(profile))
+                if self._stats is None:
+                    self._stats = pstats.Stats(profile)
+                else:
+                    self._stats.add(profile)
+
+            event.update(ts=start, dur=end - start)
+            self._events.append(event)
+
+    def top_functions(self, stats):
+        """
+        Functions with the highest cumulative time of a cProfile run.
+
+        Args:
+            stats (pstats.Stats):
+                The statistics of the run.
+
+        Returns:
+            list of dict:
+                Name, location, number of calls, cumulative and own seconds of each function.
+        """
+
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:self._top]
+
+        return [{"function": function, "location": f"{file}:{line}", "calls": calls, "cumulative": cumulative,
+                 "own": own} for (file, line, function), (_, calls, own, cumulative, _) in rows]
+
+    def wrap(self, name, method, category):
+        @functools.wraps(method)
+        def recorded(*args, **kwargs):
+            with self.record(name, category):
+                return method(*args, **kwargs)
+
+        return recorded
+
+    def instrument(self, task):
+        """
+        Replaces the builders and the solver run of a task by recorded versions. Only this task is affected.
+
+        Args:
+            task (OptimisationTask):
+                The task to record.
+        """
+
+        for name in dir(type(task)):
+            if name in Profiler.builders or name.startswith("create_constraint_"):
+                setattr(task, name, self.wrap(name, getattr(task, name), "build"))
+            elif name in Profiler.solvers:
+                setattr(task, name, self.wrap(name, getattr(task, name), "solve"))
+        self._last_iteration = None
+
+    def iteration(self, iteration, objective, infeasibility):
+        """
+        Records an IPOPT iteration, called by the solver callback of the task.
+
+        Args:
+            iteration (int):
+                Number of the iteration.
+
+            objective (float):
+                Objective at the iterate.
+
+            infeasibility (float):
+                Largest constraint violation at the iterate.
+        """
+
+        now = self.now()
+        start = now if self._last_iteration is None or iteration == 0 else self._last_iteration
+        self._last_iteration = now
+        values = {"objective": objective, "infeasibility": infeasibility}
+
+        self._events.append({"name": f"iteration {iteration}", "cat": "iteration", "ph": "X", "pid": 0, "tid": 1,
+                             "ts": start, "dur": now - start, "args": dict(values, iteration=iteration)})
+        for name, value in values.items():
+            self._events.append({"name": name, "cat": "iteration", "ph": "C", "pid": 0, "ts": now,
+                                 "args": {name: value}})
+
+    def trace(self):
+        """
+        The recorded events in the Chrome trace event format.
+
+        Returns:
+            dict:
+                The trace, ready to be written as JSON.
+        """
+
+        metadata = [{"name": "thread_name", "ph": "M", "pid": 0, "tid": 0, "args": {"name": "build and solve"}},
+                    {"name": "thread_name", "ph": "M", "pid": 0, "tid": 1, "args": {"name": "IPOPT iterations"}}]
+
+        return {"traceEvents": metadata + sorted(self.events, key=lambda event: event["ts"]),
+                "displayTimeUnit": "ms"}
+
+    def write(self, path):
+        """
+        Writes the trace as JSON file.
+
+        Args:
+            path (str):
+                The trace file, e.g. "trace.json".
+        """
+
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.trace(), file)
+
+    def write_profile(self, path):
+        """
+        Writes the collected cProfile statistics, e.g. for snakeviz.
+
+        Args:
+            path (str):
+                The statistics file, e.g. "build.prof".
+        """
+
+        if self.stats is None:
+            raise ValueError("No cProfile statistics were collected, create the profiler with cprofile=True.")
+        self.stats.dump_stats(path)
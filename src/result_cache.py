@@ -0,0 +1,341 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+import src.grid_archive
+
+ENTRY_FILE = "entry.json"
+
+
+def update_digest(digest, name, value):
+    """
+    Adds a named value to a hash. Arrays are added with their dtype and shape, so equal bytes of different arrays
+    do not collide, everything else as canonical JSON.
+    """
+
+    digest.update(name.encode())
+    if isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value)
+        digest.update(f"{value.dtype.str}{value.shape}".encode())
+        digest.update(value.tobytes())
+    else:
+        digest.update(json.dumps(value, sort_keys=True, default=str).encode())
+
+
+def fingerprint(grid, snapshots=None, power_draws=None, solver_options=None, integer_sizing=None, budget=None):
+    """
+    Content-addressed keys of an optimisation of a grid. Objects are described by their positions, not their ids,
+    so the same grid built in another process, or loaded from disk, gets the same keys.
+
+    Args:
+        grid (Grid):
+            The grid to optimise.
+
+        snapshots (list, numpy.ndarray):
+            Points in time to optimise for. Default: None, the snapshots of the grid.
+
+        power_draws (numpy.ndarray):
+            Power draws of shape (snapshots, buildings). Default: None, the power draws of the buses.
+
+        solver_options (dict):
+            Options handed to the solver. Default: None
+
+        integer_sizing (IntegerPanelSizing):
+            Panel units of a mixed-integer problem. Default: None, continuous panel areas.
+
+        budget (SolverBudget):
+            Only its tolerance preset counts, limits do not change a result that was solved. Default: None
+
+    Returns:
+        tuple:
+            The key of the whole problem, the key of everything but the power draws, shared by near matches, and
+            the power draws.
+    """
+
+    buildings = grid.building_buses
+    n = len(buildings)
+    own_snapshots = snapshots is None
+    if own_snapshots:
+        snapshots = grid.snapshots
+    if power_draws is None:
+        power_draws = np.array([bus.power_draw for bus in buildings], dtype=float).T.reshape(len(snapshots), n)
+    power_draws = np.asarray(power_draws, dtype=float)
+
+    positions = {bus: position for position, bus in enumerate(grid.buses)}
+    bus0, bus1, lengths, ratings = grid.create_line_arrays()
+    storage = [[positions[bus], bus.storage.capacity, bus.storage.charge_limit, bus.storage.discharge_limit,
+                bus.storage.efficiency, bus.storage.initial_charge] for bus in buildings if bus.storage is not None]
+    generators = [[positions[generator.bus], generator.capacity, generator.cost] for generator in grid.generators]
+
+    digest = hashlib.sha256()
+    for name, value in (
+            ("buses", len(grid.buses)),
+            ("roof sizes", np.array([bus.roof_size for bus in grid.buses], dtype=float)),
+            ("panel output", grid.create_panel_output_vector()),
+            ("slack bus", positions[grid.slack_bus]),
+            ("total panel size", grid.total_panel_size),
+            ("lines", np.stack([bus0, bus1]).astype(np.int64)),
+            ("line values", np.stack([lengths, ratings])),
+            ("line losses", [[line.loss_coefficient, line.loss_segments] for line in grid.lines]),
+            ("generators", generators),
+            ("storage", storage),
+            ("snapshots", np.asarray(snapshots, dtype=float)),
+            ("sun", grid.create_sun_matrix(None if own_snapshots else snapshots)),
+            ("solver options", solver_options or {}),
+            ("preset", "default" if budget is None else budget.preset),
+            ("integer sizing", None if integer_sizing is None else
+             [integer_sizing.unit_sizes(n), integer_sizing.installation_costs(n), integer_sizing.presolve])):
+        update_digest(digest, name, value)
+    structure = digest.hexdigest()
+
+    update_digest(digest, "power draws", power_draws)
+
+    return digest.hexdigest(), structure, power_draws
+
+
+def warm_start(task, result):
+    """
+    Sets the values of a result as initial point of a task with the same structure.
+
+    Args:
+        task (OptimisationTask):
+            The task, its problem has to be created.
+
+        result (OptimisationResult):
+            Result of a problem with the same entries and snapshots.
+    """
+
+    opti = task.task
+    assert result.flow_values.shape == (len(task.flow_task), task.flow_rows.size)
+    for flows, values in zip(task.flow_task, np.asarray(result.flow_values)):
+        opti.set_initial(flows, values)
+    opti.set_initial(task.a_task, np.asarray(result.panel_sizes))
+    if result.storage_levels is not None and task.storage_level_task is not None:
+        opti.set_initial(task.storage_level_task, np.asarray(result.storage_levels).T)
+
+
+class ResultCache:
+    """
+    Results of solved optimisations on local disk, keyed by a hash of everything the optimisation depends on: the
+    topology, line types, roofs, panels, generators, storage, power draws, snapshots, panel budget and solver
+    options, see fingerprint. A repeated request loads its result instead of solving. A request that only differs
+    in its power draws from a cached one is warm started from the closest of them.
+
+    Each result is a directory named by its key, written by grid_archive.save_result. Using a result marks it as
+    recently used, once the cache is larger than its limit the least recently used results are deleted. Several
+    processes can share a directory. Only results that were solved successfully are cached.
+
+    Args:
+        directory (str):
+            Directory of the cache, created if missing.
+
+        max_bytes (int):
+            Size the cache is trimmed to after adding a result. Default: 1 GiB
+
+        tolerance (int, float):
+            Largest distance of the power draws, relative to their norm, at which a cached result still warm starts
+            a new one. Default: 0.1
+    """
+
+    def __init__(self, directory, max_bytes=2 ** 30, tolerance=0.1):
+
+        assert isinstance(max_bytes, int) and max_bytes > 0
+        assert isinstance(tolerance, (int, float)) and tolerance >= 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._tolerance = tolerance
+
+    @property
+    def directory(self):
+        return self._directory
+
+    @property
+    def max_bytes(self):
+        return self._max_bytes
+
+    @property
+    def tolerance(self):
+        return self._tolerance
+
+    def path(self, key):
+        return os.path.join(self.directory, key)
+
+    def entries(self):
+        """
+        The cached results.
+
+        Returns:
+            list of dict:
+                Key, structure key, size in bytes and time of last use of each result, least recently used first.
+        """
+
+        entries = []
+        for key in os.listdir(self.directory):
+            if key.startswith("."):
+                continue        # Results still being written
+            entry_file = os.path.join(self.path(key), ENTRY_FILE)
+            try:
+                with open(entry_file, encoding="utf-8") as file:
+                    entry = json.load(file)
+                entry.update(key=key, used=os.path.getmtime(entry_file))
+            except (FileNotFoundError, NotADirectoryError, ValueError):
+                continue        # Written or deleted by another process right now
+            entries.append(entry)
+
+        return sorted(entries, key=lambda entry: entry["used"])
+
+    def get(self, key):
+        """
+        Loads a cached result and marks it as used.
+
+        Args:
+            key (str):
+                Key of the result, see fingerprint.
+
+        Returns:
+            OptimisationResult:
+                The result, None if it is not cached.
+        """
+
+        try:
+            os.utime(os.path.join(self.path(key), ENTRY_FILE))
+            return src.grid_archive.load_result(self.path(key), mmap_mode=None)
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, structure, power_draws, result):
+        """
+        Adds a result and trims the cache to its size limit. Unsuccessful results are not added.
+
+        Args:
+            key (str):
+                Key of the result.
+
+            structure (str):
+                Key of everything but the power draws.
+
+            power_draws (numpy.ndarray):
+                The power draws the result was solved for, to find near matches.
+
+            result (OptimisationResult):
+                The result.
+        """
+
+        if not result.success or result.budget_exhausted:
+            return
+
+        # Written next to its place and moved there at once, so readers never see half a result.
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=self.directory)
+        src.grid_archive.save_result(result, staging)
+        np.save(os.path.join(staging, "power_draws.npy"), np.asarray(power_draws, dtype=float))
+        size = sum(os.path.getsize(os.path.join(staging, name)) for name in os.listdir(staging))
+        with open(os.path.join(staging, ENTRY_FILE), "w", encoding="utf-8") as file:
+            json.dump({"structure": structure, "bytes": size}, file)
+        try:
+            os.rename(staging, self.path(key))
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)     # Another process cached the same result first
+
+        self.evict()
+
+    def evict(self):
+        """
+        Deletes the least recently used results until the cache fits its size limit.
+        """
+
+        entries = self.entries()
+        total = sum(entry["bytes"] for entry in entries)
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(self.path(entry["key"]), ignore_errors=True)
+            total -= entry["bytes"]
+
+    def nearest(self, structure, power_draws):
+        """
+        Finds the cached result of the same problem with the closest power draws.
+
+        Args:
+            structure (str):
+                Key of everything but the power draws.
+
+            power_draws (numpy.ndarray):
+                The power draws to match.
+
+        Returns:
+            str:
+                Key of the result, None if no result is within the tolerance.
+        """
+
+        best_key = None
+        best_distance = self.tolerance * max(float(np.linalg.norm(power_draws)), 1e-12)
+        for entry in self.entries():
+            if entry["structure"] != structure:
+                continue
+            try:
+                cached = np.load(os.path.join(self.path(entry["key"]), "power_draws.npy"))
+            except FileNotFoundError:
+                continue
+            distance = float(np.linalg.norm(cached - power_draws))
+            if distance <= best_distance:
+                best_key, best_distance = entry["key"], distance
+
+        return best_key
+
+    def optimise(self, grid, snapshots=None, power_draws=None, solver_options=None, integer_sizing=None,
+                 budget=None):
+        """
+        Returns the cached result of an optimisation, or solves it, warm started from a near match, and caches it.
+        The statistics of the result hold "cache": "hit", "warm start" or "miss".
+
+        Args:
+            grid (Grid):
+                The grid to optimise.
+
+            snapshots (list, numpy.ndarray):
+                Points in time to optimise for. Default: None, the snapshots of the grid.
+
+            power_draws (numpy.ndarray):
+                Power draws of shape (snapshots, buildings). Default: None, the power draws of the buses.
+
+            solver_options (dict):
+                Options handed to IPOPT, or HiGHS with integer sizing. Default: None
+
+            integer_sizing (IntegerPanelSizing):
+                Panel units of a mixed-integer problem. Default: None
+
+            budget (SolverBudget):
+                Time and iteration limits and tolerance preset. Results that ran out of it are not cached.
+                Default: None
+
+        Returns:
+            OptimisationResult:
+                The result.
+        """
+
+        key, structure, power_draws = fingerprint(grid, snapshots, power_draws, solver_options, integer_sizing,
+                                                  budget)
+        result = self.get(key)
+        if result is not None:
+            result.stats["cache"] = "hit"
+            return result
+
+        task = grid.new_optimisation_task(snapshots, power_draws)
+        task.create_optimisation_task(integer_sizing)
+        near = self.nearest(structure, power_draws)
+        near_result = None if near is None else self.get(near)
+        if near_result is not None:
+            warm_start(task, near_result)
+        task.solve(solver_options, verbose=False, budget=budget)
+
+        result = task.result
+        self.put(key, structure, power_draws, result)
+        result.stats["cache"] = "miss" if near_result is None else "warm start"
+
+        return result
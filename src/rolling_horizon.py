@@ -0,0 +1,264 @@
+import asyncio
+import collections
+
+import numpy as np
+
+import src.grid
+import src.optimisation_result
+
+
+class RollingHorizonOptimiser:
+    """
+    Optimises the currents of a grid for a live feed of snapshots instead of a fixed set known beforehand.
+    The panel sizes are fixed to the current build out of the grid, only the currents are optimised.
+
+    One problem covering a window of window_size snapshots is built once. For every incoming record the window is
+    moved one snapshot ahead, the power draws and sun factors are exchanged as parameters and the problem is
+    re-solved, warm started with the currents of the previous window. Only the first snapshot of each window is
+    emitted, the rest only serves as look-ahead. Storages start each window with the charge the emitted snapshot
+    left them with. Memory therefore only depends on the window size, not the length
+    of the feed.
+
+    Args:
+        grid (Grid):
+            The grid to operate.
+
+        window_size (int):
+            Number of snapshots in each optimised window. Greater than zero.
+
+        solver_options (dict):
+            Options handed to IPOPT. Default: None
+
+        verbose (bool):
+            If False IPOPT does not print anything to the console. Default: False
+
+        budget (SolverBudget):
+            Limits for each window solve, keeps the latency per time step predictable. Default: None
+    """
+
+    def __init__(self, grid, window_size, solver_options=None, verbose=False, budget=None):
+
+        self._grid = None
+        self._window_size = None
+        self._task = None
+        self._power_draw_parameter = None
+        self._sun_parameter = None
+        self._duration_parameter = None
+        self._initial_charge_parameter = None
+        self._storage_charge = None
+        self._previous_flows = None
+        self._budget = budget
+
+        self.grid = grid
+        self.window_size = window_size
+
+        self.create_window_task(solver_options, verbose, budget)
+
+    @property
+    def grid(self):
+        return self._grid
+
+    @grid.setter
+    def grid(self, value):
+        if self._grid is not None:
+            raise PermissionError("The grid of a rolling horizon optimiser is fixed.")
+
+        assert isinstance(value, src.grid.Grid)
+        self._grid = value
+
+    @property
+    def storage_charge(self):
+        """
+        Charge of each storage at the end of the last dispatched time step, None without storage.
+        """
+        return self._storage_charge
+
+    @property
+    def window_size(self):
+        return self._window_size
+
+    @window_size.setter
+    def window_size(self, value):
+        if self._window_size is not None:
+            raise PermissionError("Window size is fixed, the window problem is built for it.")
+
+        assert isinstance(value, int)
+        assert value > 0
+
+        self._window_size = value
+
+    @property
+    def task(self):
+        return self._task
+
+    @property
+    def num_buses(self):
+        return len(self.grid.building_buses)     # Generator buses are not counted
+
+    def create_window_task(self, solver_options=None, verbose=False, budget=None):
+        """
+        Builds the problem of one window with the power draws and the sun factors as parameters.
+
+        Args:
+            solver_options (dict):
+                Options handed to IPOPT. Default: None
+
+            verbose (bool):
+                If False IPOPT does not print anything to the console. Default: False
+
+            budget (SolverBudget):
+                Limits for each window solve. Default: None
+        """
+
+        n = self.num_buses
+        placeholder_snapshots = np.zeros(self.window_size)      # Real times are passed in with each record
+
+        task = self.grid.new_optimisation_task(placeholder_snapshots, np.zeros((self.window_size, n)))
+        num_snaps = task.num_snapshots
+
+        task.create_problem_and_variables(n, num_snaps)
+        self._power_draw_parameter = task.task.parameter(self.window_size, n)
+        self._sun_parameter = task.task.parameter(self.window_size)
+        self._duration_parameter = task.task.parameter(self.window_size)
+
+        storage_buses = task.storage_buses
+        if storage_buses:
+            self._initial_charge_parameter = task.task.parameter(len(storage_buses))
+            self._storage_charge = np.array([self.grid.buses[i].storage.initial_charge for i in storage_buses],
+                                            dtype=float)
+
+        task.create_cost_function(n, num_snaps)
+        task.create_constraint_fixed_panel_size(n, [bus.panel.size for bus in self.grid.buses[:n]])
+        task.create_constraint_panel_output(n, num_snaps, placeholder_snapshots, sun_factors=self._sun_parameter)
+        task.create_constraint_line_rating(n, num_snaps)
+        task.create_constraint_house_consumption(n, num_snaps, power_draws=self._power_draw_parameter)
+        task.create_constraint_generator_production(n, num_snaps)
+        task.create_constraint_generator_capacity(n, num_snaps)
+        task.create_constraint_line_losses(n, num_snaps)
+        task.create_constraint_storage(n, num_snaps, placeholder_snapshots, durations=self._duration_parameter,
+                                       initial_charge=self._initial_charge_parameter)
+
+        task.configure_solver(solver_options, verbose, budget)
+
+        self._task = task
+
+    def check_record(self, record):
+        """
+        Validates one record of the feed.
+
+        Args:
+            record (tuple):
+                Pair of the time in hours (0 to 24) and the power draw of each bus, excluding the generator buses.
+
+        Returns:
+            tuple:
+                The time as float and the power draws as numpy.ndarray.
+        """
+
+        time, power_draw = record
+        assert isinstance(time, (int, float, np.integer, np.floating))
+        assert 0 <= time <= 24
+
+        power_draw = np.asarray(power_draw, dtype=float).reshape(-1)
+        assert power_draw.size == self.num_buses
+        assert (power_draw >= 0).all()      # Power draw is non-negative
+
+        return float(time), power_draw
+
+    def solve_window(self, window):
+        """
+        Solves the problem for the given records and returns the dispatch of the first one.
+        Windows shorter than the window size are padded by repeating their last record.
+
+        Args:
+            window (collections.deque, list):
+                Checked records, the first one is the time step to dispatch.
+
+        Returns:
+            OptimisationResult:
+                Currents and panel sizes for the first record of the window. If the budget ran out they belong
+                to the best point found, if the solve failed to the solver's last point.
+        """
+
+        assert 0 < len(window) <= self.window_size
+
+        records = list(window) + [window[-1]] * (self.window_size - len(window))
+        times = np.array([time for time, _ in records])
+        power_draws = np.array([power_draw for _, power_draw in records])
+
+        opti = self.task.task
+        opti.set_value(self._power_draw_parameter, power_draws)
+        opti.set_value(self._sun_parameter, self.task.sun(times))
+        opti.set_value(self._duration_parameter, self.task.snapshot_durations(times))
+        if self._storage_charge is not None:
+            opti.set_value(self._initial_charge_parameter, self._storage_charge)
+
+        if self._previous_flows is not None:
+            # The window moved one step ahead, so snapshot t starts where snapshot t + 1 ended last time.
+            for t, flows in enumerate(self.task.flow_task):
+                opti.set_initial(flows, self._previous_flows[min(t + 1, self.window_size - 1)])
+
+        # A window that fails is emitted with "success" False, the feed goes on with the next one.
+        _, result = self.task.run_solver(self._budget, keep_failed=True)
+        if result.success or result.budget_exhausted:
+            self._previous_flows = result.flow_values
+            if self._storage_charge is not None:
+                self._storage_charge = np.clip(result.storage_levels[0], 0, None)     # The emitted snapshot is done
+        # Otherwise the storage keeps its last good charge, the failed point may break the constraints.
+
+        window_result = src.optimisation_result.OptimisationResult(times, result.flow_values, result.panel_sizes,
+                                                                   result.objective, result.stats,
+                                                                   (result.flow_rows, result.flow_cols),
+                                                                   result.storage_levels, result.storage_buses)
+        return window_result.select(0)
+
+    def run(self, records):
+        """
+        Dispatches an iterable feed of records one time step after another.
+        A time step is emitted once window_size - 1 further records arrived or the feed ended.
+
+        Args:
+            records (iterable):
+                Pairs of the time in hours and the power draw of each bus, excluding the generator buses.
+
+        Yields:
+            OptimisationResult:
+                Currents of a single time step.
+        """
+
+        window = collections.deque()
+        for record in records:
+            window.append(self.check_record(record))
+            if len(window) == self.window_size:
+                yield self.solve_window(window)
+                window.popleft()
+
+        while window:
+            yield self.solve_window(window)
+            window.popleft()
+
+    async def run_async(self, records):
+        """
+        Same as run, but consumes an asynchronous feed. Solving happens in the default executor of the event loop,
+        so the loop keeps serving other tasks meanwhile.
+
+        Args:
+            records (async iterable):
+                Pairs of the time in hours and the power draw of each bus, excluding the generator buses.
+
+        Yields:
+            OptimisationResult:
+                Currents of a single time step.
+        """
+
+        loop = asyncio.get_running_loop()
+        window = collections.deque()
+        async for record in records:
+            window.append(self.check_record(record))
+            if len(window) == self.window_size:
+                yield await loop.run_in_executor(None, self.solve_window, tuple(window))
+                window.popleft()
+
+        while window:
+            yield await loop.run_in_executor(None, self.solve_window, tuple(window))
+            window.popleft()
@@ -0,0 +1,161 @@
+class SolverBudget:
+    """
+    Limits how long IPOPT, or HiGHS for integer panel sizing, may work on a problem and how accurate its answer has
+    to be.
+    If the budget runs out, the best point found is kept instead of raising an error.
+
+    Args:
+        max_wall_time (int, float):
+            Seconds of wall-clock time the solver may use. Default: None, no limit.
+
+        max_iterations (int):
+            Number of iterations IPOPT may use, or branch-and-bound nodes for HiGHS. Default: None, the solver's
+            default.
+
+        preset (str):
+            Tolerance preset, one of SolverBudget.presets: "fast", "default" or "accurate". Default: "default"
+
+        feasibility_tolerance (int, float):
+            Largest constraint violation at which an intermediate point still counts as feasible when looking for
+            the best point. Default: 1e-3
+
+        keep_best (bool):
+            If True, running out of budget returns the best point, otherwise the solver error is raised.
+            Default: True
+    """
+
+    presets = {
+        "fast": {"tol": 1e-4, "acceptable_tol": 1e-2, "acceptable_iter": 5, "constr_viol_tol": 1e-3},
+        "default": {},
+        "accurate": {"tol": 1e-10, "acceptable_tol": 1e-8, "constr_viol_tol": 1e-8},
+    }
+
+    # Relative MIP gap at which HiGHS stops, used for integer panel sizing.
+    highs_presets = {
+        "fast": {"mip_rel_gap": 1e-2},
+        "default": {},
+        "accurate": {"mip_rel_gap": 1e-6},
+    }
+
+    # IPOPT and HiGHS return statuses that mean the solver stopped because of the budget, not because of the problem.
+    exhausted_statuses = ("Maximum_Iterations_Exceeded", "Maximum_WallTime_Exceeded", "Maximum_CpuTime_Exceeded",
+                          "Time limit reached", "Iteration limit reached", "Solution limit reached")
+
+    def __init__(self, max_wall_time=None, max_iterations=None, preset="default", feasibility_tolerance=1e-3,
+                 keep_best=True):
+
+        self._max_wall_time = None
+        self._max_iterations = None
+        self._preset = None
+        self._feasibility_tolerance = None
+        self._keep_best = None
+
+        self.max_wall_time = max_wall_time
+        self.max_iterations = max_iterations
+        self.preset = preset
+        self.feasibility_tolerance = feasibility_tolerance
+        self.keep_best = keep_best
+
+    @property
+    def max_wall_time(self):
+        return self._max_wall_time
+
+    @max_wall_time.setter
+    def max_wall_time(self, value):
+        assert isinstance(value, (type(None), int, float))
+        if value is not None:
+            assert value > 0
+
+        self._max_wall_time = value
+
+    @property
+    def max_iterations(self):
+        return self._max_iterations
+
+    @max_iterations.setter
+    def max_iterations(self, value):
+        assert isinstance(value, (type(None), int))
+        if value is not None:
+            assert value >= 0
+
+        self._max_iterations = value
+
+    @property
+    def preset(self):
+        return self._preset
+
+    @preset.setter
+    def preset(self, value):
+        assert value in SolverBudget.presets
+
+        self._preset = value
+
+    @property
+    def feasibility_tolerance(self):
+        return self._feasibility_tolerance
+
+    @feasibility_tolerance.setter
+    def feasibility_tolerance(self, value):
+        assert isinstance(value, (int, float))
+        assert value >= 0
+
+        self._feasibility_tolerance = value
+
+    @property
+    def keep_best(self):
+        return self._keep_best
+
+    @keep_best.setter
+    def keep_best(self, value):
+        assert isinstance(value, bool)
+
+        self._keep_best = value
+
+    def ipopt_options(self):
+        """
+        Translates the budget into IPOPT options.
+
+        Returns:
+            dict:
+                Options to hand to IPOPT.
+        """
+
+        options = dict(SolverBudget.presets[self.preset])
+        if self.max_wall_time is not None:
+            options["max_wall_time"] = float(self.max_wall_time)
+        if self.max_iterations is not None:
+            options["max_iter"] = self.max_iterations
+
+        return options
+
+    def highs_options(self):
+        """
+        Translates the budget into HiGHS options. The iteration budget limits the branch-and-bound nodes.
+
+        Returns:
+            dict:
+                Options to hand to HiGHS.
+        """
+
+        options = dict(SolverBudget.highs_presets[self.preset])
+        if self.max_wall_time is not None:
+            options["time_limit"] = float(self.max_wall_time)
+        if self.max_iterations is not None:
+            options["mip_max_nodes"] = self.max_iterations
+
+        return options
+
+    def is_exhausted(self, status):
+        """
+        Whether the solver stopped with the given return status because the budget ran out.
+
+        Args:
+            status (str):
+                IPOPT or HiGHS return status.
+
+        Returns:
+            bool:
+                True for a used up time or iteration budget.
+        """
+
+        return status in SolverBudget.exhausted_statuses
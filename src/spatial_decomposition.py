@@ -0,0 +1,550 @@
+import math
+
+import casadi as ca
+import numpy as np
+
+import src.bus
+import src.generator
+import src.grid
+import src.line
+import src.optimisation_result
+import src.optimisation_task
+import src.worker_pool
+
+
+def partition_grid(grid, num_partitions):
+    """
+    Splits a grid into subtrees of about equal size. A spanning tree is grown from the generator buses, then
+    subtrees are cut off from the leaves upwards as soon as they reach the target size. The generator buses and
+    whatever is left near them form partition 0.
+
+    Args:
+        grid (Grid):
+            The grid to split, every bus has to be connected to a generator bus.
+
+        num_partitions (int):
+            Wanted number of partitions. The result can have slightly fewer or more.
+
+    Returns:
+        numpy.ndarray:
+            Partition of every bus, by bus position.
+    """
+
+    assert isinstance(num_partitions, int)
+    assert num_partitions > 0
+
+    num_buses = len(grid.buses)
+    bus0, bus1, _, _ = grid.create_line_arrays()
+    neighbours = [[] for _ in range(num_buses)]
+    for i, j in zip(bus0.tolist(), bus1.tolist()):
+        neighbours[i].append(j)
+        neighbours[j].append(i)
+
+    # Breadth first search from all generator buses at once.
+    n = len(grid.building_buses)
+    parents = np.full(num_buses, -1)
+    reached = np.zeros(num_buses, dtype=bool)
+    reached[n:] = True
+    order = list(range(n, num_buses))
+    for i in order:
+        for j in neighbours[i]:
+            if not reached[j]:
+                reached[j] = True
+                parents[j] = i
+                order.append(j)
+    assert reached.all()        # Islands can not be coordinated over boundary lines
+
+    # Children come after their parents in the search order, so the reversed order visits subtrees first.
+    target = math.ceil(num_buses / num_partitions)
+    remaining = np.ones(num_buses, dtype=int)
+    cut = np.zeros(num_buses, dtype=bool)
+    for i in reversed(order):
+        if parents[i] < 0:
+            continue
+        if remaining[i] >= target:
+            cut[i] = True
+        else:
+            remaining[parents[i]] += remaining[i]
+
+    labels = np.zeros(num_buses, dtype=int)
+    cut_roots = np.flatnonzero(cut)
+    new_labels = dict(zip(cut_roots.tolist(), range(1, cut_roots.size + 1)))
+    for i in order:
+        if cut[i]:
+            labels[i] = new_labels[i]
+        elif parents[i] >= 0:
+            labels[i] = labels[parents[i]]
+
+    return labels
+
+
+class GridPartition:
+    """
+    Part of a grid that is optimised on its own. Every boundary line leaving the partition ends in a ghost bus with
+    a free generator, its production is the import over the boundary line. Half of the boundary line's length is
+    charged on each side. The partition is pulled towards the import and panel size targets of the coordination by
+    a quadratic penalty.
+
+    The partition is built from copies of the buses, so it can be sent to other processes without the rest of the
+    grid.
+
+    Args:
+        grid (Grid):
+            The whole grid.
+
+        labels (numpy.ndarray):
+            Partition of every bus, by bus position.
+
+        label (int):
+            The partition to build.
+    """
+
+    def __init__(self, grid, labels, label):
+
+        self._grid = None
+        self._bus_positions = None
+        self._boundaries = None
+        self._task = None
+        self._penalty = None
+        self._import_task = None
+        self._import_target = None
+        self._panel_target = None
+        self._solution = None
+
+        self.create_grid(grid, labels, label)
+
+    @property
+    def grid(self):
+        return self._grid
+
+    @property
+    def bus_positions(self):
+        """
+        Position in the whole grid of every bus of the partition, -1 for ghost buses.
+        """
+        return self._bus_positions
+
+    @property
+    def boundaries(self):
+        """
+        Pairs of the boundary line's position in the whole grid and the position of its end inside the partition.
+        """
+        return self._boundaries
+
+    @property
+    def task(self):
+        return self._task
+
+    def create_grid(self, grid, labels, label):
+        """
+        Copies the buses of the partition into a grid of their own, followed by the ghost buses and the generator
+        buses of the partition.
+        """
+
+        n = len(grid.building_buses)
+        bus0, bus1, _, _ = grid.create_line_arrays()
+        members = np.flatnonzero(labels == label)
+        buildings = members[members < n].tolist()
+        generator_buses = members[members >= n].tolist()
+        boundaries = [(k, int(i if labels[i] == label else j)) for k, (i, j) in enumerate(zip(bus0, bus1))
+                      if (labels[i] == label) != (labels[j] == label)]
+        assert generator_buses or boundaries     # Some power has to be able to reach the partition
+
+        copies = {}
+        for i in buildings + generator_buses:
+            bus = grid.buses[i]
+            copy = src.bus.Bus(bus.roof_size, bus.power_draw, bus.panel.size, bus.sun_profile)
+            copy.panel.output_per_sqm = bus.panel.output_per_sqm
+            copy.panel.orientation_factor = bus.panel.orientation_factor
+            if bus.storage is not None:
+                storage = bus.storage
+                copy.add_storage(storage.capacity, storage.charge_limit, storage.discharge_limit, storage.efficiency,
+                                 storage.initial_charge)
+            copies[i] = copy
+
+        lines = []
+        for k, line in enumerate(grid.lines):
+            if labels[bus0[k]] == label and labels[bus1[k]] == label:
+                lines.append(src.line.Line(copies[bus0[k]], copies[bus1[k]], line.length, line.line_type,
+                                           line.loss_coefficient, line.loss_segments))
+
+        ghosts = []
+        for k, i in boundaries:
+            ghost = src.bus.Bus(0, None, 0)
+            lines.append(src.line.Line(copies[i], ghost, grid.lines[k].length / 2, grid.lines[k].line_type))
+            ghosts.append(ghost)
+
+        generators = [src.generator.Generator(ghost, cost=0) for ghost in ghosts]
+        for generator in grid.generators:
+            position = grid.buses.index(generator.bus)
+            if position in copies:
+                generators.append(src.generator.Generator(copies[position], generator.capacity, generator.cost))
+
+        buses = [copies[i] for i in buildings] + ghosts + [copies[i] for i in generator_buses]
+        roof_sizes = sum(grid.buses[i].roof_size for i in buildings)
+        total_panel_size = roof_sizes if grid.total_panel_size is None else min(roof_sizes, grid.total_panel_size)
+
+        slack_bus = copies[generator_buses[0]] if generator_buses else ghosts[0]
+        self._grid = src.grid.Grid(buses, lines, slack_bus, list(grid.snapshots), total_panel_size, generators)
+        self._bus_positions = np.array(buildings + [-1] * len(ghosts) + generator_buses, dtype=int)
+        self._boundaries = boundaries
+
+    def create_task(self, rho, panel_scale=1, solver_options=None):
+        """
+        Builds the problem of the partition with the penalty towards the coordination targets.
+
+        Args:
+            rho (int, float):
+                Weight of the penalty.
+
+            panel_scale (int, float):
+                Converts panel area into power for the penalty, so imports and panel areas are weighed alike.
+                Default: 1
+
+            solver_options (dict):
+                Options handed to IPOPT. Default: None
+        """
+
+        task = self.grid.new_optimisation_task()
+        task.create_optimisation_task()
+        opti = task.task
+        n = task.num_buildings
+        num_snapshots = len(task.snapshots)
+
+        ghosts = task.flow_entries(n, "generator")[:len(self.boundaries)]
+        self._import_task = ca.horzcat(*[task.flow_task[t][ghosts] for t in range(num_snapshots)]).T
+        self._import_target = opti.parameter(num_snapshots, len(ghosts))
+        self._panel_target = opti.parameter()
+
+        self._penalty = rho / 2 * (ca.sumsqr(self._import_task - self._import_target)
+                                   + (panel_scale * (ca.sum1(task.a_task) - self._panel_target)) ** 2)
+        opti.minimize(opti.f + self._penalty)
+        task.configure_solver(solver_options, verbose=False)
+
+        self._task = task
+
+    def solve(self, import_target, panel_target):
+        """
+        Solves the partition for new targets, warm started from the last solve.
+
+        Args:
+            import_target (numpy.ndarray):
+                Wanted import over each boundary line at each snapshot, shape (T, number of boundary lines).
+
+            panel_target (float):
+                Wanted panel area of the partition.
+
+        Returns:
+            tuple:
+                Import over each boundary line at each snapshot, the panel area of the partition, the
+                OptimisationResult and the value of the penalty.
+        """
+
+        opti = self.task.task
+        opti.set_value(self._import_target, import_target)
+        opti.set_value(self._panel_target, panel_target)
+        if self._solution is not None:
+            opti.set_initial(self._solution.value_variables())
+
+        # A failed solve gives the solver's last point with success False, the coordination goes on from it.
+        solution, result = self.task.run_solver(keep_failed=True)
+        if solution is not None:
+            self._solution = solution
+        value = opti.debug.value if solution is None else solution.value
+        imports = np.reshape(value(self._import_task), import_target.shape)
+
+        return imports, float(result.panel_sizes.sum()), result, float(value(self._penalty))
+
+
+class PartitionBundle:
+    """
+    Partitions solved one after another by the same worker process, so the number of processes does not grow with
+    the number of partitions.
+
+    Args:
+        partitions (list of GridPartition):
+            The partitions of the bundle.
+    """
+
+    def __init__(self, partitions):
+
+        self._partitions = list(partitions)
+
+    @property
+    def partitions(self):
+        return self._partitions
+
+    def create_tasks(self, rho, panel_scale=1, solver_options=None):
+        """
+        Builds the problem of every partition of the bundle, see GridPartition.create_task.
+        """
+
+        for partition in self.partitions:
+            partition.create_task(rho, panel_scale, solver_options)
+
+    def solve(self, targets):
+        """
+        Solves every partition of the bundle for its targets.
+
+        Args:
+            targets (list of tuple):
+                The (import target, panel target) pair of each partition of the bundle.
+
+        Returns:
+            list of tuple:
+                The outcome of GridPartition.solve of each partition.
+        """
+
+        return [partition.solve(*target) for partition, target in zip(self.partitions, targets)]
+
+
+class SpatialDecomposition:
+    """
+    Optimises large, nearly radial grids in partitions that are coordinated with the alternating direction method
+    of multipliers (ADMM). Each partition is solved on its own, in parallel worker processes if wanted. Between the
+    solves, the imports over every boundary line are made to agree on both sides and the panel areas of all
+    partitions are made to fit the total panel size.
+
+    The boundary lines are modelled without losses. The result is as good as the coordination converged, its
+    statistics hold the remaining residuals.
+
+    Args:
+        grid (Grid):
+            The grid to optimise.
+
+        num_partitions (int):
+            Wanted number of partitions, see partition_grid. Default: 2
+
+        rho (int, float):
+            Weight of the penalty pulling the partitions towards agreement. Larger values agree faster but find the
+            price of power over the boundary lines slower. Default: None, GENERATOR_COST divided by the largest
+            power draw.
+
+        max_iterations (int):
+            Maximum number of coordination rounds. Default: 200
+
+        tolerance (int, float):
+            Largest remaining disagreement of imports and of the panel budget, relative to the largest power draw
+            and the total panel size. Default: 1e-3
+
+        processes (int):
+            Number of worker processes, at most one per partition. Each process keeps the problems of a bundle of
+            partitions and solves them one after another. Default: None, all partitions are solved in this process
+            one after another.
+
+        solver_options (dict):
+            Options handed to IPOPT. Default: None
+    """
+
+    def __init__(self, grid, num_partitions=2, rho=None, max_iterations=200, tolerance=1e-3, processes=None,
+                 solver_options=None):
+
+        assert isinstance(grid, src.grid.Grid)
+        assert isinstance(max_iterations, int) and max_iterations > 0
+        assert isinstance(tolerance, (int, float)) and tolerance > 0
+        assert processes is None or (isinstance(processes, int) and processes > 0)
+
+        self._grid = grid
+        self._labels = partition_grid(grid, num_partitions)
+        self._partitions = [GridPartition(grid, self._labels, label) for label in np.unique(self._labels)]
+        self._max_draw = max(1.0, float(np.abs(np.nan_to_num(np.array(
+            [bus.power_draw for bus in grid.building_buses], dtype=float))).max(initial=0)))
+        if rho is None:
+            rho = src.optimisation_task.GENERATOR_COST / self._max_draw
+        assert isinstance(rho, (int, float)) and rho > 0
+        self._rho = rho
+        # A square meter of panel is worth about as much as the power it produces at best.
+        self._panel_scale = max(1.0, float(grid.create_panel_output_vector()[:len(grid.building_buses)].max(initial=0)))
+        self._max_iterations = max_iterations
+        self._tolerance = tolerance
+        self._processes = processes
+        self._solver_options = solver_options
+
+    @property
+    def grid(self):
+        return self._grid
+
+    @property
+    def labels(self):
+        return self._labels
+
+    @property
+    def partitions(self):
+        return self._partitions
+
+    def boundary_pairs(self):
+        """
+        Finds both sides of every boundary line.
+
+        Returns:
+            dict:
+                Position of the boundary line in the whole grid mapped to a list of (partition, column) pairs,
+                the column is the boundary's position in the partition's import matrix.
+        """
+
+        sides = {}
+        for p, partition in enumerate(self.partitions):
+            for column, (line, _) in enumerate(partition.boundaries):
+                sides.setdefault(line, []).append((p, column))
+        assert all(len(pair) == 2 for pair in sides.values())
+
+        return sides
+
+    def solve(self):
+        """
+        Runs the coordination until imports and panel budget agree or the iterations run out.
+
+        Returns:
+            OptimisationResult:
+                Currents and panel sizes of the whole grid. The statistics hold "iterations", "primal_residual",
+                "dual_residual" and "success", which is True if the coordination converged and every partition
+                solve succeeded.
+        """
+
+        num_snapshots = len(self.grid.snapshots)
+        partitions = self.partitions
+        sides = self.boundary_pairs()
+        total_panel_size = self.grid.total_panel_size
+        if total_panel_size is None:
+            total_panel_size = float(sum(bus.roof_size for bus in self.grid.building_buses))
+
+        # Consensus values z and scaled dual values u of the imports and the panel areas.
+        imports_z = [np.zeros((num_snapshots, len(p.boundaries))) for p in partitions]
+        imports_u = [np.zeros_like(z) for z in imports_z]
+        panels_z = np.zeros(len(partitions))
+        panels_u = np.zeros(len(partitions))
+
+        solve_all = self.create_solver()
+        try:
+            for iteration in range(1, self._max_iterations + 1):
+                outcomes = solve_all([(imports_z[p] - imports_u[p], panels_z[p] - panels_u[p])
+                                      for p in range(len(partitions))])
+                imports = [outcome[0] for outcome in outcomes]
+                panels = np.array([outcome[1] for outcome in outcomes])
+
+                previous_imports = [z.copy() for z in imports_z]
+                previous_panels = panels_z.copy()
+                # Projection: what flows into one side flows out of the other.
+                for (p, i), (q, j) in sides.values():
+                    difference = (imports[p][:, i] + imports_u[p][:, i] - imports[q][:, j] - imports_u[q][:, j]) / 2
+                    imports_z[p][:, i] = difference
+                    imports_z[q][:, j] = -difference
+                # Projection: the panel areas fit the total panel size.
+                panels_z = panels + panels_u
+                if panels_z.sum() > total_panel_size:
+                    panels_z -= (panels_z.sum() - total_panel_size) / len(partitions)
+
+                for p in range(len(partitions)):
+                    imports_u[p] += imports[p] - imports_z[p]
+                panels_u += panels - panels_z
+
+                primal = max([np.abs(imports[p] - imports_z[p]).max(initial=0) / self._max_draw
+                              for p in range(len(partitions))]
+                             + [np.abs(panels - panels_z).max() / max(1.0, total_panel_size)])
+                dual = max([np.abs(imports_z[p] - previous_imports[p]).max(initial=0) / self._max_draw
+                            for p in range(len(partitions))]
+                           + [np.abs(panels_z - previous_panels).max() / max(1.0, total_panel_size)])
+                if primal <= self._tolerance and dual <= self._tolerance:
+                    break
+        finally:
+            solve_all(None)
+
+        stats = {"iterations": iteration, "primal_residual": primal, "dual_residual": dual,
+                 "success": primal <= self._tolerance and dual <= self._tolerance
+                 and all(outcome[2].success for outcome in outcomes)}
+
+        return self.create_result(imports_z, outcomes, stats)
+
+    def create_solver(self):
+        """
+        Starts the partition problems, in worker processes if wanted.
+
+        Returns:
+            callable:
+                Takes a list with the (import target, panel target) pair of every partition and returns the
+                outcomes of GridPartition.solve in the same order. Called with None it stops the workers.
+        """
+
+        if self._processes is None:
+            for partition in self.partitions:
+                partition.create_task(self._rho, self._panel_scale, self._solver_options)
+
+            def solve_all(targets):
+                if targets is None:
+                    return None
+                return [partition.solve(*target) for partition, target in zip(self.partitions, targets)]
+
+            return solve_all
+
+        # Each process keeps the problems of a bundle of neighbouring partitions alive.
+        groups = np.array_split(np.arange(len(self.partitions)), min(self._processes, len(self.partitions)))
+        bundles = [PartitionBundle([self.partitions[p] for p in group]) for group in groups]
+        pool = src.worker_pool.WorkerPool(bundles, "create_tasks", (self._rho, self._panel_scale, self._solver_options))
+
+        def solve_all(targets):
+            if targets is None:
+                pool.close()
+                return None
+            outcomes = pool.map([([targets[p] for p in group],) for group in groups])
+            return [outcome for bundle_outcomes in outcomes for outcome in bundle_outcomes]
+
+        return solve_all
+
+    def create_result(self, imports, outcomes, stats):
+        """
+        Puts the results of the partitions together into one result of the whole grid. The currents over boundary
+        lines are the agreed imports.
+
+        Args:
+            imports (list of numpy.ndarray):
+                Agreed import over each boundary line of each partition.
+
+            outcomes (list of tuple):
+                Outcomes of the last GridPartition.solve of each partition.
+
+            stats (dict):
+                Statistics of the coordination.
+
+        Returns:
+            OptimisationResult:
+                Currents, panel sizes and storage levels of the whole grid, the objective without the penalties.
+        """
+
+        grid = self.grid
+        num_buses = len(grid.buses)
+        bus0, bus1, _, _ = grid.create_line_arrays()
+        rows = np.concatenate([bus0, bus1, np.arange(num_buses)])
+        cols = np.concatenate([bus1, bus0, np.arange(num_buses)])
+        keys = np.unique(cols * num_buses + rows)       # Column major, as the optimisation task stores them
+        flow_rows = keys % num_buses
+        flow_cols = keys // num_buses
+
+        flows = np.zeros((len(grid.snapshots), keys.size))
+        panel_sizes = np.zeros(len(grid.building_buses))
+        storage_buses = [i for i, bus in enumerate(grid.building_buses) if bus.storage is not None]
+        storage_levels = np.zeros((len(grid.snapshots), len(storage_buses))) if storage_buses else None
+        objective = 0
+        for partition, partition_imports, (_, _, result, penalty) in zip(self.partitions, imports, outcomes):
+            positions = partition.bus_positions
+            local_rows = positions[result.flow_rows]
+            local_cols = positions[result.flow_cols]
+            inside = (local_rows >= 0) & (local_cols >= 0)
+            entries = np.searchsorted(keys, local_cols[inside] * num_buses + local_rows[inside])
+            np.add.at(flows, (slice(None), entries), result.flow_values[:, inside])
+
+            # Boundary currents are added once, from the side that imports.
+            for (line, inner), line_imports in zip(partition.boundaries, partition_imports.T):
+                outer = bus1[line] if bus0[line] == inner else bus0[line]
+                entry = np.searchsorted(keys, outer * num_buses + inner)
+                flows[:, entry] += np.clip(line_imports, 0, None)
+
+            buildings = positions[:result.panel_sizes.size]
+            panel_sizes[buildings] = result.panel_sizes
+            if storage_levels is not None and result.storage_levels is not None:
+                columns = [storage_buses.index(buildings[i]) for i in result.storage_buses]
+                storage_levels[:, columns] = result.storage_levels
+            objective += result.objective - penalty
+
+        return src.optimisation_result.OptimisationResult(np.asarray(grid.snapshots, dtype=float), flows,
+                                                          panel_sizes, objective, stats, (flow_rows, flow_cols),
+                                                          storage_levels, storage_buses)
@@ -0,0 +1,372 @@
+import casadi as ca
+import numpy as np
+
+import src.grid
+import src.optimisation_result
+import src.optimisation_task
+import src.worker_pool
+
+
+def create_scenario_task(grid, power_draws, sun, weights, panel_sizes=None):
+    """
+    Builds one problem for several scenarios. The snapshots of all scenarios are stacked, every scenario gets its
+    own block of snapshots with its own currents, while the panel areas are shared.
+
+    Args:
+        grid (Grid):
+            The grid to optimise, without storage.
+
+        power_draws (numpy.ndarray):
+            Power draws of shape (scenarios, snapshots, buildings).
+
+        sun (numpy.ndarray):
+            Sun factors of shape (scenarios, snapshots, buildings).
+
+        weights (numpy.ndarray):
+            Weight of each scenario in the objective.
+
+        panel_sizes (numpy.ndarray):
+            Fixed panel areas, only the currents are optimised. Default: None, the panel areas are optimised.
+
+    Returns:
+        OptimisationTask:
+            The task with its problem, the solver is not configured yet.
+    """
+
+    num_scenarios, num_snapshots, n = power_draws.shape
+    snapshots = np.tile(np.asarray(grid.snapshots, dtype=float), num_scenarios)
+
+    task = grid.new_optimisation_task(snapshots, power_draws.reshape(-1, n))
+    task.sun_factors = sun.reshape(-1, n)
+    assert not task.storage_buses       # Storage would carry its charge from one scenario into the next
+    num_snaps = task.num_snapshots
+
+    task.create_problem_and_variables(n, num_snaps)
+    task.create_cost_function(n, num_snaps, snapshot_weights=np.repeat(weights, num_snapshots))
+    if panel_sizes is None:
+        task.create_constraint_total_panel_size(n)
+        task.create_constraint_house_panel_size(n)
+    else:
+        task.create_constraint_fixed_panel_size(n, panel_sizes)
+    task.create_constraint_panel_output(n, num_snaps, snapshots)
+    task.create_constraint_line_rating(n, num_snaps)
+    task.create_constraint_house_consumption(n, num_snaps)
+    task.create_constraint_generator_production(n, num_snaps)
+    task.create_constraint_generator_capacity(n, num_snaps)
+    task.create_constraint_line_losses(n, num_snaps)
+
+    return task
+
+
+class ScenarioBundle:
+    """
+    Scenarios solved one after another by the same process during progressive hedging. Every scenario has its own
+    problem, in which the panel areas are pulled towards their average over all scenarios.
+
+    Args:
+        grid (Grid):
+            The grid to optimise.
+
+        power_draws (numpy.ndarray):
+            Power draws of the scenarios of the bundle, shape (scenarios, snapshots, buildings).
+
+        sun (numpy.ndarray):
+            Sun factors of the scenarios of the bundle, shape (scenarios, snapshots, buildings).
+    """
+
+    def __init__(self, grid, power_draws, sun):
+
+        self._grid = grid
+        self._power_draws = power_draws
+        self._sun = sun
+        self._problems = []
+        self._solver_options = None
+
+    @property
+    def num_scenarios(self):
+        return len(self._power_draws)
+
+    def create_tasks(self, solver_options=None):
+        """
+        Builds the problem of every scenario with the progressive hedging terms w @ a + rho / 2 * |a - average|^2,
+        prices w, average and rho are parameters.
+
+        Args:
+            solver_options (dict):
+                Options handed to IPOPT. Default: None
+        """
+
+        self._solver_options = solver_options
+        for power_draws, sun in zip(self._power_draws, self._sun):
+            task = create_scenario_task(self._grid, power_draws[None], sun[None], np.ones(1))
+            opti = task.task
+            prices = opti.parameter(task.num_buildings)
+            average = opti.parameter(task.num_buildings)
+            rho = opti.parameter()
+            penalty = ca.dot(prices, task.a_task) + rho / 2 * ca.sumsqr(task.a_task - average)
+            opti.minimize(opti.f + penalty)
+            task.configure_solver(solver_options, verbose=False)
+            self._problems.append({"task": task, "prices": prices, "average": average, "rho": rho,
+                                   "penalty": penalty, "solution": None})
+
+    def solve(self, prices, average, rho):
+        """
+        Solves every scenario of the bundle, warm started from its last solve.
+
+        Args:
+            prices (numpy.ndarray):
+                Price of the panel areas of each scenario, shape (scenarios, buildings).
+
+            average (numpy.ndarray):
+                Average panel areas over all scenarios.
+
+            rho (int, float):
+                Weight of the quadratic term, 0 in the first round.
+
+        Returns:
+            list of tuple:
+                Panel areas, OptimisationResult and value of the progressive hedging terms of each scenario.
+        """
+
+        outcomes = []
+        for problem, scenario_prices in zip(self._problems, prices):
+            opti = problem["task"].task
+            opti.set_value(problem["prices"], scenario_prices)
+            opti.set_value(problem["average"], average)
+            opti.set_value(problem["rho"], rho)
+            if problem["solution"] is not None:
+                opti.set_initial(problem["solution"].value_variables())
+
+            # A scenario that fails is reported from the solver's last point, the round does not count as converged.
+            solution, result = problem["task"].run_solver(keep_failed=True)
+            if solution is not None:
+                problem["solution"] = solution
+            value = opti.debug.value if solution is None else solution.value
+            outcomes.append((result.panel_sizes, result, float(value(problem["penalty"]))))
+
+        return outcomes
+
+    def evaluate(self, panel_sizes):
+        """
+        Solves the currents of every scenario of the bundle for fixed panel areas, one scenario after another.
+
+        Args:
+            panel_sizes (numpy.ndarray):
+                Panel area of each building.
+
+        Returns:
+            list of OptimisationResult:
+                Result of each scenario, with "success" False if the scenario could not be solved.
+        """
+
+        results = []
+        for power_draws, sun in zip(self._power_draws, self._sun):
+            task = create_scenario_task(self._grid, power_draws[None], sun[None], np.ones(1), panel_sizes)
+            task.configure_solver(self._solver_options, verbose=False)
+            _, result = task.run_solver(keep_failed=True)
+            results.append(result)
+
+        return results
+
+
+class StochasticOptimisation:
+    """
+    Two-stage optimisation of the panel areas of a grid against weighted scenarios of power draws and sun factors.
+    The panel areas are decided first and shared by all scenarios, the currents are decided per scenario. The
+    objective is the weighted sum of the costs of the scenarios.
+
+    Either one problem holds all scenarios as blocks of snapshots, or every scenario is solved on its own and
+    the scenarios are made to agree on the panel areas by progressive hedging, optionally spread over processes.
+
+    Args:
+        grid (Grid):
+            The grid to optimise, without storage.
+
+        power_draws (numpy.ndarray):
+            Power draws of shape (scenarios, snapshots, buildings), e.g. from ScenarioSampler.sample.
+
+        sun (numpy.ndarray):
+            Sun factors of shape (scenarios, snapshots, buildings). Default: None, the sun of the grid in every
+            scenario.
+
+        weights (list, numpy.ndarray):
+            Probability of each scenario, normalised to sum up to one. Default: None, all scenarios are equally
+            likely.
+
+        solver_options (dict):
+            Options handed to IPOPT. Default: None
+    """
+
+    def __init__(self, grid, power_draws, sun=None, weights=None, solver_options=None):
+
+        assert isinstance(grid, src.grid.Grid)
+        n = len(grid.building_buses)
+        power_draws = np.asarray(power_draws, dtype=float)
+        assert power_draws.ndim == 3 and power_draws.shape[1:] == (len(grid.snapshots), n)
+        assert (power_draws >= 0).all()
+        num_scenarios = power_draws.shape[0]
+
+        if sun is None:
+            sun = np.broadcast_to(grid.create_sun_matrix(), power_draws.shape)
+        sun = np.asarray(sun, dtype=float)
+        assert sun.shape == power_draws.shape
+
+        if weights is None:
+            weights = np.ones(num_scenarios)
+        weights = np.asarray(weights, dtype=float).reshape(-1)
+        assert weights.shape == (num_scenarios,)
+        assert (weights >= 0).all() and weights.sum() > 0
+
+        self._grid = grid
+        self._power_draws = power_draws
+        self._sun = sun
+        self._weights = weights / weights.sum()
+        self._solver_options = solver_options
+
+    @property
+    def grid(self):
+        return self._grid
+
+    @property
+    def weights(self):
+        return self._weights
+
+    @property
+    def num_scenarios(self):
+        return self.weights.size
+
+    def solve(self, budget=None):
+        """
+        Solves all scenarios in one problem.
+
+        Args:
+            budget (SolverBudget):
+                Time and iteration limits, if they run out the best point found is returned. Default: None
+
+        Returns:
+            OptimisationResult:
+                The shared panel areas and the currents of all scenarios, the snapshots of scenario s are the
+                positions s * T to (s + 1) * T. Use select to get a single scenario.
+        """
+
+        task = create_scenario_task(self.grid, self._power_draws, self._sun, self.weights)
+        task.configure_solver(self._solver_options, verbose=False, budget=budget)
+
+        _, result = task.run_solver(budget)
+        return result
+
+    def solve_decomposed(self, processes=None, rho=None, max_iterations=100, tolerance=1e-3):
+        """
+        Solves the scenarios on their own and coordinates their panel areas with progressive hedging. Only the
+        problems of single scenarios have to be held in memory, spread over the worker processes.
+
+        Args:
+            processes (int):
+                Number of worker processes, each solving a bundle of scenarios. Default: None, all scenarios are
+                solved in this process.
+
+            rho (int, float):
+                Weight pulling the panel areas of the scenarios towards their average. Default: None, the value
+                of the power one square meter of panel produces at best, per square meter of the largest roof.
+
+            max_iterations (int):
+                Maximum number of progressive hedging rounds. Default: 100
+
+            tolerance (int, float):
+                Largest deviation of a scenario's panel areas from the average and largest change of the average
+                in the last round, relative to the largest roof. Default: 1e-3
+
+        Returns:
+            OptimisationResult:
+                The averaged panel areas and the currents of every scenario solved again for them, stacked like in
+                solve. Its statistics hold "iterations", "deviation" and "success", which is False as well if a
+                scenario of the last round did not converge. Panels can not be curtailed, so if the average produces
+                more than the lines of a scenario carry, "success" is False, a smaller tolerance brings the average
+                closer to what all scenarios can take.
+        """
+
+        assert max_iterations > 0 and tolerance > 0
+        grid = self.grid
+        roof_sizes = np.array([bus.roof_size for bus in grid.building_buses], dtype=float)
+        largest_roof = max(1.0, float(roof_sizes.max(initial=0)))
+        if rho is None:
+            output = grid.create_panel_output_vector()[:roof_sizes.size].max(initial=1)
+            rho = src.optimisation_task.GENERATOR_COST * float(output) / largest_roof
+        assert rho > 0
+
+        num_workers = 1 if processes is None else min(processes, self.num_scenarios)
+        groups = np.array_split(np.arange(self.num_scenarios), num_workers)
+        bundles = [ScenarioBundle(grid, self._power_draws[group], self._sun[group]) for group in groups]
+
+        prices = np.zeros((self.num_scenarios, roof_sizes.size))
+        average = np.zeros(roof_sizes.size)
+        solve_all = self.create_solver(bundles, processes is not None)
+        try:
+            # The first round solves every scenario on its own, its average is the starting point.
+            for iteration in range(max_iterations + 1):
+                weight = 0 if iteration == 0 else rho
+                outcomes = solve_all([(prices[group], average, weight) for group in groups])
+                panel_sizes = np.array([outcome[0] for outcome in outcomes])
+
+                previous = average
+                average = self.weights @ panel_sizes
+                prices += rho * (panel_sizes - average)
+                deviation = float(np.abs(panel_sizes - average).max()) / largest_roof
+                change = float(np.abs(average - previous).max()) / largest_roof
+                solved = all(outcome[1].success for outcome in outcomes)
+                if iteration > 0 and solved and deviation <= tolerance and change <= tolerance:
+                    break
+            # The scenarios solved for their own panel areas, their currents have to be solved again for the average.
+            average = np.clip(average, 0, roof_sizes)       # Solver tolerances can leave it just outside the roofs
+            results = solve_all([(average,)] * len(groups), "evaluate")
+        finally:
+            solve_all(None)
+
+        objective = float(self.weights @ [result.objective for result in results])
+        stats = {"iterations": iteration, "deviation": deviation,
+                 "success": solved and deviation <= tolerance and all(result.success for result in results)}
+
+        return src.optimisation_result.OptimisationResult(np.concatenate([result.snapshots for result in results]),
+                                                          np.concatenate([result.flow_values for result in results]),
+                                                          average, objective, stats,
+                                                          (results[0].flow_rows, results[0].flow_cols))
+
+    def create_solver(self, bundles, in_processes):
+        """
+        Starts the scenario problems, in worker processes if wanted.
+
+        Args:
+            bundles (list of ScenarioBundle):
+                The scenarios of each worker.
+
+            in_processes (bool):
+                Solve every bundle in its own process.
+
+        Returns:
+            callable:
+                Takes a list with the (prices, average, rho) targets of every bundle and returns the outcomes of all
+                scenarios in their order. A second argument "evaluate" calls ScenarioBundle.evaluate instead of
+                solve. Called with None it stops the workers.
+        """
+
+        if not in_processes:
+            for bundle in bundles:
+                bundle.create_tasks(self._solver_options)
+
+            def solve_all(targets, method="solve"):
+                if targets is None:
+                    return None
+                return [outcome for bundle, target in zip(bundles, targets) for outcome in
+                        getattr(bundle, method)(*target)]
+
+            return solve_all
+
+        pool = src.worker_pool.WorkerPool(bundles, "create_tasks", (self._solver_options,))
+
+        def solve_all(targets, method="solve"):
+            if targets is None:
+                pool.close()
+                return None
+            return [outcome for outcomes in pool.map(targets, method=method) for outcome in outcomes]
+
+        return solve_all
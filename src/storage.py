@@ -0,0 +1,132 @@
+import itertools
+import math
+
+import src.bus
+
+
+class Storage:
+    """
+    A battery at a bus, shifts energy between snapshots. Created with Bus.add_storage.
+    Energy is power times hours, the state of charge is taken at the end of each snapshot.
+
+    Args:
+        bus (Bus):
+            The location of the battery.
+
+        capacity (int, float):
+            Energy the battery can hold. Greater or equal to zero.
+
+        charge_limit (int, float):
+            Maximum charging power. Default: None, unlimited.
+
+        discharge_limit (int, float):
+            Maximum discharging power. Default: None, unlimited.
+
+        efficiency (int, float):
+            Round trip efficiency between 0 and 1, split evenly between charging and discharging. Default: 1
+
+        initial_charge (int, float):
+            Energy stored before the first snapshot. Default: 0
+    """
+
+    id_counter = itertools.count()
+
+    def __init__(self, bus, capacity, charge_limit=None, discharge_limit=None, efficiency=1, initial_charge=0):
+
+        self._id = next(Storage.id_counter)
+
+        self._bus = None
+        self._capacity = None
+        self._charge_limit = None
+        self._discharge_limit = None
+        self._efficiency = None
+        self._initial_charge = None
+
+        self.bus = bus
+        self.capacity = capacity
+        self.charge_limit = charge_limit
+        self.discharge_limit = discharge_limit
+        self.efficiency = efficiency
+        self.initial_charge = initial_charge
+
+    @property
+    def id(self):
+        return self._id
+
+    @id.setter
+    def id(self, identifier):
+        raise PermissionError("id can  never be overwritten.")
+
+    @property
+    def bus(self):
+        return self._bus
+
+    @bus.setter
+    def bus(self, value):
+        if self._bus is not None:
+            raise PermissionError("A storage is fixed on a bus.")
+
+        assert isinstance(value, src.bus.Bus)
+
+        self._bus = value
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @capacity.setter
+    def capacity(self, value):
+        assert isinstance(value, (int, float))
+        assert value >= 0
+
+        self._capacity = value
+
+    @property
+    def charge_limit(self):
+        return self._charge_limit
+
+    @charge_limit.setter
+    def charge_limit(self, value):
+        assert isinstance(value, (type(None), int, float))
+        if value is not None:
+            assert value >= 0
+
+        self._charge_limit = value
+
+    @property
+    def discharge_limit(self):
+        return self._discharge_limit
+
+    @discharge_limit.setter
+    def discharge_limit(self, value):
+        assert isinstance(value, (type(None), int, float))
+        if value is not None:
+            assert value >= 0
+
+        self._discharge_limit = value
+
+    @property
+    def efficiency(self):
+        return self._efficiency
+
+    @efficiency.setter
+    def efficiency(self, value):
+        assert isinstance(value, (int, float))
+        assert 0 < value <= 1
+
+        self._efficiency = value
+
+    @property
+    def one_way_efficiency(self):
+        return math.sqrt(self.efficiency)
+
+    @property
+    def initial_charge(self):
+        return self._initial_charge
+
+    @initial_charge.setter
+    def initial_charge(self, value):
+        assert isinstance(value, (int, float))
+        assert 0 <= value <= self.capacity
+
+        self._initial_charge = value
@@ -0,0 +1,253 @@
+import numpy as np
+import pandas as pd
+
+import src.optimisation_task
+
+NANOSECONDS_PER_HOUR = 3600 * 10 ** 9
+DAY = np.timedelta64(1, "D")
+
+REDUCTIONS = ("mean", "sum", "max", "min")
+
+
+def to_timedelta(resolution):
+    """
+    Reads a resolution given as numpy.timedelta64, pandas.Timedelta or text like "15min" or "1h".
+    """
+    return np.timedelta64(int(pd.Timedelta(resolution).value), "ns")
+
+
+def reduce_groups(values, starts, how):
+    """
+    Reduces consecutive groups of rows, ignoring missing values. Groups with only missing values stay missing.
+
+    Args:
+        values (numpy.ndarray):
+            Shape (points in time, buses).
+
+        starts (numpy.ndarray):
+            First row of each group, ascending.
+
+        how (str):
+            "mean", "sum", "max" or "min".
+
+    Returns:
+        numpy.ndarray:
+            One row per group.
+    """
+
+    present = ~np.isnan(values)
+    counts = np.add.reduceat(present, starts, axis=0)
+    if how == "max":
+        reduced = np.fmax.reduceat(values, starts, axis=0)
+    elif how == "min":
+        reduced = np.fmin.reduceat(values, starts, axis=0)
+    else:
+        reduced = np.add.reduceat(np.where(present, values, 0), starts, axis=0)
+        if how == "mean":
+            reduced = reduced / np.maximum(counts, 1)
+
+    return np.where(counts > 0, reduced, np.nan)
+
+
+class TimeSeries:
+    """
+    Power draws of buildings over real timestamps, e.g. meter readings of many days, and their mapping onto the
+    snapshots of an optimisation: hours of the day, used by the diurnal sun, and a (snapshots, buildings) array of
+    power draws. All operations work on whole arrays, there is no loop over buses.
+
+    Snapshots of several days repeat the same hours, the gaps between them still give the right durations for
+    storage as long as the resolution is shorter than a day.
+
+    Args:
+        timestamps (numpy.ndarray):
+            Points in time, anything numpy reads as datetime64, strictly increasing. Local time, without time zone.
+
+        values (numpy.ndarray):
+            Power draw of each bus at each point in time, shape (points in time, buses). NaN marks missing readings.
+
+        keys (list of str):
+            Key of the bus of each column, see Grid.ids. Default: None, the columns are the buildings of the grid
+            in their order.
+    """
+
+    def __init__(self, timestamps, values, keys=None):
+
+        timestamps = np.asarray(timestamps, dtype="datetime64[ns]").reshape(-1)
+        values = np.asarray(values, dtype=float)
+        if values.ndim == 1:
+            values = values[:, None]
+        assert values.ndim == 2 and values.shape[0] == timestamps.size
+        assert np.all(np.diff(timestamps) > np.timedelta64(0, "ns")), "Timestamps have to be strictly increasing."
+        if keys is not None:
+            keys = [str(key) for key in keys]
+            assert len(keys) == values.shape[1] and len(set(keys)) == len(keys)
+
+        self._timestamps = timestamps
+        self._values = values
+        self._keys = keys
+
+    @classmethod
+    def from_frame(cls, frame):
+        """
+        Reads a pandas.DataFrame with a DatetimeIndex and one column per bus, named by its key.
+        """
+        return cls(frame.index.values, frame.values, list(frame.columns))
+
+    def to_frame(self):
+        """
+        The series as pandas.DataFrame, indexed by timestamp, one column per bus.
+        """
+        return pd.DataFrame(self.values, index=pd.DatetimeIndex(self.timestamps), columns=self.keys)
+
+    @property
+    def timestamps(self):
+        return self._timestamps
+
+    @property
+    def values(self):
+        return self._values
+
+    @property
+    def keys(self):
+        return self._keys
+
+    @property
+    def hours(self):
+        """
+        Hour of the day of every timestamp, from 0 to 24, the snapshots of the optimisation.
+        """
+        since_midnight = self.timestamps - self.timestamps.astype("datetime64[D]")
+
+        return since_midnight.astype(np.int64) / NANOSECONDS_PER_HOUR
+
+    @property
+    def days(self):
+        """
+        Day of every timestamp.
+        """
+        return self.timestamps.astype("datetime64[D]")
+
+    def resample(self, resolution, how="mean"):
+        """
+        Aggregates the series to a coarser resolution. Bins start at midnight, each gets the timestamp of its
+        start. Missing readings are ignored, bins without any reading are left out.
+
+        Args:
+            resolution (str, numpy.timedelta64, pandas.Timedelta):
+                Length of a bin, e.g. "1h". Has to divide a day and be shorter than it.
+
+            how (str):
+                "mean" keeps power draws as power, "sum" adds energies, "max" and "min" give the extremes.
+                Default: "mean"
+
+        Returns:
+            TimeSeries:
+                The aggregated series.
+        """
+
+        assert how in REDUCTIONS
+        step = to_timedelta(resolution)
+        assert np.timedelta64(0, "ns") < step < DAY and DAY % step == np.timedelta64(0, "ns"), \
+            "The resolution has to divide a day."
+
+        # Nanoseconds since the epoch, which starts at midnight, so bins line up with days.
+        bins = self.timestamps.astype(np.int64) // step.astype(np.int64)
+        starts = np.flatnonzero(np.diff(bins, prepend=bins[:1] - 1))
+        values = reduce_groups(self.values, starts, how)
+        timestamps = (bins[starts] * step.astype(np.int64)).astype("datetime64[ns]")
+
+        return TimeSeries(timestamps, values, self.keys)
+
+    def typical_day(self, how="mean"):
+        """
+        Aggregates all days into one, by the time of day, e.g. the mean day of a month of readings.
+
+        Args:
+            how (str):
+                "mean", "sum", "max" or "min", see resample. Default: "mean"
+
+        Returns:
+            TimeSeries:
+                One point per time of day, on the first day of the series.
+        """
+
+        assert how in REDUCTIONS
+        since_midnight = (self.timestamps - self.timestamps.astype("datetime64[D]")).astype(np.int64)
+        order = np.argsort(since_midnight, kind="stable")
+        sorted_times = since_midnight[order]
+        starts = np.flatnonzero(np.diff(sorted_times, prepend=sorted_times[:1] - 1))
+        values = reduce_groups(self.values[order], starts, how)
+        timestamps = self.days[0] + sorted_times[starts].astype("timedelta64[ns]")
+
+        return TimeSeries(timestamps, values, self.keys)
+
+    def between(self, start, end):
+        """
+        The part of the series from start, inclusive, to end, exclusive.
+
+        Args:
+            start, end:
+                Anything numpy reads as datetime64, e.g. "2024-06-01".
+
+        Returns:
+            TimeSeries:
+                The selected points in time.
+        """
+
+        first, last = np.searchsorted(self.timestamps, np.array([start, end], dtype="datetime64[ns]"))
+
+        return TimeSeries(self.timestamps[first:last], self.values[first:last], self.keys)
+
+    def sun(self):
+        """
+        Diurnal sun factor at every timestamp, the sun the optimisation uses for these snapshots.
+        """
+        return src.optimisation_task.OptimisationTask.sun(self.hours)
+
+    def power_draws(self, grid):
+        """
+        Power draws in the order of the grid's buildings, shape (snapshots, buildings).
+
+        Args:
+            grid (Grid):
+                The grid to optimise, every building needs a column.
+
+        Returns:
+            numpy.ndarray:
+                The power draws.
+
+        Raises:
+            ValueError:
+                If readings are missing, resample first.
+        """
+
+        n = len(grid.building_buses)
+        if self.keys is None:
+            assert self.values.shape[1] == n
+            draws = self.values
+        else:
+            positions = grid.ids.bus_indices(self.keys)
+            assert np.all(positions < n), "Only buildings draw power."
+            assert np.unique(positions).size == n, "Every building needs a power draw."
+            draws = np.empty((self.timestamps.size, n))
+            draws[:, positions] = self.values
+
+        if np.isnan(draws).any():
+            raise ValueError("Power draws are missing, resample the series or fill the gaps first.")
+
+        return draws
+
+    def create_task(self, grid):
+        """
+        Creates an optimisation task of the grid for this series, see Grid.new_optimisation_task.
+
+        Args:
+            grid (Grid):
+                The grid to optimise.
+
+        Returns:
+            OptimisationTask:
+                The task with the hours as snapshots and the series' power draws, its problem still has to be created.
+        """
+
+        return grid.new_optimisation_task(self.hours.tolist(), self.power_draws(grid))
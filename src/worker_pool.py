@@ -0,0 +1,192 @@
+import multiprocessing
+import traceback
+
+JOIN_TIMEOUT = 10       # Seconds a worker gets to stop on its own before it is terminated
+
+
+class RemoteTraceback(Exception):
+    """
+    The traceback of an error raised in a worker process, attached as cause of the error raised again here.
+    """
+
+    def __init__(self, text):
+        super().__init__(text)
+        self.text = text
+
+    def __str__(self):
+        return self.text
+
+
+def run_worker(connection, owner, setup, setup_args, method):
+    """
+    Keeps an object alive in a worker process. It is set up once, then its method is called with every tuple of
+    arguments the worker receives, until it receives None or the pipe is closed. Every call is answered with the
+    pair of its outcome and None, or None and the error it raised with its traceback, so the worker survives errors.
+    Lives on module level so it can be started in other processes.
+
+    Args:
+        connection (multiprocessing.connection.Connection):
+            Pipe to the coordinating process.
+
+        owner (object):
+            The object to keep alive.
+
+        setup (str):
+            Name of the method setting up the object, e.g. building its problem.
+
+        setup_args (tuple):
+            Arguments of the setup.
+
+        method (str):
+            Name of the method to call for every tuple of arguments, unless a call names another one.
+    """
+
+    failure = None
+    try:
+        getattr(owner, setup)(*setup_args)
+    except Exception as error:
+        failure = (error, traceback.format_exc())       # Answered to every call, the coordinator raises it
+
+    while True:
+        try:
+            arguments = connection.recv()
+        except EOFError:
+            break
+        if arguments is None:
+            break
+        called, arguments = arguments
+
+        if failure is not None:
+            answer = (None, failure)
+        else:
+            try:
+                answer = (getattr(owner, called or method)(*arguments), None)
+            except Exception as error:
+                answer = (None, (error, traceback.format_exc()))
+
+        try:
+            connection.send(answer)
+        except Exception as error:
+            # E.g. an error that can not be pickled, its text still reaches the coordinator.
+            connection.send((None, (RuntimeError(repr(error)), traceback.format_exc())))
+
+    connection.close()
+
+
+class WorkerPool:
+    """
+    Objects kept alive in worker processes, one process per object, so problems built once can be solved again and
+    again for new arguments. Errors raised in a worker are raised again by map, with the worker's traceback as
+    cause, and close stops the workers even if some of them died.
+
+    Args:
+        owners (list):
+            The objects, one worker process each. They are copied into the workers.
+
+        setup (str):
+            Name of the method setting up each object in its worker.
+
+        setup_args (tuple):
+            Arguments of the setup. Default: ()
+
+        method (str):
+            Name of the method map calls. Default: "solve"
+    """
+
+    def __init__(self, owners, setup, setup_args=(), method="solve"):
+
+        self._connections = []
+        self._workers = []
+        try:
+            for owner in owners:
+                local, remote = multiprocessing.Pipe()
+                worker = multiprocessing.Process(target=run_worker, args=(remote, owner, setup, setup_args, method),
+                                                 daemon=True)
+                worker.start()
+                remote.close()      # Only the worker holds its end, so a dead worker shows as end of file
+                self._connections.append(local)
+                self._workers.append(worker)
+        except BaseException:
+            self.close()
+            raise
+
+    @property
+    def workers(self):
+        return self._workers
+
+    def __len__(self):
+        return len(self._workers)
+
+    def map(self, arguments, batch_size=None, method=None):
+        """
+        Calls the method of every object with its arguments.
+
+        Args:
+            arguments (list of tuple):
+                Arguments of each object, in the order of the objects.
+
+            batch_size (int):
+                Number of workers solving at the same time. Default: None, all of them.
+
+            method (str):
+                Name of another method to call. Default: None, the method of the pool.
+
+        Returns:
+            list:
+                Outcome of each object.
+
+        Raises:
+            Exception:
+                The first error raised by a worker, RuntimeError if a worker died.
+        """
+
+        assert len(arguments) == len(self._connections)
+        if batch_size is None:
+            batch_size = max(1, len(self._connections))
+
+        outcomes = []
+        failure = None
+        for start in range(0, len(self._connections), batch_size):
+            batch = range(start, min(start + batch_size, len(self._connections)))
+            sent = []
+            for k in batch:
+                try:
+                    self._connections[k].send((method, arguments[k]))
+                    sent.append(True)
+                except OSError:
+                    sent.append(False)      # The worker died in an earlier call
+            # Every answer of the batch is read, so no worker is left blocked on its pipe.
+            for k, was_sent in zip(batch, sent):
+                try:
+                    if not was_sent:
+                        raise EOFError
+                    outcome, error = self._connections[k].recv()
+                except (EOFError, OSError):
+                    outcome, error = None, (RuntimeError(f"Worker {k} stopped unexpectedly."), None)
+                if error is not None and failure is None:
+                    failure = error
+                outcomes.append(outcome)
+            if failure is not None:
+                error, text = failure
+                if text is None:
+                    raise error
+                raise error from RemoteTraceback(text)
+
+        return outcomes
+
+    def close(self):
+        """
+        Stops the workers. Workers that do not stop on their own, e.g. because they hang, are terminated.
+        """
+
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except OSError:
+                pass        # The worker is gone already
+        for connection, worker in zip(self._connections, self._workers):
+            worker.join(JOIN_TIMEOUT)
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+            connection.close()
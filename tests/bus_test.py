@@ -51,3 +51,15 @@ def test_bus_change_panel():
 
     with pytest.raises(PermissionError):
         bus0.panel = bus1.panel
+
+
+def test_bus_sun_profile():
+    bus = Bus(70, [1, 2], 0, sun_profile=[0.5, 0])
+
+    assert bus.sun_profile == [0.5, 0]
+
+    with pytest.raises(PermissionError):
+        bus.sun_profile = [1, 1]
+
+    with pytest.raises(AssertionError):
+        Bus(70, None, 0, sun_profile=[-1])
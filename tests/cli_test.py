@@ -0,0 +1,121 @@
+from src.bus import Bus
+from src.line import Line
+from src.line_type import LineType
+from src.grid import Grid
+from src.grid_archive import load_result
+from src.cli import main, load_jobs
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+
+def save_grid(directory):
+    house1 = Bus(10, [500, 600], 0)
+    house2 = Bus(10, [300, 200], 0)
+    generator = Bus(0, None, 0)
+    lines = [Line(house1, generator, 10, LineType("Strong", 10000)), Line(house1, house2, 30, LineType("Weak", 2000))]
+    grid = Grid([house1, house2, generator], lines, generator, [12, 20], 10)
+    grid.save(str(directory))
+
+    return grid
+
+
+def test_single_grid(tmp_path):
+    grid = save_grid(tmp_path / "grid")
+
+    assert main(["--grid", str(tmp_path / "grid"), "--output", str(tmp_path / "out"), "--option", "max_iter=500",
+                 "--profile"]) == 0
+
+    metrics = json.loads((tmp_path / "out" / "grid" / "metrics.json").read_text())
+    assert metrics["status"] == "solved"
+    assert set(metrics["times"]) == {"load", "check", "build", "solve", "save", "total"}
+    assert sum(metrics["panel_sizes"].values()) == pytest.approx(10, abs=1e-3)
+    assert json.loads((tmp_path / "out" / "grid" / "trace.json").read_text())["traceEvents"]
+    assert (tmp_path / "out" / "grid" / "profile.prof").exists()
+
+    grid.create_optimisation_task()
+    grid.optimise(verbose=False)
+    result = load_result(str(tmp_path / "out" / "grid" / "result"))
+    assert result.objective == pytest.approx(grid.result.objective, rel=1e-6)
+
+
+def test_job_file_in_processes(tmp_path):
+    save_grid(tmp_path / "grid")
+    np.save(str(tmp_path / "evening.npy"), np.array([[100., 50.], [900., 800.]]))
+    np.save(str(tmp_path / "scenarios.npy"), np.array([[[500., 300.], [600., 200.]], [[400., 300.], [700., 100.]]]))
+    np.save(str(tmp_path / "too_much.npy"), np.array([[500., 5000.], [600., 200.]]))
+    jobs = {"defaults": {"grid": "grid"},
+            "jobs": [{"name": "evening", "scenario": "evening.npy", "snapshots": [18, 21]},
+                     {"name": "scenarios", "scenario": "scenarios.npy"},
+                     {"name": "whole", "backend": "highs"},
+                     {"name": "too_much", "scenario": "too_much.npy"}]}
+    (tmp_path / "jobs.json").write_text(json.dumps(jobs))
+
+    assert main(["--jobs", str(tmp_path / "jobs.json"), "--output", str(tmp_path / "out"), "--workers", "2",
+                 "--timeout", "60"]) == 1
+
+    summary = json.loads((tmp_path / "out" / "summary.json").read_text())
+    assert [metrics["name"] for metrics in summary] == ["evening", "scenarios", "whole", "too_much"]
+    assert [metrics["status"] for metrics in summary] == ["solved", "solved", "solved", "infeasible"]
+    assert load_result(str(tmp_path / "out" / "evening" / "result")).snapshots.tolist() == [18, 21]
+    assert load_result(str(tmp_path / "out" / "scenarios" / "result")).snapshots.size == 4
+    assert [round(size) for size in summary[2]["panel_sizes"].values()] == pytest.approx(
+        list(summary[2]["panel_sizes"].values()), abs=1e-6)
+
+
+def test_job_defaults(tmp_path):
+    (tmp_path / "jobs.json").write_text(json.dumps([{"grid": "a", "timeout": 5}, {"grid": "b", "name": "b"}]))
+    jobs = load_jobs(str(tmp_path / "jobs.json"), {"timeout": 10, "backend": "highs"})
+
+    assert [job["name"] for job in jobs] == ["job0", "b"]
+    assert [job["timeout"] for job in jobs] == [5, 10]
+    assert jobs[0]["grid"] == str(tmp_path / "a")
+
+    with pytest.raises(SystemExit):
+        main(["--jobs", str(tmp_path / "jobs.json"), "--scenario", "x.npy", "--output", str(tmp_path)])
+
+
+def test_cached_jobs(tmp_path):
+    save_grid(tmp_path / "grid")
+    arguments = ["--grid", str(tmp_path / "grid"), "--cache", str(tmp_path / "cache")]
+
+    assert main(arguments + ["--output", str(tmp_path / "first")]) == 0
+    assert main(arguments + ["--output", str(tmp_path / "second")]) == 0
+
+    first = json.loads((tmp_path / "first" / "grid" / "metrics.json").read_text())
+    second = json.loads((tmp_path / "second" / "grid" / "metrics.json").read_text())
+    assert (first["cache"], second["cache"]) == ("miss", "hit")
+    assert second["objective"] == pytest.approx(first["objective"])
+
+
+def test_scenario_job_out_of_budget(tmp_path):
+    save_grid(tmp_path / "grid")
+    np.save(str(tmp_path / "scenarios.npy"), np.array([[[500., 300.], [600., 200.]], [[400., 300.], [700., 100.]]]))
+    jobs = [{"name": "short", "grid": "grid", "scenario": "scenarios.npy", "timeout": 60,
+             "solver_options": {"max_iter": 2}}]
+    (tmp_path / "jobs.json").write_text(json.dumps(jobs))
+
+    main(["--jobs", str(tmp_path / "jobs.json"), "--output", str(tmp_path / "out")])
+
+    metrics = json.loads((tmp_path / "out" / "short" / "metrics.json").read_text())
+    assert metrics["status"] == "budget exhausted"
+    assert metrics["error"] is None
+
+
+def test_hanging_job_is_stopped(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.cli.TIMEOUT_GRACE", 0)
+    save_grid(tmp_path / "good")
+    (tmp_path / "hanging").mkdir()
+    os.mkfifo(str(tmp_path / "hanging" / "grid.json"))     # Loading waits for a writer that never comes
+    jobs = [{"name": "hanging", "grid": "hanging", "timeout": 0.5}, {"name": "good", "grid": "good"}]
+    (tmp_path / "jobs.json").write_text(json.dumps(jobs))
+
+    assert main(["--jobs", str(tmp_path / "jobs.json"), "--output", str(tmp_path / "out")]) == 1
+
+    summary = json.loads((tmp_path / "out" / "summary.json").read_text())
+    assert [metrics["status"] for metrics in summary] == ["timeout", "solved"]
+    assert "timeout of 0.5 s" in summary[0]["error"]
+    assert json.loads((tmp_path / "out" / "hanging" / "metrics.json").read_text())["status"] == "timeout"
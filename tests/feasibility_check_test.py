@@ -0,0 +1,82 @@
+from src.bus import Bus
+from src.line import Line
+from src.line_type import LineType
+from src.grid import Grid
+from src.feasibility_check import InfeasibleGridError, connected_components
+
+import numpy as np
+import pytest
+
+
+def create_grid(bakery_draw, slack_rating=20000, total_panel_size=100):
+    house1 = Bus(100, [400, 800], 0)
+    house2 = Bus(150, [350, 500], 0)
+    bakery = Bus(150, bakery_draw, 0)
+    generator = Bus(0, None, 0)
+    type_c = LineType("TypeC", 1000)
+    type_s = LineType("TypeS", slack_rating)
+    lines = [Line(house1, house2, 40, type_c), Line(house2, bakery, 30, type_c), Line(house1, generator, 10, type_s)]
+
+    return Grid([house1, house2, bakery, generator], lines, generator, [3, 12], total_panel_size)
+
+
+def test_feasible_grid():
+    grid = create_grid([500, 700])
+
+    assert grid.check_feasibility().feasible
+    grid.create_optimisation_task()
+
+
+def test_bus_cut():
+    grid = create_grid([2500, 700])
+    report = grid.check_feasibility()
+
+    assert not report.feasible
+    issue = report.issues[0]
+    assert issue["check"] == "bus cut"
+    assert issue["buses"] == ["bus2"]
+    assert issue["lines"] == ["line1"]
+    assert issue["snapshots"] == [0]     # At noon the roof helps out
+    assert issue["shortfall"] == pytest.approx(1500, rel=1e-2)
+
+    with pytest.raises(InfeasibleGridError):
+        grid.create_optimisation_task()
+    assert grid.optimisation_task is None
+
+
+def test_slack_cut():
+    grid = create_grid([500, 700], slack_rating=1000)
+    report = grid.check_feasibility()
+
+    assert [issue["check"] for issue in report.issues] == ["slack cut"]
+    assert report.issues[0]["snapshots"] == [0]
+    assert report.issues[0]["lines"] == ["line2"]
+    assert "slack cut" in str(report)
+
+
+def test_warn_instead_of_raise():
+    grid = create_grid([2500, 700])
+
+    with pytest.warns(UserWarning):
+        grid.create_optimisation_task(feasibility_check="warn")
+    assert grid.optimisation_task is not None
+
+
+def test_island():
+    house = Bus(100, [400, 10], 0)
+    island = Bus(100, [400, 10], 0, name="Island")
+    generator = Bus(0, None, 0)
+    line = Line(house, generator, 10, LineType("TypeC", 1000))
+    grid = Grid([house, island, generator], [line], generator, [3, 12], 100)
+    report = grid.check_feasibility()
+
+    assert {issue["check"] for issue in report.issues} == {"bus cut", "island"}
+    island_issue = [issue for issue in report.issues if issue["check"] == "island"][0]
+    assert island_issue["buses"] == ["Island"]
+    assert island_issue["snapshots"] == [0]
+
+
+def test_connected_components():
+    labels = connected_components(np.array([0, 2, 3]), np.array([1, 3, 4]), 6)
+
+    assert labels.tolist() == [0, 0, 2, 2, 2, 5]
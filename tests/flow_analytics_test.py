@@ -0,0 +1,60 @@
+from src.bus import Bus
+from src.line import Line
+from src.line_type import LineType
+from src.grid import Grid
+from src.flow_analytics import FlowAnalytics, find_entries
+
+import numpy as np
+import pytest
+
+
+def create_grid():
+    # At noon the second house exports over the weak line, in the evening it imports over it.
+    house1 = Bus(10, [500, 400], 0)
+    house2 = Bus(10, [300, 100], 0)
+    generator = Bus(0, None, 0)
+    lines = [Line(generator, house1, 10, LineType("Strong", 5000)), Line(house1, house2, 10, LineType("Weak", 300))]
+
+    return Grid([house1, house2, generator], lines, generator, [12, 20], 20)
+
+
+def test_find_entries():
+    positions = find_entries(np.array([0, 1, 2, 1]), np.array([0, 1, 2, 0]), np.array([1, 0]), np.array([0, 1]), 3)
+
+    assert positions.tolist() == [3, -1]
+
+
+def test_loading_and_direction():
+    grid = create_grid()
+    grid.create_optimisation_task()
+    grid.optimise(verbose=False)
+    analytics = grid.flow_analytics()
+    flows = grid.result.flows
+
+    weak_net = flows[:, 1, 0] - flows[:, 0, 1]     # From house1 to house2
+    assert analytics.net_flow[:, 1] == pytest.approx(weak_net, abs=1e-6)
+    assert analytics.utilisation[:, 1] == pytest.approx(np.abs(flows[:, 1, 0] + flows[:, 0, 1]) / 300, abs=1e-6)
+    assert analytics.direction[:, 1].tolist() == [-1, 1]
+    assert analytics.reversal_share()["line1"] == pytest.approx(0.5)
+
+    hotspots = analytics.congestion_hotspots(0.99)
+    assert hotspots[["snapshot", "line"]].values.tolist() == [[12, "line1"]]
+    assert analytics.congested_lines_per_snapshot(0.99).tolist() == [1, 0]
+    assert analytics.rank_lines().index[0] == "line1"
+
+    production = grid.result.production[:, :2]
+    expected = np.minimum(production, [[500, 300], [400, 100]]).sum(axis=0) / production.sum(axis=0)
+    assert analytics.self_consumption().values == pytest.approx(expected)
+
+
+def test_scenarios_at_once():
+    grid = create_grid()
+    power_draws = np.array([[[500., 300.], [400., 100.]], [[500., 100.], [400., 100.]]])
+    result = grid.optimise_stochastic(power_draws)
+    analytics = grid.flow_analytics(result, num_scenarios=2)
+
+    assert analytics.utilisation.shape == (2, 2, 2)
+    assert analytics.self_consumption(power_draws).shape == (2, 2)
+    single = FlowAnalytics(grid, result.flow_values[2:], (result.flow_rows, result.flow_cols))
+    assert single.utilisation == pytest.approx(analytics.utilisation[1])
+    assert set(analytics.congestion_hotspots(0).columns) == {"scenario", "snapshot", "line", "utilisation"}
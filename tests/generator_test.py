@@ -0,0 +1,94 @@
+from src.bus import Bus
+from src.line import Line
+from src.line_type import LineType
+from src.grid import Grid
+from src.generator import Generator
+
+import numpy as np
+import pytest
+
+
+def create_grid(capacity=None, cost=None, power_draw=500):
+    house1 = Bus(10, [power_draw], 0)
+    house2 = Bus(10, [power_draw], 0)
+    transformer = Bus(0, None, 0)
+    slack_bus = Bus(0, None, 0)
+    line_type = LineType("Strong", 10000)
+    lines = [Line(house1, house2, 10, line_type), Line(house1, slack_bus, 10, line_type),
+             Line(house2, transformer, 10, line_type)]
+
+    generators = [Generator(slack_bus), Generator(transformer, capacity, cost)]
+
+    # No sun at 20 o'clock, all power has to be imported.
+    return Grid([house1, house2, transformer, slack_bus], lines, slack_bus, [20], 0, generators)
+
+
+def test_piecewise_cost_segments():
+    generator = Generator(Bus(0, None, 0), cost=[(0, 0), (100, 100), (200, 300)])
+
+    slopes, intercepts = generator.cost_segments()
+
+    assert generator.piecewise
+    assert slopes.tolist() == [1, 2]
+    assert intercepts.tolist() == [0, -100]
+
+
+def test_non_convex_cost_is_rejected():
+    with pytest.raises(AssertionError):
+        Generator(Bus(0, None, 0), cost=[(0, 0), (100, 200), (200, 300)])
+
+
+def test_generator_buses_have_to_close_the_bus_list():
+    house = Bus(10, [1], 0)
+    slack_bus = Bus(0, None, 0)
+    line = Line(house, slack_bus, 10, LineType("Strong", 100))
+    grid = Grid([slack_bus, house], [line], slack_bus, [20], 0)
+
+    with pytest.raises(AssertionError):
+        grid.new_optimisation_task()
+
+
+def test_cheap_generator_is_used_up_to_its_capacity():
+    grid = create_grid(capacity=300, cost=1)
+    grid.create_optimisation_task()
+    grid.optimise(verbose=False)
+
+    production = grid.result.generator_production[0]
+    assert grid.result.num_generators == 2
+    assert production[0] == pytest.approx(300, abs=1e-3)        # Transformer at its capacity
+    assert production[1] == pytest.approx(700, abs=1e-3)        # Slack bus covers the rest
+    assert grid.result.generator_import[0] == pytest.approx(1000, abs=1e-3)
+
+
+def test_piecewise_cost_shares_the_load():
+    # Above 400 the transformer gets more expensive than the default generator cost.
+    grid = create_grid(cost=[(0, 0), (400, 400), (500, 4e11)])
+    grid.create_optimisation_task()
+    grid.optimise(verbose=False)
+
+    production = grid.result.generator_production[0]
+    assert production[0] == pytest.approx(400, abs=1e-2)
+    assert production.sum() == pytest.approx(1000, abs=1e-3)
+
+
+def test_capacity_enters_feasibility_check():
+    grid = create_grid(capacity=300, power_draw=5000)
+    grid.generators[0].capacity = 100
+
+    report = grid.check_feasibility()
+
+    assert not report.feasible
+    assert report.issues[0]["check"] == "slack cut"
+
+
+def test_variables_grow_with_lines():
+    buses = [Bus(10, [1], 0) for _ in range(40)] + [Bus(0, None, 0)]
+    line_type = LineType("Strong", 100)
+    lines = [Line(buses[i], buses[i + 1], 10, line_type) for i in range(40)]
+    grid = Grid(buses, lines, buses[-1], [12], 100)
+    grid.create_optimisation_task()
+
+    task = grid.optimisation_task
+    # Two directions per line plus the diagonal, instead of all 41 x 41 bus pairs.
+    assert task.flow_task[0].numel() == 2 * 40 + 41
+    assert np.count_nonzero(task.flow_rows != task.flow_cols) == 80
@@ -0,0 +1,76 @@
+from src.bus import Bus
+from src.generator import Generator
+from src.line import Line
+from src.line_type import LineType
+from src.grid import Grid
+from src.grid_archive import save_result, load_result
+from src.optimisation_result import OptimisationResult
+
+import numpy as np
+import pytest
+
+
+def create_grid():
+    house1 = Bus(10, [500, 600], 0, sun_profile=[0.5, 0], name="Meter17")
+    house2 = Bus(20, [300, 200], 5)
+    generator = Bus(0, None, 0)
+    house2.panel.orientation_factor = 0.8
+    house1.add_storage(100, charge_limit=50, efficiency=0.9)
+    strong = LineType("Strong", 10000)
+    lines = [Line(house1, generator, 10, strong), Line(house1, house2, 30, strong, loss_coefficient=1e-4),
+             Line(house2, generator, 5, LineType("Weak", 400))]
+
+    return Grid([house1, house2, generator], lines, generator, [12, 20], 15,
+                [Generator(generator, capacity=5000, cost=[(0, 0), (1000, 1e9), (5000, 6e9)])])
+
+
+def test_grid_round_trip(tmp_path):
+    grid = create_grid()
+    grid.save(str(tmp_path))
+    loaded = Grid.load(str(tmp_path))
+
+    assert loaded.id == grid.id
+    assert [bus.id for bus in loaded.buses] == [bus.id for bus in grid.buses]
+    assert [bus.panel.id for bus in loaded.buses] == [bus.panel.id for bus in grid.buses]
+    assert [line.id for line in loaded.lines] == [line.id for line in grid.lines]
+    assert loaded.ids.bus_keys.tolist() == ["Meter17", "bus1", "bus2"]
+    assert [bus.power_draw for bus in loaded.buses] == [bus.power_draw for bus in grid.buses]
+    assert [bus.sun_profile for bus in loaded.buses] == [bus.sun_profile for bus in grid.buses]
+    assert [bus.panel.size for bus in loaded.buses] == [0, 5, 0]
+    assert loaded.buses[1].panel.orientation_factor == 0.8
+    assert loaded.buses[0].storage.charge_limit == 50 and loaded.buses[0].storage.discharge_limit is None
+    assert loaded.lines[0].line_type is loaded.lines[1].line_type         # Shared line types stay shared
+    assert loaded.lines[1].loss_coefficient == 1e-4 and loaded.lines[0].loss_coefficient is None
+    assert loaded.generators[0].cost == grid.generators[0].cost
+    assert loaded.slack_bus is loaded.buses[-1]
+    assert loaded.total_panel_size == 15
+    assert Bus(0, None).id > max(bus.id for bus in loaded.buses)     # New objects do not reuse loaded ids
+
+
+def test_result_round_trip_is_memory_mapped(tmp_path):
+    grid = create_grid()
+    grid.create_optimisation_task()
+    grid.optimise(verbose=False)
+    grid.save(str(tmp_path))
+
+    loaded = Grid.load(str(tmp_path))
+    result = loaded.result
+
+    assert isinstance(np.load(str(tmp_path / "result" / "flow_values.npy"), mmap_mode="r"), np.memmap)
+    assert not result.flow_values.flags.owndata          # A view of the file, not a copy
+    assert result.objective == pytest.approx(grid.result.objective)
+    assert result.success == grid.result.success
+    assert np.allclose(result.flows, grid.result.flows)
+    assert np.allclose(result.storage_levels, grid.result.storage_levels)
+    assert np.allclose(result.balance_duals, grid.result.balance_duals)
+    assert [bus.panel.size for bus in loaded.buses] == [bus.panel.size for bus in grid.buses]
+
+
+def test_result_without_duals(tmp_path):
+    flows = np.arange(18, dtype=float).reshape(2, 3, 3)
+    original = OptimisationResult([12, 20], flows, [1, 2])
+    save_result(original, str(tmp_path))
+    result = load_result(str(tmp_path), mmap_mode=None)
+
+    assert result.rating_duals is None and result.budget_dual is None and result.objective is None
+    assert np.array_equal(result.flows, flows)
@@ -0,0 +1,93 @@
+from src.bus import Bus
+from src.line import Line
+from src.line_type import LineType
+from src.grid import Grid
+from src.grid_expansion import CandidateLine, GridExpansion
+from src.integer_panel_sizing import IntegerPanelSizing
+
+import numpy as np
+import pytest
+
+
+def create_grid():
+    # house2 has a large roof but its only line is weak, a second line lets its panels supply house1.
+    house1 = Bus(10, [1500, 1500], 0)
+    house2 = Bus(100, [100, 100], 0)
+    house3 = Bus(10, [200, 200], 0)
+    generator = Bus(0, None, 0)
+    weak = LineType("weak", 300)
+    strong = LineType("strong", 20000)
+    lines = [Line(house1, generator, 10, strong), Line(house2, generator, 30, weak),
+             Line(house3, generator, 20, strong)]
+
+    return Grid([house1, house2, house3, generator], lines, generator, [11.5, 12.5], 100)
+
+
+def test_candidate_line_is_not_connected_until_built():
+    grid = create_grid()
+    house1, house2 = grid.buses[:2]
+    candidate = CandidateLine(house1, house2, 20, LineType("new", 5000), 1e9)
+
+    assert house2 not in house1.connected_buses
+    line = candidate.build()
+    assert line.line_type.rating == 5000
+    assert house2 in house1.connected_buses
+
+    with pytest.raises(AssertionError):
+        CandidateLine(house1, house1, 20, LineType("loop", 5000), 1e9)
+    with pytest.raises(AssertionError):
+        CandidateLine(house1, house2, -1, LineType("negative", 5000), 1e9)
+
+
+def test_capacity_bounds_and_screening():
+    grid = create_grid()
+    house1, house2, house3, generator = grid.buses
+    candidates = [CandidateLine(house1, house2, 20, LineType("new", 5000), 1e9),
+                  CandidateLine(house1, house2, 20, LineType("new", 5000), 1e15),
+                  CandidateLine(house3, generator, 5, LineType("new", 5000), 1e9)]
+    expansion = GridExpansion(grid, candidates)
+    bounds = expansion.capacity_bounds()
+
+    assert bounds.shape == (2, 3, 2)
+    assert np.all(bounds >= 0) and np.all(bounds <= 5000)
+    # house1 can only send what its small roof produces.
+    assert np.all(bounds[:, 0, 0] < 5000)
+
+    kept, dropped = expansion.screen()
+    # The second line between house1 and house2 costs more than any expansion can save.
+    assert 1 in dropped["by cost"]
+    assert 0 in kept.tolist()
+
+
+def test_expansion_builds_beneficial_line():
+    grid = create_grid()
+    house1, house2 = grid.buses[:2]
+    before = grid.new_optimisation_task()
+    before.create_optimisation_task(IntegerPanelSizing())
+    before.solve(verbose=False)
+
+    candidates = [CandidateLine(house1, house2, 20, LineType("new", 5000), 1e9),
+                  CandidateLine(house1, house2, 20, LineType("expensive", 5000), 1e15)]
+    built = grid.expand(candidates)
+
+    assert len(built) == 1 and built[0].line_type.name == "new"
+    assert built[0] in grid.lines
+    assert grid.result.stats["built"] == [0]
+    assert grid.result.objective - 1e9 < before.result.objective
+    assert grid.buses[1].panel.size > before.result.panel_sizes[1]
+
+    # The same grid with the line from the start reaches the same operating cost.
+    rebuilt = grid.new_optimisation_task()
+    rebuilt.create_optimisation_task(IntegerPanelSizing())
+    rebuilt.solve(verbose=False)
+    assert rebuilt.result.objective == pytest.approx(grid.result.objective - 1e9, rel=1e-6)
+
+
+def test_expansion_skips_costly_line():
+    grid = create_grid()
+    house1, house2 = grid.buses[:2]
+    built = grid.expand([CandidateLine(house1, house2, 20, LineType("expensive", 5000), 1e15)], screening=False)
+
+    assert built == []
+    assert len(grid.lines) == 3
+    assert grid.result.stats["built"] == []
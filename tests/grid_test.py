@@ -1,4 +1,7 @@
+import asyncio
+import concurrent.futures
 import numpy as np
+import pytest
 
 from src.bus import Bus
 from src.line import Line
@@ -30,6 +33,7 @@ def test_sanity_grid():
     assert set(grid.buses) == {bus0, bus1, bus2, bus3, bus4, bus5, slack_bus}
     assert set(grid.lines) == {line_a, line_b, line_c, line_1, line_2, line_slack}
     assert grid.slack_bus == slack_bus
+    assert grid.get_panel_output_per_sqm() == bus0.panel.output_per_sqm
 
 
 def test_rating_matrix():
@@ -44,3 +48,86 @@ def test_bus_left_out():
     grid2.create_line_rating_matrix()
     grid2.create_length_matrix()
     grid2.create_area_vector()
+
+
+def create_small_grid():
+    house1 = Bus(100, [400, 800], 0)
+    house2 = Bus(150, [350, 500], 0)
+    bakery = Bus(150, [2500, 700], 0)
+    generator = Bus(0, None, 0)
+    type_c = LineType("TypeC", 20000)
+    lines = [Line(house1, house2, 40, type_c), Line(house1, generator, 10, type_c),
+             Line(house2, bakery, 30, type_c), Line(bakery, generator, 5, type_c)]
+
+    return Grid([house1, house2, bakery, generator], lines, generator, [9.5, 15.7], 50)
+
+
+def test_optimise_async():
+    small_grid = create_small_grid()
+    result = asyncio.run(small_grid.optimise_async())
+
+    assert result.success
+    assert small_grid.result is result
+    assert small_grid.optimisation_task is None     # The grid's own task is left alone
+    assert sum(bus.panel.size for bus in small_grid.buses) == pytest.approx(50, abs=2)
+
+
+def test_optimise_async_concurrently():
+    async def optimise_all(grids):
+        return await asyncio.gather(*[small_grid.optimise_async() for small_grid in grids])
+
+    results = asyncio.run(optimise_all([create_small_grid() for _ in range(3)]))
+
+    assert all(result.success for result in results)
+    assert results[0].objective == pytest.approx(results[2].objective)
+
+
+def test_optimise_async_process_pool():
+    small_grid = create_small_grid()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+        result = asyncio.run(small_grid.optimise_async(timeout=120, executor=executor))
+
+    assert result.success
+    assert result.flows.shape == (2, 4, 4)
+
+
+def test_optimise_async_timeout():
+    small_grid = create_small_grid()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(small_grid.optimise_async(timeout=1e-6))
+
+    assert small_grid.result is None
+
+
+def create_export_grid(rating=300, power_draw=500, total_panel_size=20):
+    # At noon the second house produces more than its line to the first house can carry.
+    house1 = Bus(10, [power_draw, 400], 0)
+    house2 = Bus(10, [300, 100], 0)
+    generator = Bus(0, None, 0)
+    lines = [Line(generator, house1, 10, LineType("Strong", 5000)), Line(house1, house2, 10, LineType("Weak", rating))]
+
+    small_grid = Grid([house1, house2, generator], lines, generator, [12, 20], total_panel_size)
+    small_grid.create_optimisation_task()
+    small_grid.optimise(verbose=False)
+
+    return small_grid
+
+
+def test_shadow_prices_predict_the_objective():
+    small_grid = create_export_grid()
+    prices = small_grid.shadow_prices()
+    objective = small_grid.result.objective
+
+    weak_line = "line1"
+    assert list(prices["line rating"].columns) == ["line0", "line1"]
+    assert list(prices["power draw"].columns) == ["bus0", "bus1"]
+
+    drop = objective - create_export_grid(rating=301).result.objective
+    assert prices["line rating"].loc[12, weak_line] == pytest.approx(drop, rel=1e-4)
+    rise = create_export_grid(power_draw=501).result.objective - objective
+    assert prices["power draw"].iloc[0, 0] == pytest.approx(rise, rel=1e-4)
+
+    # With less panel area than roofs the budget binds.
+    small_grid = create_export_grid(total_panel_size=5)
+    drop = small_grid.result.objective - create_export_grid(total_panel_size=6).result.objective
+    assert small_grid.shadow_prices()["total panel size"] == pytest.approx(drop, rel=1e-4)
@@ -0,0 +1,64 @@
+from src.bus import Bus
+from src.line import Line
+from src.line_type import LineType
+from src.grid import Grid
+
+import numpy as np
+import pytest
+
+
+def create_grid(names=(None, None)):
+    house1 = Bus(10, [500, 600], 0, name=names[0])
+    house2 = Bus(10, [300, 200], 0, name=names[1])
+    generator = Bus(0, None, 0)
+    strong = LineType("Strong", 10000)
+    lines = [Line(house1, generator, 10, strong), Line(house1, house2, 30, LineType("Weak", 400), name="Feeder"),
+             Line(house2, generator, 5, strong)]
+
+    return Grid([house1, house2, generator], lines, generator, [12, 20], 10)
+
+
+def test_keys_do_not_depend_on_creation_order():
+    Bus(0, None)        # Moves the global id counter
+    grid = create_grid()
+    other = create_grid()
+
+    assert grid.buses[0].id != other.buses[0].id
+    assert grid.ids.bus_keys.tolist() == other.ids.bus_keys.tolist() == ["bus0", "bus1", "bus2"]
+    assert grid.ids.line_keys.tolist() == ["line0", "Feeder", "line2"]
+
+
+def test_indices_are_positions():
+    grid = create_grid(("Meter17", None))
+    ids = grid.ids
+
+    assert ids.bus_index(grid.buses[2]) == 2
+    assert ids.bus("Meter17") is grid.buses[0]
+    assert ids.line("Feeder") is grid.lines[1]
+    assert ids.line_indices(["line2", "Feeder"]).tolist() == [2, 1]
+    assert ids.bus_indices(["bus1"]).tolist() == [1]
+    assert [ids.line_type_index(line.line_type) for line in grid.lines] == [0, 1, 0]
+    assert ids.generator_index(grid.generators[0]) == 0
+
+    _, _, lengths, _ = grid.create_line_arrays()
+    assert lengths[ids.line_index(ids.line("Feeder"))] == 30
+
+
+def test_names_are_unique_and_fixed():
+    with pytest.raises(AssertionError):
+        create_grid(("Same", "Same")).ids
+
+    bus = Bus(0, None, name="Meter1")
+    with pytest.raises(PermissionError):
+        bus.name = "Meter2"
+    with pytest.raises(AssertionError):
+        Bus(0, None, name="")
+
+
+def test_namespace_follows_lines():
+    grid = create_grid()
+    ids = grid.ids
+    grid.lines = grid.lines[:2]
+
+    assert grid.ids is not ids
+    assert np.array_equal(grid.ids.line_keys, ["line0", "Feeder"])
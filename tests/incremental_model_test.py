@@ -0,0 +1,113 @@
+from src.bus import Bus
+from src.line import Line
+from src.line_type import LineType
+from src.grid import Grid
+from src.incremental_model import IncrementalModel
+
+import numpy as np
+import pytest
+
+line_type = LineType("Strong", 10000)
+
+
+def create_buses():
+    house1 = Bus(10, [500, 600], 0)
+    house2 = Bus(10, [300, 200], 0)
+    generator = Bus(0, None, 0)
+
+    return house1, house2, generator
+
+
+def rebuilt_result(buses, lines, snapshots=(12, 20)):
+    grid = Grid(list(buses), lines, buses[-1], list(snapshots), 10)
+    grid.create_optimisation_task()
+    grid.optimise(verbose=False)
+
+    return grid.result
+
+
+def rebuilt_objective(buses, lines, snapshots=(12, 20)):
+    return rebuilt_result(buses, lines, snapshots).objective
+
+
+def test_rating_change_only_changes_parameters():
+    house1, house2, generator = create_buses()
+    lines = [Line(house1, generator, 10, line_type), Line(house1, house2, 10, line_type)]
+    model = IncrementalModel(Grid([house1, house2, generator], lines, generator, [12, 20], 10))
+    model.solve()
+    problem = model.task.task
+    num_constraints = {block: len(constraints) for block, constraints in model.task.constraint_blocks.items()}
+
+    model.set_line_rating(lines[1], 250)
+    result = model.solve()
+
+    assert model.task.task is problem
+    assert {block: len(constraints) for block, constraints in model.task.constraint_blocks.items()} == num_constraints
+    assert np.abs(result.flows[:, 1, 0]).max() <= 250 + 1e-3
+
+    with pytest.raises(AssertionError):
+        model.set_line_rating(Line(house2, generator, 10, line_type), 100)      # Not part of the model
+
+
+def test_added_line_matches_a_rebuilt_problem():
+    house1, house2, generator = create_buses()
+    lines = [Line(house1, generator, 10, line_type), Line(house1, house2, 30, line_type)]
+    model = IncrementalModel(Grid([house1, house2, generator], lines, generator, [12, 20], 10))
+    model.solve()
+    num_ratings = len(model.task.constraint_blocks["line rating"])
+
+    shortcut = Line(house2, generator, 5, line_type)
+    model.add_line(shortcut)
+    result = model.solve()
+
+    assert len(model.task.constraint_blocks["line rating"]) == num_ratings + 2      # One per snapshot
+    assert result.objective == pytest.approx(rebuilt_objective([house1, house2, generator], lines + [shortcut]),
+                                             rel=1e-6)
+
+
+def test_removed_line_and_bus():
+    house1, house2, generator = create_buses()
+    house3 = Bus(10, [50, 50], 0)
+    lines = [Line(house1, generator, 10, line_type), Line(house1, house2, 30, line_type),
+             Line(house2, generator, 5, line_type), Line(house3, house1, 5, line_type)]
+    model = IncrementalModel(Grid([house1, house2, house3, generator], lines, generator, [12, 20], 10))
+
+    model.remove_line(lines[2])
+    model.remove_bus(house3)
+    result = model.solve()
+
+    assert result.panel_sizes[2] == pytest.approx(0, abs=1e-6)
+    assert np.abs(result.flows[:, 2, :]).max() < 1e-3
+    assert len(model.lines) == 2
+    assert result.objective == pytest.approx(rebuilt_objective([house1, house2, generator], lines[:2]), rel=1e-6)
+
+
+def test_added_bus_and_snapshots():
+    house1, house2, generator = create_buses()
+    lines = [Line(house1, generator, 10, line_type), Line(house1, house2, 30, line_type)]
+    model = IncrementalModel(Grid([house1, house2, generator], lines, generator, [12, 20], 10))
+
+    house3 = Bus(20, [100, 100], 0)
+    new_line = Line(house3, house1, 5, line_type)
+    model.add_bus(house3, [new_line])
+    result = model.solve()
+
+    assert model.buses[2] is house3 and model.buses[-1] is generator
+    assert result.num_generators == 1
+    assert result.objective == pytest.approx(rebuilt_objective([house1, house2, house3, generator],
+                                                               lines + [new_line]), rel=1e-6)
+
+    position = model.add_snapshot(21, [50, 0, 70])
+    model.remove_snapshot(0)
+    result = model.solve()
+
+    assert position == 2
+    assert result.snapshots.tolist() == [20, 21]
+    assert result.generator_import.tolist() == pytest.approx([900, 120], abs=1e-3)
+    # Same grid with only the active snapshots, the removed one costs nothing, panels included.
+    buses = [Bus(10, [600, 50], 0), Bus(10, [200, 0], 0), Bus(20, [100, 70], 0), Bus(0, None, 0)]
+    rebuilt_lines = [Line(buses[0], buses[3], 10, line_type), Line(buses[0], buses[1], 30, line_type),
+                     Line(buses[2], buses[0], 5, line_type)]
+    rebuilt = rebuilt_result(buses, rebuilt_lines, (20, 21))
+    assert result.objective == pytest.approx(rebuilt.objective, rel=1e-6)
+    assert result.panel_sizes == pytest.approx(rebuilt.panel_sizes, abs=1e-4)
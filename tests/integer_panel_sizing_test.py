@@ -0,0 +1,79 @@
+from src.bus import Bus
+from src.line import Line
+from src.line_type import LineType
+from src.grid import Grid
+from src.integer_panel_sizing import IntegerPanelSizing
+from src.solver_budget import SolverBudget
+
+import numpy as np
+import pytest
+
+
+def create_grid(total_panel_size):
+    house1 = Bus(100, [400, 800], 0)
+    house2 = Bus(150, [350, 500], 0)
+    house3 = Bus(60.5, [250, 100], 0)
+    bakery = Bus(150, [2500, 700], 0)
+    generator = Bus(0, None, 0)
+    type_c = LineType("TypeC", 20000)
+    lines = [Line(house1, house2, 40, type_c), Line(house1, house3, 30, type_c), Line(house1, generator, 10, type_c),
+             Line(house2, bakery, 30, type_c), Line(house2, generator, 30, type_c), Line(bakery, generator, 5, type_c)]
+
+    return Grid([house1, house2, house3, bakery, generator], lines, generator, [9.5, 12], total_panel_size)
+
+
+def test_integer_sizing_per_bus_values():
+    sizing = IntegerPanelSizing([1, 2.5], 100)
+
+    with pytest.raises(ValueError):
+        sizing.unit_sizes(3)
+    assert sizing.installation_costs(3).tolist() == [100, 100, 100]
+    assert IntegerPanelSizing(2.5).unit_sizes(2).tolist() == [2.5, 2.5]
+
+    with pytest.raises(AssertionError):
+        IntegerPanelSizing(0)
+    with pytest.raises(AssertionError):
+        IntegerPanelSizing(1, -5)
+
+
+def test_integer_panel_units():
+    grid = create_grid(101)
+    grid.create_optimisation_task(IntegerPanelSizing(panel_unit_size=2.5))
+    grid.optimise(verbose=False)
+
+    sizes = grid.result.panel_sizes
+    assert grid.result.success
+    assert grid.optimisation_task.task.return_status() == "Optimal"
+    assert sizes.sum() <= 101 + 1e-6
+    assert np.allclose(sizes / 2.5, np.round(sizes / 2.5), atol=1e-6)
+    assert [bus.panel.size for bus in grid.buses[:-1]] == pytest.approx(sizes.tolist())
+
+
+def test_integer_matches_continuous_for_whole_budget():
+    continuous = create_grid(100)
+    continuous.create_optimisation_task()
+    continuous.optimise(verbose=False)
+
+    integer = create_grid(100)
+    integer.create_optimisation_task(IntegerPanelSizing())
+    integer.optimise(verbose=False)
+
+    assert integer.result.objective == pytest.approx(continuous.result.objective, rel=1e-4)
+
+
+def test_installation_cost_concentrates_panels():
+    grid = create_grid(100)
+    grid.create_optimisation_task(IntegerPanelSizing(installation_cost=1e12))
+    grid.optimise(verbose=False, budget=SolverBudget(max_wall_time=30))
+
+    # Installations are expensive compared to the import a second roof would save, so all panels share one roof.
+    assert np.count_nonzero(grid.result.panel_sizes > 1e-6) == 1
+
+
+def test_integer_node_limit_flags_result():
+    grid = create_grid(100)
+    grid.create_optimisation_task(IntegerPanelSizing(installation_cost=1e12))
+    grid.optimise(verbose=False, budget=SolverBudget(max_iterations=0))
+
+    assert grid.result.budget_exhausted
+    assert not grid.result.success
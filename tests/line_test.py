@@ -127,3 +127,19 @@ def test_line_change_length():
     assert line.bus0 == bus0
     assert line.bus1 == bus1
     assert line.line_type == type_a
+
+
+def test_line_losses():
+    bus0 = Bus(100, None, 10)
+    bus1 = Bus(200, None, 20)
+    line = Line(bus0, bus1, 30, LineType("Cool", 100))
+
+    assert line.loss_coefficient is None
+
+    line.loss_coefficient = 0.001
+    line.loss_segments = 8
+
+    assert line.loss_coefficient == 0.001
+
+    with pytest.raises(AssertionError):
+        line.loss_segments = 0
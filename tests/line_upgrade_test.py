@@ -0,0 +1,73 @@
+from src.bus import Bus
+from src.line import Line
+from src.line_type import LineType
+from src.grid import Grid
+from src.integer_panel_sizing import IntegerPanelSizing
+from src.line_upgrade import LineUpgrade
+
+import numpy as np
+import pytest
+
+
+def create_grid():
+    # house2 has a large roof behind a weak line, upgrading it lets its panels supply house1.
+    house1 = Bus(10, [1500, 1500], 0)
+    house2 = Bus(100, [100, 100], 0)
+    generator = Bus(0, None, 0)
+    weak = LineType("weak", 300)
+    strong = LineType("strong", 20000)
+    lines = [Line(house1, generator, 10, strong), Line(house2, generator, 30, weak),
+             Line(house1, house2, 20, weak)]
+
+    return Grid([house1, house2, generator], lines, generator, [11.5, 12.5], 100)
+
+
+def test_line_type_cost():
+    assert LineType("TypeA", 100).cost is None
+    assert LineType("TypeA", 100, 25).cost == 25
+    with pytest.raises(AssertionError):
+        LineType("TypeA", 100, -1)
+
+
+def test_choices_are_types_rated_above_each_line():
+    grid = create_grid()
+    catalogue = [LineType("big", 30000, 1e6), LineType("medium", 5000, 1e5), LineType("small", 200, 1e3)]
+    lines, types, added, costs = LineUpgrade(grid, catalogue).choices
+
+    # The strong line can only become big, the weak lines medium or big.
+    assert lines.tolist() == [0, 1, 1, 2, 2]
+    assert types.tolist() == [0, 1, 0, 1, 0]
+    assert added.tolist() == [10000, 4700, 29700, 4700, 29700]
+    assert costs.tolist() == pytest.approx([1e7, 3e6, 3e7, 2e6, 2e7])
+
+
+def test_upgrade_raises_ratings_of_chosen_lines():
+    grid = create_grid()
+    before = grid.new_optimisation_task()
+    before.create_optimisation_task(IntegerPanelSizing())
+    before.solve(verbose=False)
+
+    catalogue = [LineType("medium", 5000, 1e3)]
+    upgrades = grid.upgrade_lines(catalogue)
+
+    # Only the weak lines are rated below the catalogue, the panels of house2 need more than 300 to get out.
+    assert "line0" not in upgrades and len(upgrades) > 0
+    assert all(grid.ids.line(key).line_type is catalogue[0] for key in upgrades)
+    assert grid.result.objective < before.result.objective
+    assert grid.buses[1].panel.size > before.result.panel_sizes[1]
+
+    # Solving the upgraded grid again finds the same operating cost, without the upgrade costs.
+    after = grid.new_optimisation_task()
+    after.create_optimisation_task(IntegerPanelSizing())
+    after.solve(verbose=False)
+    upgrade_cost = sum(1e3 * grid.ids.line(key).length for key in upgrades)
+    assert after.result.objective == pytest.approx(grid.result.objective - upgrade_cost, rel=1e-6)
+    assert np.allclose(after.result.panel_sizes, grid.result.panel_sizes)
+
+
+def test_too_costly_catalogue_keeps_lines():
+    grid = create_grid()
+    types = [line.line_type for line in grid.lines]
+
+    assert grid.upgrade_lines([LineType("gold", 30000, 1e15)]) == {}
+    assert [line.line_type for line in grid.lines] == types
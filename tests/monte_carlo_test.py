@@ -0,0 +1,53 @@
+from src.bus import Bus
+from src.line import Line
+from src.line_type import LineType
+from src.grid import Grid
+from src.monte_carlo import MonteCarloEvaluation, MonteCarloReport, ScenarioSampler
+
+import numpy as np
+import pytest
+
+
+def create_grid():
+    house1 = Bus(10, [500, 400], 2)
+    house2 = Bus(10, [300, 100], 2)
+    generator = Bus(0, None, 0)
+    lines = [Line(generator, house1, 10, LineType("Strong", 1000)), Line(house1, house2, 10, LineType("Weak", 400))]
+
+    return Grid([house1, house2, generator], lines, generator, [12, 20], 20)
+
+
+def test_samples_are_correlated_and_keep_their_mean():
+    sampler = ScenarioSampler(create_grid(), demand_sigma=0.2, spatial_correlation=0.8)
+
+    power_draws, sun = sampler.sample(20000, seed=3)
+
+    assert power_draws.shape == sun.shape == (20000, 2, 2)
+    assert power_draws.mean(axis=0) == pytest.approx(sampler.power_draws, rel=0.01)
+    assert (sun >= 0).all()
+    assert np.corrcoef(np.log(power_draws[:, 0, 0]), np.log(power_draws[:, 0, 1]))[0, 1] == pytest.approx(0.8, abs=0.02)
+    assert np.array_equal(sampler.sample(5, seed=3)[0], sampler.sample(5, seed=3)[0])
+
+
+def test_evaluation_streams_to_disk(tmp_path):
+    grid = create_grid()
+
+    report = MonteCarloEvaluation(grid).run(60, str(tmp_path), seed=1, block_size=25)
+
+    assert report.failure_rate == 0
+    assert report.generator_import.shape == (60, 2)
+    assert isinstance(report.line_loading, np.memmap)
+    assert (report.line_loading <= 1 + 1e-6).all()
+    quantiles = report.import_quantiles((0.1, 0.9))
+    assert (quantiles[0] < quantiles[1]).all()
+    assert list(report.loading_quantiles().columns) == list(grid.ids.line_keys)
+    assert MonteCarloReport(str(tmp_path)).generator_import == pytest.approx(np.asarray(report.generator_import))
+
+
+def test_samples_do_not_depend_on_the_processes(tmp_path):
+    grid = create_grid()
+
+    serial = MonteCarloEvaluation(grid).run(20, str(tmp_path / "serial"), seed=7, block_size=5)
+    parallel = MonteCarloEvaluation(grid).run(20, str(tmp_path / "parallel"), seed=7, block_size=5, processes=2)
+
+    assert np.asarray(parallel.generator_import) == pytest.approx(np.asarray(serial.generator_import))
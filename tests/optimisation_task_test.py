@@ -2,8 +2,10 @@ from src.bus import Bus
 from src.line import Line
 from src.line_type import LineType
 from src.grid import Grid
+from src.optimisation_task import OptimisationTask
 
 import numpy as np
+import pytest
 
 bus0 = Bus(100.0001, None, 10)
 bus1 = Bus(200, None, 20)
@@ -109,3 +111,39 @@ def test_presentation_grid():
 
     presentation_grid.create_optimisation_task()
     presentation_grid.optimise()
+
+
+def test_line_losses_are_taken_from_the_receiving_end():
+    house = Bus(0, [1000], 0)
+    generator = Bus(0, None, 0)
+    line = Line(house, generator, 10, LineType("Lossy", 2000), loss_coefficient=1e-4)
+    lossy_grid = Grid([house, generator], [line], generator, [20], 0)
+
+    lossy_grid.create_optimisation_task()
+    lossy_grid.optimise(verbose=False)
+
+    # Secant between 1000 and 1500: loss = 0.25 * current - 150, so current - loss = 1000 at 1133.33
+    assert lossy_grid.result.generator_import[0] == pytest.approx(1133.333, rel=1e-5)
+
+
+def test_panels_go_to_the_better_roof():
+    shaded = Bus(10, [5000], 0, sun_profile=[0.1])
+    tilted = Bus(10, [5000], 0)
+    tilted.panel.orientation_factor = 0.5
+    sunny = Bus(10, [5000], 0)
+    sunny.panel.output_per_sqm = 200
+    generator = Bus(0, None, 0)
+    line_type = LineType("Strong", 10000)
+    lines = [Line(bus, generator, 10, line_type) for bus in (shaded, tilted, sunny)]
+    roof_grid = Grid([shaded, tilted, sunny, generator], lines, generator, [12], 15)
+    assert roof_grid.create_panel_output_vector()[:3] == pytest.approx([shaded.panel.output_per_sqm,
+                                                                        tilted.panel.output_per_sqm / 2, 200])
+    with pytest.raises(ValueError):
+        roof_grid.get_panel_output_per_sqm()
+
+    roof_grid.create_optimisation_task()
+    roof_grid.optimise(verbose=False)
+
+    assert roof_grid.result.panel_sizes == pytest.approx([0, 5, 10], abs=1e-3)
+    production = roof_grid.result.production[0]
+    assert production[2] == pytest.approx(10 * 200 * OptimisationTask.sun(12), rel=1e-5)
@@ -0,0 +1,61 @@
+from src.bus import Bus
+from src.line import Line
+from src.line_type import LineType
+from src.grid import Grid
+from src.panel_heuristic import GreedyPlacement
+
+import numpy as np
+import pytest
+
+
+def create_grid(total_panel_size):
+    house1 = Bus(100, [400, 800], 0)
+    house2 = Bus(150, [350, 500], 0)
+    house3 = Bus(60.5, [250, 100], 0)
+    bakery = Bus(150, [2500, 700], 0)
+    generator = Bus(0, None, 0)
+    type_c = LineType("TypeC", 20000)
+    weak = LineType("Weak", 1000)
+    lines = [Line(house1, house2, 40, type_c), Line(house1, house3, 30, weak), Line(house1, generator, 10, type_c),
+             Line(house2, bakery, 30, type_c), Line(house2, generator, 30, type_c), Line(bakery, generator, 5, type_c)]
+
+    return Grid([house1, house2, house3, bakery, generator], lines, generator, [9.5, 12], total_panel_size)
+
+
+def test_segments_are_concave_per_building():
+    placement = GreedyPlacement(create_grid(100))
+    buildings, lengths, benefits = placement.segments()
+
+    assert (lengths > 0).all() and (benefits > 0).all()
+    for building in range(4):
+        assert (np.diff(benefits[buildings == building]) <= 0).all()
+    # house3 can export little over its weak line, so it gets no more than its own use plus the line.
+    assert lengths[buildings == 2].sum() < 60.5
+
+
+def test_placement_respects_budget_and_roofs():
+    grid = create_grid(100)
+    placement = GreedyPlacement(grid)
+    sizes = placement.solve()
+
+    assert sizes.sum() == pytest.approx(100)
+    assert (sizes <= [100, 150, 60.5, 150]).all()
+
+    unlimited = GreedyPlacement(create_grid(None)).solve()
+    assert (unlimited >= sizes - 1e-9).all()
+
+
+def test_gap_against_linear_problem():
+    grid = create_grid(100)
+    placement = grid.place_panels_greedy()
+
+    assert placement.result.success
+    assert [bus.panel.size for bus in grid.building_buses] == pytest.approx(placement.panel_sizes.tolist())
+    assert placement.estimate == pytest.approx(placement.result.objective, rel=1e-3)
+
+    task = grid.new_optimisation_task()
+    task.create_optimisation_task()
+    task.solve(verbose=False)
+    gap = placement.gap(task.result)
+    assert 0 <= gap < 1e-3
+    assert placement.gap() == pytest.approx(gap, abs=1e-6)
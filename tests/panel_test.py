@@ -44,3 +44,18 @@ def test_panel_change_bus():
 
     with pytest.raises(PermissionError):
         panel0.bus = bus1
+
+
+def test_panel_output_and_orientation():
+    bus = Bus(70, None, 1)
+    panel = bus.panel
+
+    assert panel.effective_output_per_sqm == 180
+
+    panel.output_per_sqm = 200
+    panel.orientation_factor = 0.75
+
+    assert panel.effective_output_per_sqm == 150
+
+    with pytest.raises(AssertionError):
+        panel.orientation_factor = 1.5
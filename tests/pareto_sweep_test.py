@@ -0,0 +1,77 @@
+from src.bus import Bus
+from src.line import Line
+from src.line_type import LineType
+from src.grid import Grid
+from src.pareto_sweep import ParetoSweep, ParetoFrontier
+
+import numpy as np
+import pytest
+
+
+def create_grid(total_panel_size):
+    house1 = Bus(100, [400, 800], 0)
+    house2 = Bus(150, [350, 500], 0)
+    house3 = Bus(60, [250, 100], 0)
+    bakery = Bus(150, [2500, 700], 0)
+    generator = Bus(0, None, 0)
+    type_c = LineType("TypeC", 20000)
+    lines = [Line(house1, house2, 40, type_c), Line(house1, house3, 30, type_c), Line(house1, generator, 10, type_c),
+             Line(house2, bakery, 30, type_c), Line(house2, generator, 30, type_c), Line(bakery, generator, 5, type_c)]
+
+    return Grid([house1, house2, house3, bakery, generator], lines, generator, [9.5, 12], total_panel_size)
+
+
+def test_budget_sweep():
+    sweep = ParetoSweep(create_grid(100))
+    frontier = sweep.run(budgets=[100, 0, 20, 50])
+
+    assert len(frontier) == 4
+    assert frontier.budgets.tolist() == [0, 20, 50, 100]
+    assert frontier.success.all()
+    assert frontier.panel_sizes.shape == (4, 4)
+    assert (frontier.panel_sizes.sum(axis=1) <= frontier.budgets + 1e-3).all()
+    assert (np.diff(frontier.generator_import) < 0).all()     # More panels, less import
+    assert frontier.efficient().all()
+
+
+def test_sweep_matches_single_solve():
+    frontier = ParetoSweep(create_grid(100)).run(budgets=[20, 50])
+
+    single = create_grid(50)
+    single.create_optimisation_task()
+    single.optimise(verbose=False)
+
+    assert frontier.objective[1] == pytest.approx(single.result.objective, rel=1e-5)
+    assert frontier.panel_sizes[1].sum() == pytest.approx(single.result.panel_sizes.sum(), rel=1e-4)
+
+
+def test_failed_points_do_not_stop_the_sweep():
+    frontier = ParetoSweep(create_grid(100), {"max_iter": 3}).run(budgets=[0, 20, 50, 100])
+
+    assert len(frontier) == 4
+    assert not frontier.success.all()
+    assert not frontier.efficient()[~frontier.success].any()
+
+
+def test_generator_cost_sweep():
+    frontier = ParetoSweep(create_grid(100)).run(budgets=[100], generator_costs=[1e9, 1])
+
+    assert frontier.generator_costs.tolist() == [1e9, 1]
+    assert frontier.success.all()
+    # Cheap imports are not worth the line losses of moving solar power to other houses.
+    assert frontier.generator_import[1] >= frontier.generator_import[0]
+
+
+def test_efficient_points():
+    frontier = ParetoFrontier([0, 1, 2], [1, 1, 1], [3, 2, 1], [1, 1, 1], [3, 2, 2], [[0], [1], [2]],
+                              [True, True, True])
+
+    assert frontier.efficient().tolist() == [True, True, False]
+
+
+def test_non_parametric_task_can_not_be_changed():
+    grid = create_grid(100)
+    grid.create_optimisation_task()
+
+    with pytest.raises(PermissionError):
+        grid.optimisation_task.set_parameters(total_panel_size=10)
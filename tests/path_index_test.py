@@ -0,0 +1,68 @@
+from src.bus import Bus
+from src.line import Line
+from src.line_type import LineType
+from src.grid import Grid
+from src.path_index import PathIndex
+
+import numpy as np
+
+bus0 = Bus(100, None, 10)
+bus1 = Bus(200, None, 20)
+bus2 = Bus(300, None, 30)
+bus3 = Bus(400, None, 40)
+lonely_bus = Bus(50, None, 0)
+slack_bus = Bus(0, None, 0)
+type_a = LineType("Cool", 1000)
+type_b = LineType("Uncool", 2000)
+line_a = Line(bus0, bus1, 30, type_a)
+line_b = Line(bus1, bus2, 40, type_b)
+line_c = Line(bus2, bus3, 50, type_b)
+line_d = Line(bus3, slack_bus, 200, type_b)
+line_slack = Line(slack_bus, bus0, 100, type_b)
+
+grid = Grid([bus0, bus1, bus2, bus3, lonely_bus, slack_bus], [line_a, line_b, line_c, line_d, line_slack],
+            slack_bus, [12], 100)
+
+
+def test_paths_to_slack():
+    paths = grid.paths
+
+    assert paths.source == 5
+    assert paths.distance.tolist() == [100, 130, 170, 200, np.inf, 0]
+    assert paths.hops.tolist() == [1, 2, 3, 1, -1, 0]
+    assert paths.bottleneck.tolist() == [2000, 1000, 1000, 2000, 0, np.inf]
+    assert paths.path(2) == [2, 1, 0, 5]
+    assert paths.path_lines(2) == [1, 0, 4]
+    assert paths.path(4) == []
+    assert paths.reachable.tolist() == [True, True, True, True, False, True]
+
+
+def test_paths_are_cached_until_lines_change():
+    other_grid = Grid([bus0, bus1, bus2, bus3, lonely_bus, slack_bus], [line_a, line_b, line_slack], slack_bus,
+                      [12], 100)
+    paths = other_grid.paths
+    assert other_grid.paths is paths
+    assert not paths.reachable[3]
+
+    other_grid.lines = [line_a, line_b, line_c, line_d, line_slack]
+    assert other_grid.paths is not paths
+    assert other_grid.paths.reachable[3]
+
+
+def test_all_pairs():
+    distance, hops, bottleneck = grid.paths.all_pairs()
+
+    assert distance.shape == (6, 6)
+    assert np.array_equal(distance, distance.T)
+    assert distance[0, 3] == 120
+    assert hops[0, 3] == 3
+    assert bottleneck[0, 3] == 1000
+    assert np.isinf(distance[4, 0])
+
+
+def test_parallel_lines_take_the_shorter():
+    paths = PathIndex([0, 0], [1, 1], [10, 5], [100, 50], 2, 1)
+
+    assert paths.distance[0] == 5
+    assert paths.bottleneck[0] == 50
+    assert paths.predecessor_line[0] == 1
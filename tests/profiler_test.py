@@ -0,0 +1,61 @@
+from src.bus import Bus
+from src.line import Line
+from src.line_type import LineType
+from src.grid import Grid
+from src.profiler import Profiler
+
+import json
+import tracemalloc
+
+import pytest
+
+
+def create_grid():
+    house1 = Bus(10, [500, 600], 0)
+    house2 = Bus(10, [300, 200], 0)
+    generator = Bus(0, None, 0)
+    lines = [Line(house1, generator, 10, LineType("Strong", 10000)), Line(house1, house2, 30, LineType("Weak", 2000))]
+
+    return Grid([house1, house2, generator], lines, generator, [12, 20], 10)
+
+
+def test_trace_of_build_and_solve(tmp_path):
+    grid = create_grid()
+    profiler = Profiler(cprofile=True, memory=True)
+    grid.create_optimisation_task(profiler=profiler)
+    grid.optimise(verbose=False)
+
+    steps = {event["name"]: event for event in profiler.events if event["ph"] == "X"}
+    assert {"check_feasibility", "create_problem_and_variables", "create_cost_function",
+            "create_constraint_line_rating", "run_solver"} <= set(steps)
+    assert steps["create_constraint_line_rating"]["args"]["functions"][0]["calls"] >= 1
+    assert steps["create_cost_function"]["args"]["peak"] >= 0
+    assert not tracemalloc.is_tracing()     # Later solves are not slowed down
+
+    iterations = [event for event in profiler.events if event["cat"] == "iteration" and event["ph"] == "X"]
+    assert len(iterations) == grid.result.stats["iter_count"] + 1
+    assert iterations[-1]["args"]["infeasibility"] == pytest.approx(0, abs=1e-6)
+    run = steps["run_solver"]
+    assert run["ts"] <= iterations[0]["ts"] and iterations[-1]["ts"] <= run["ts"] + run["dur"]
+
+    profiler.write(str(tmp_path / "trace.json"))
+    trace = json.loads((tmp_path / "trace.json").read_text())
+    assert [event["ts"] for event in trace["traceEvents"] if "ts" in event] == \
+        sorted(event["ts"] for event in profiler.events)
+    profiler.write_profile(str(tmp_path / "build.prof"))
+    assert (tmp_path / "build.prof").stat().st_size > 0
+
+
+def test_only_the_profiled_task_is_recorded():
+    profiler = Profiler(iterations=False)
+    task = create_grid().new_optimisation_task()
+    task.profiler = profiler
+    task.create_optimisation_task()
+    create_grid().new_optimisation_task().create_optimisation_task()     # Not recorded
+
+    assert [event["name"] for event in profiler.events].count("create_cost_function") == 1
+    assert profiler.stats is None
+    with pytest.raises(PermissionError):
+        task.profiler = Profiler()
+    with pytest.raises(ValueError):
+        profiler.write_profile("never.prof")
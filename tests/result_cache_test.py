@@ -0,0 +1,72 @@
+from src.bus import Bus
+from src.line import Line
+from src.line_type import LineType
+from src.grid import Grid
+from src.result_cache import ResultCache, fingerprint
+
+import os
+
+import numpy as np
+import pytest
+
+
+def create_grid(power_draw=500):
+    house1 = Bus(10, [power_draw, 600], 0)
+    house2 = Bus(10, [300, 200], 0)
+    generator = Bus(0, None, 0)
+    lines = [Line(house1, generator, 10, LineType("Strong", 10000)), Line(house1, house2, 30, LineType("Weak", 2000))]
+
+    return Grid([house1, house2, generator], lines, generator, [12, 20], 10)
+
+
+def test_fingerprint_depends_on_content_only():
+    key, structure, power_draws = fingerprint(create_grid())
+
+    # Rebuilt grids get new ids but the same keys.
+    assert fingerprint(create_grid())[:2] == (key, structure)
+    assert power_draws.tolist() == [[500, 300], [600, 200]]
+
+    other_key, other_structure, _ = fingerprint(create_grid(520))
+    assert other_key != key and other_structure == structure
+    assert fingerprint(create_grid(), solver_options={"tol": 1e-6})[1] != structure
+    assert fingerprint(create_grid(), snapshots=[12, 21])[1] != structure
+
+
+def test_hits_and_warm_starts(tmp_path):
+    cache = ResultCache(str(tmp_path))
+
+    first = create_grid().optimise_cached(cache)
+    assert first.stats["cache"] == "miss"
+
+    grid = create_grid()
+    again = grid.optimise_cached(cache)
+    assert again.stats["cache"] == "hit"
+    assert again.objective == pytest.approx(first.objective)
+    assert np.allclose(again.flow_values, first.flow_values)
+    assert [bus.panel.size for bus in grid.building_buses] == again.panel_sizes.round().tolist()
+
+    near = create_grid(510).optimise_cached(cache)
+    assert near.stats["cache"] == "warm start"
+    assert near.success
+    assert create_grid(1500).optimise_cached(cache).stats["cache"] == "miss"
+    assert len(cache.entries()) == 3
+
+
+def test_least_recently_used_results_are_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=1)
+
+    create_grid(500).optimise_cached(cache)
+    create_grid(900).optimise_cached(cache)
+
+    # Every result is larger than the limit, none is kept.
+    assert cache.entries() == []
+    assert not [name for name in os.listdir(str(tmp_path)) if name.startswith(".staging")]
+
+    cache = ResultCache(str(tmp_path / "larger"), max_bytes=10 ** 6)
+    keys = [fingerprint(create_grid(draw))[0] for draw in (500, 900)]
+    for draw in (500, 900):
+        create_grid(draw).optimise_cached(cache)
+    cache.get(keys[0])      # The first result is used again, the second becomes the oldest
+    cache = ResultCache(str(tmp_path / "larger"), max_bytes=cache.entries()[-1]["bytes"])
+    cache.evict()
+    assert [entry["key"] for entry in cache.entries()] == [keys[0]]
@@ -0,0 +1,106 @@
+from src.bus import Bus
+from src.line import Line
+from src.line_type import LineType
+from src.grid import Grid
+from src.rolling_horizon import RollingHorizonOptimiser
+
+import asyncio
+import pytest
+
+house1 = Bus(100, None, 20)
+house2 = Bus(150, None, 0)
+house3 = Bus(60, None, 10)
+generator = Bus(0, None, 0)
+type_a = LineType("TypeA", 20000)
+line1_2 = Line(house1, house2, 40, type_a)
+line1_3 = Line(house1, house3, 30, type_a)
+line1_g = Line(house1, generator, 10, type_a)
+line2_g = Line(house2, generator, 30, type_a)
+
+grid = Grid([house1, house2, house3, generator], [line1_2, line1_3, line1_g, line2_g], generator, [], 100)
+
+feed = [(3.5, [400, 350, 250]), (9.5, [800, 500, 100]), (12, [300, 900, 200]), (21, [600, 200, 400])]
+
+
+def check_balance(result, power_draw):
+    xt = result.flows[0]
+    n = len(power_draw)
+    for i in range(n):
+        consumption = xt[i, :].sum() - xt[:, i].sum() + xt[i, i]
+        assert consumption == pytest.approx(power_draw[i], rel=1e-4)
+
+
+def test_rolling_horizon_emits_every_record():
+    optimiser = RollingHorizonOptimiser(grid, 2)
+    results = list(optimiser.run(iter(feed)))
+
+    assert len(results) == len(feed)
+    for result, (time, power_draw) in zip(results, feed):
+        assert result.snapshots.tolist() == [time]
+        assert result.flows.shape == (1, 4, 4)
+        assert result.panel_sizes == pytest.approx([20, 0, 10], abs=1e-6)
+        check_balance(result, power_draw)
+
+
+def test_rolling_horizon_night_is_imported():
+    optimiser = RollingHorizonOptimiser(grid, 3)
+    result = next(optimiser.run(feed))
+
+    # No sun at 3:30 am, everything comes from the generator.
+    assert result.generator_import[0] == pytest.approx(1000, rel=1e-4)
+
+
+def test_rolling_horizon_async_feed():
+    async def source():
+        for record in feed:
+            yield record
+
+    async def collect():
+        optimiser = RollingHorizonOptimiser(grid, 2)
+        return [result async for result in optimiser.run_async(source())]
+
+    results = asyncio.run(collect())
+    assert [result.snapshots[0] for result in results] == [time for time, _ in feed]
+
+
+def test_rolling_horizon_bad_record():
+    optimiser = RollingHorizonOptimiser(grid, 2)
+
+    with pytest.raises(AssertionError):
+        list(optimiser.run([(25, [1, 2, 3])]))
+    with pytest.raises(AssertionError):
+        list(optimiser.run([(1, [1, 2])]))
+
+    with pytest.raises(PermissionError):
+        optimiser.window_size = 5
+
+
+def test_rolling_horizon_failed_window_continues():
+    optimiser = RollingHorizonOptimiser(grid, 2, {"max_iter": 1})
+    results = list(optimiser.run(feed))
+
+    # Windows that do not converge are emitted as failed, the feed is not stopped.
+    assert len(results) == len(feed)
+    assert not any(result.success for result in results)
+    assert [result.snapshots[0] for result in results] == [time for time, _ in feed]
+
+
+def test_failed_window_keeps_the_storage_charge():
+    battery_house = Bus(20, None, 0)
+    battery_house.add_storage(500, 300, 300, initial_charge=200)
+    other_house = Bus(10, None, 0)
+    grid_station = Bus(0, None, 0)
+    line_type = LineType("TypeA", 2000)
+    lines = [Line(battery_house, grid_station, 10, line_type), Line(other_house, grid_station, 10, line_type)]
+    storage_grid = Grid([battery_house, other_house, grid_station], lines, grid_station, [], 30)
+
+    optimiser = RollingHorizonOptimiser(storage_grid, 1)
+    # The second record draws more than the lines and the battery can deliver.
+    results = optimiser.run([(11, [300, 200]), (12, [300, 90000]), (13, [300, 200])])
+    charges = []
+    for result in results:
+        charges.append(optimiser.storage_charge.copy())
+        assert result.success == (len(charges) != 2)
+
+    assert charges[1] == pytest.approx(charges[0])
+    assert 0 <= charges[2][0] <= 500
@@ -0,0 +1,71 @@
+from src.bus import Bus
+from src.line import Line
+from src.line_type import LineType
+from src.grid import Grid
+from src.solver_budget import SolverBudget
+
+import pytest
+
+
+def create_grid():
+    house1 = Bus(100, [400, 800], 0)
+    house2 = Bus(150, [350, 500], 0)
+    house3 = Bus(60, [250, 100], 0)
+    bakery = Bus(150, [2500, 700], 0)
+    generator = Bus(0, None, 0)
+    type_c = LineType("TypeC", 20000)
+    lines = [Line(house1, house2, 40, type_c), Line(house1, house3, 30, type_c), Line(house1, generator, 10, type_c),
+             Line(house2, bakery, 30, type_c), Line(house2, generator, 30, type_c), Line(bakery, generator, 5, type_c)]
+
+    return Grid([house1, house2, house3, bakery, generator], lines, generator, [9.5, 15.7], 100)
+
+
+def test_budget_ipopt_options():
+    budget = SolverBudget(max_wall_time=2.5, max_iterations=10, preset="fast")
+    options = budget.ipopt_options()
+
+    assert options["max_wall_time"] == 2.5
+    assert options["max_iter"] == 10
+    assert options["tol"] == SolverBudget.presets["fast"]["tol"]
+    assert SolverBudget().ipopt_options() == {}
+
+
+def test_budget_bad_values():
+    with pytest.raises(AssertionError):
+        SolverBudget(preset="sloppy")
+    with pytest.raises(AssertionError):
+        SolverBudget(max_wall_time=-1)
+    with pytest.raises(AssertionError):
+        SolverBudget(max_iterations=2.5)
+
+
+def test_budget_exhausted_keeps_best_point():
+    grid = create_grid()
+    grid.create_optimisation_task()
+    grid.optimise(verbose=False, budget=SolverBudget(max_iterations=3))
+
+    result = grid.result
+    assert result.budget_exhausted
+    assert not result.success
+    assert result.status == "Maximum_Iterations_Exceeded"
+    assert result.stats["best_iteration"] <= 3
+    assert result.flows.shape == (2, 5, 5)
+    assert grid.optimisation_task.solution is None
+
+
+def test_budget_exhausted_raises_without_keep_best():
+    grid = create_grid()
+    grid.create_optimisation_task()
+
+    with pytest.raises(RuntimeError):
+        grid.optimise(verbose=False, budget=SolverBudget(max_iterations=3, keep_best=False))
+
+
+def test_budget_large_enough():
+    grid = create_grid()
+    grid.create_optimisation_task()
+    grid.optimise(verbose=False, budget=SolverBudget(max_wall_time=60, preset="fast"))
+
+    assert grid.result.success
+    assert grid.result.feasible
+    assert not grid.result.budget_exhausted
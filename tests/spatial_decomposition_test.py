@@ -0,0 +1,73 @@
+from src.bus import Bus
+from src.line import Line
+from src.line_type import LineType
+from src.grid import Grid
+from src.spatial_decomposition import SpatialDecomposition, partition_grid
+import src.worker_pool
+
+import numpy as np
+import pytest
+
+
+def create_feeder(num_houses=8):
+    houses = [Bus(10, [100 * (i % 3 + 1), 200], 0) for i in range(num_houses)]
+    generator = Bus(0, None, 0)
+    line_type = LineType("Strong", 5000)
+    lines = [Line(generator, houses[0], 10, line_type)]
+    lines += [Line(houses[i], houses[i + 1], 10, line_type) for i in range(num_houses - 1)]
+
+    return Grid(houses + [generator], lines, generator, [12, 20], 30)
+
+
+def test_feeder_is_cut_into_subtrees():
+    labels = partition_grid(create_feeder(), 3)
+
+    assert labels.tolist() == [0, 0, 1, 1, 1, 2, 2, 2, 0]
+    assert partition_grid(create_feeder(), 1).tolist() == [0] * 9
+
+
+def test_decomposition_matches_the_monolithic_problem():
+    grid = create_feeder()
+    grid.create_optimisation_task()
+    grid.optimise(verbose=False)
+
+    decomposition = SpatialDecomposition(create_feeder(), 3)
+    result = decomposition.solve()
+
+    assert len(decomposition.partitions) == 3
+    assert result.success
+    assert result.panel_sizes.sum() <= 30 * (1 + 1e-3)
+    assert result.objective == pytest.approx(grid.result.objective, rel=1e-2)
+    assert result.generator_import == pytest.approx(grid.result.generator_import, rel=1e-2)
+    # Every house gets its power draw over the boundary lines as well.
+    balance = result.production[:, :8] + result.flows.sum(axis=2)[:, :8] - result.flows.sum(axis=1)[:, :8]
+    assert balance == pytest.approx(np.array([[100, 200, 300] * 2 + [100, 200], [200] * 8]), abs=1)
+
+
+def test_worker_processes_give_the_same_result(monkeypatch):
+    pools = []
+
+    class RecordedPool(src.worker_pool.WorkerPool):
+        def __init__(self, *args):
+            super().__init__(*args)
+            pools.append(self)
+
+    monkeypatch.setattr(src.worker_pool, "WorkerPool", RecordedPool)
+    serial = SpatialDecomposition(create_feeder(), 3).solve()
+    parallel = SpatialDecomposition(create_feeder(), 3, processes=2).solve()
+
+    assert parallel.stats["iterations"] == serial.stats["iterations"]
+    assert parallel.objective == pytest.approx(serial.objective)
+    # Three partitions share the two processes.
+    assert [len(pool) for pool in pools] == [2]
+
+
+def test_failed_partition_solves_are_reported():
+    for processes in (None, 2):
+        decomposition = SpatialDecomposition(create_feeder(), 3, max_iterations=2, processes=processes,
+                                             solver_options={"max_iter": 1})
+        result = decomposition.solve()
+
+        # The partitions do not converge, the coordination still returns a result.
+        assert not result.success
+        assert result.panel_sizes.shape == (8,)
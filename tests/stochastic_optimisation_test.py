@@ -0,0 +1,88 @@
+from src.bus import Bus
+from src.line import Line
+from src.line_type import LineType
+from src.grid import Grid
+from src.monte_carlo import ScenarioSampler
+from src.stochastic_optimisation import StochasticOptimisation
+
+import numpy as np
+import pytest
+
+
+def create_grid():
+    house1 = Bus(10, [500, 400], 0)
+    house2 = Bus(10, [300, 100], 0)
+    house3 = Bus(8, [200, 300], 0)
+    generator = Bus(0, None, 0)
+    weak = LineType("Weak", 400)
+    lines = [Line(generator, house1, 10, LineType("Strong", 3000)), Line(house1, house2, 10, weak),
+             Line(house1, house3, 20, weak)]
+
+    return Grid([house1, house2, house3, generator], lines, generator, [10, 20], 12)
+
+
+def test_single_scenario_is_the_deterministic_problem():
+    grid = create_grid()
+    grid.create_optimisation_task()
+    grid.optimise(verbose=False)
+
+    power_draws = np.array([bus.power_draw for bus in grid.building_buses], dtype=float).T[None]
+    result = StochasticOptimisation(create_grid(), power_draws).solve()
+
+    assert result.objective == pytest.approx(grid.result.objective, rel=1e-6)
+
+
+def test_scenarios_share_the_panel_areas():
+    grid = create_grid()
+    power_draws, sun = ScenarioSampler(grid, sun_sigma=0.5).sample(4, seed=2)
+
+    result = StochasticOptimisation(grid, power_draws, sun, weights=[1, 1, 1, 2]).solve()
+
+    assert result.snapshots.tolist() == [10, 20] * 4
+    assert result.panel_sizes.sum() <= 12 + 1e-6
+    # Every scenario block balances its own power draws.
+    scenario = result.select([6, 7])
+    assert scenario.generator_import + scenario.production[:, :3].sum(axis=1) == pytest.approx(
+        power_draws[3].sum(axis=1), rel=1e-6)
+
+
+def test_progressive_hedging_agrees_with_the_extensive_form():
+    grid = create_grid()
+    power_draws, sun = ScenarioSampler(grid, sun_sigma=0.5).sample(4, seed=2)
+    optimisation = StochasticOptimisation(grid, power_draws, sun)
+
+    extensive = optimisation.solve()
+    decomposed = optimisation.solve_decomposed(tolerance=1e-4)
+    parallel = optimisation.solve_decomposed(processes=2, tolerance=1e-4)
+
+    assert decomposed.success
+    assert decomposed.objective == pytest.approx(extensive.objective, rel=1e-4)
+    assert decomposed.panel_sizes == pytest.approx(extensive.panel_sizes, abs=0.05)
+    # The currents of every scenario belong to the returned panel areas.
+    output = grid.create_panel_output_vector()[:3]
+    assert decomposed.production[:, :3] == pytest.approx(sun.reshape(-1, 3) * output * decomposed.panel_sizes,
+                                                         abs=1e-4)
+    assert parallel.stats["iterations"] == decomposed.stats["iterations"]
+    assert parallel.panel_sizes == pytest.approx(decomposed.panel_sizes)
+
+
+def test_failed_scenario_solves_are_reported():
+    grid = create_grid()
+    power_draws, sun = ScenarioSampler(grid, sun_sigma=0.5).sample(4, seed=2)
+    optimisation = StochasticOptimisation(grid, power_draws, sun, solver_options={"max_iter": 1})
+
+    # Scenarios that do not converge do not abort the hedging, in this process or in workers.
+    for processes in (None, 2):
+        result = optimisation.solve_decomposed(processes, max_iterations=3)
+        assert not result.success
+        assert result.stats["iterations"] == 3
+
+
+def test_grid_builds_out_the_stochastic_panel_areas():
+    grid = create_grid()
+    power_draws, _ = ScenarioSampler(grid).sample(3, seed=5)
+
+    result = grid.optimise_stochastic(power_draws)
+
+    assert grid.result is result
+    assert [bus.panel.size for bus in grid.building_buses] == result.panel_sizes.round().tolist()
@@ -0,0 +1,72 @@
+from src.bus import Bus
+from src.line import Line
+from src.line_type import LineType
+from src.grid import Grid
+from src.rolling_horizon import RollingHorizonOptimiser
+
+import numpy as np
+import pytest
+
+
+def create_grid(storage_capacity=None, efficiency=1):
+    # Noon produces more than the line can export, the evening has no sun.
+    house = Bus(10, [100, 500], 0)
+    generator = Bus(0, None, 0)
+    if storage_capacity is not None:
+        house.add_storage(storage_capacity, efficiency=efficiency)
+    line = Line(house, generator, 10, LineType("Weak", 600))
+
+    return Grid([house, generator], [line], generator, [12, 20], 10)
+
+
+def optimise(grid):
+    grid.create_optimisation_task()
+    grid.optimise(verbose=False)
+
+    return grid.result
+
+
+def test_storage_sanity():
+    bus = Bus(10, None, 0)
+    storage = bus.add_storage(100, 20, 30, 0.81, 50)
+
+    assert bus.storage is storage
+    assert storage.bus is bus
+    assert storage.one_way_efficiency == pytest.approx(0.9)
+
+    with pytest.raises(PermissionError):
+        bus.add_storage(10)
+
+    with pytest.raises(AssertionError):
+        Bus(10, None, 0).add_storage(100, initial_charge=200)
+
+
+def test_storage_shifts_noon_surplus_into_the_evening():
+    without = optimise(create_grid())
+    with_storage = optimise(create_grid(10000))
+
+    assert without.generator_import[1] == pytest.approx(500, abs=1e-3)
+    assert with_storage.generator_import[1] < without.generator_import[1] - 100
+    assert with_storage.storage_levels.shape == (2, 1)
+    assert with_storage.storage_buses.tolist() == [0]
+    assert 0 < with_storage.storage_levels[0, 0] <= 10000 + 1e-3
+
+
+def test_losses_of_storage():
+    result = optimise(create_grid(10000, efficiency=0.64))
+
+    # Whatever is left in the evening was charged at noon, 8 hours each, with 80 % one way efficiency.
+    stored = result.storage_levels[0, 0]
+    evening_import = result.generator_import[1]
+    assert (500 - evening_import) * 8 == pytest.approx((stored - result.storage_levels[1, 0]) * 0.8, rel=1e-4)
+
+
+def test_rolling_horizon_carries_the_charge():
+    grid = create_grid(10000)
+    optimiser = RollingHorizonOptimiser(grid, 2)
+
+    results = list(optimiser.run([(12, [100]), (20, [500]), (21, [500])]))
+
+    assert results[0].storage_levels[0, 0] > 0
+    assert results[1].storage_levels[0, 0] < results[0].storage_levels[0, 0]      # Evening draws from storage
+    assert np.all(results[1].generator_import < 500)
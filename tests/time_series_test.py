@@ -0,0 +1,76 @@
+from src.bus import Bus
+from src.line import Line
+from src.line_type import LineType
+from src.grid import Grid
+from src.optimisation_task import OptimisationTask
+from src.time_series import TimeSeries
+
+import numpy as np
+import pytest
+
+
+def create_series(days=2):
+    timestamps = np.arange(np.datetime64("2024-06-01"), np.datetime64("2024-06-01") + np.timedelta64(days, "D"),
+                           np.timedelta64(15, "m"))
+    values = np.arange(timestamps.size * 2, dtype=float).reshape(-1, 2)
+    values[3, 0] = np.nan
+
+    return TimeSeries(timestamps, values, ["house2", "house1"])
+
+
+def create_grid():
+    house1 = Bus(100, [400, 800], 0, name="house1")
+    house2 = Bus(150, [350, 500], 0, name="house2")
+    generator = Bus(0, None, 0)
+    type_c = LineType("TypeC", 20000)
+    lines = [Line(house1, house2, 40, type_c), Line(house1, generator, 10, type_c), Line(house2, generator, 30, type_c)]
+
+    return Grid([house1, house2, generator], lines, generator, [9.5, 12], 100)
+
+
+def test_sun_matches_diurnal_model():
+    series = create_series(1)
+    hours = series.hours
+
+    assert series.sun() == pytest.approx([OptimisationTask.sun(hour) for hour in hours], abs=1e-12)
+    assert series.sun()[hours >= 16].max() == 0
+
+
+def test_resample_and_typical_day():
+    series = create_series()
+    hourly = series.resample("1h")
+
+    assert hourly.values.shape == (48, 2)
+    assert hourly.hours[:3].tolist() == [0, 1, 2]
+    # The missing reading is left out of the mean.
+    assert hourly.values[0].tolist() == [2, 4]
+    assert series.resample("1h", "max").values[1].tolist() == [14, 15]
+    assert series.resample("1h", "sum").values[0].tolist() == [6, 16]
+
+    day = series.typical_day()
+    assert day.values.shape == (96, 2)
+    assert day.values[0].tolist() == [96, 97]
+    assert day.hours.tolist() == series.between("2024-06-02", "2024-06-03").hours.tolist()
+
+    with pytest.raises(AssertionError):
+        series.resample("7h")
+
+
+def test_series_feeds_optimisation():
+    grid = create_grid()
+    series = create_series().resample("2h")
+
+    # Columns are matched to the buildings by key.
+    draws = series.power_draws(grid)
+    assert draws[:, 0].tolist() == series.values[:, 1].tolist()
+
+    task = series.create_task(grid)
+    assert task.snapshots == series.hours.tolist()
+    assert OptimisationTask.snapshot_durations(task.snapshots).tolist() == [2] * 24
+    assert task.power_draws.shape == (24, 2)
+    task.create_optimisation_task()
+    task.solve(verbose=False)
+    assert task.result.success
+
+    with pytest.raises(ValueError):
+        create_series().power_draws(grid)
@@ -0,0 +1,59 @@
+from src.worker_pool import RemoteTraceback, WorkerPool
+
+import os
+import pytest
+
+
+class Squarer:
+    def __init__(self, offset):
+        self._offset = offset
+        self._ready = False
+
+    def set_up(self, fail=False):
+        if fail:
+            raise ValueError("Set up failed.")
+        self._ready = True
+
+    def solve(self, value):
+        if value < 0:
+            raise RuntimeError("Negative value.")
+        if value == 13:
+            os._exit(1)
+        return self._offset + value ** 2
+
+
+def test_workers_keep_their_objects():
+    pool = WorkerPool([Squarer(0), Squarer(100), Squarer(200)], "set_up")
+    try:
+        assert pool.map([(1,), (2,), (3,)]) == [1, 104, 209]
+        assert pool.map([(4,), (5,), (6,)], batch_size=2) == [16, 125, 236]
+    finally:
+        pool.close()
+
+
+def test_worker_errors_are_raised_again():
+    pool = WorkerPool([Squarer(0), Squarer(1)], "set_up")
+    try:
+        with pytest.raises(RuntimeError, match="Negative value.") as info:
+            pool.map([(1,), (-1,)])
+        assert isinstance(info.value.__cause__, RemoteTraceback)
+        # The worker survives its error.
+        assert pool.map([(1,), (2,)]) == [1, 5]
+    finally:
+        pool.close()
+
+    pool = WorkerPool([Squarer(0)], "set_up", (True,))
+    with pytest.raises(ValueError, match="Set up failed."):
+        pool.map([(1,)])
+    pool.close()
+
+
+def test_dead_workers_are_reported_and_stopped():
+    pool = WorkerPool([Squarer(0), Squarer(1)], "set_up")
+    with pytest.raises(RuntimeError, match="stopped unexpectedly"):
+        pool.map([(13,), (2,)])
+    with pytest.raises(RuntimeError, match="stopped unexpectedly"):
+        pool.map([(1,), (2,)])
+    pool.close()
+
+    assert not any(worker.is_alive() for worker in pool.workers)